@@ -0,0 +1,110 @@
+import atexit
+import logging
+import queue
+import threading
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+
+from .workers import LazyWorker
+
+logger = logging.getLogger('api.audit')
+
+
+def audit_setting(name, default):
+    return getattr(settings, 'ACTIVITY_LOG', {}).get(name, default)
+
+
+class AuditSink:
+    """
+    Buffers ActivityLog rows and writes them off the request path.
+
+    In 'async' mode entries go onto a bounded in-process queue that a daemon
+    thread drains with bulk_create every BATCH_SIZE entries or
+    FLUSH_INTERVAL_MS, whichever comes first; the queue is flushed at
+    interpreter exit. A batch the database rejects (a deleted user's entry) is
+    retried row by row, so only the bad rows are lost. When the queue is full new entries are dropped (and
+    counted) rather than blocking the request. 'sync' mode writes inline,
+    which is what the tests use.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {'queued': 0, 'written': 0, 'dropped': 0, 'failed': 0}
+        self.queue = None
+        self.worker = LazyWorker(self._run, 'activity-log-writer', on_start=self._new_queue)
+
+    def submit(self, entry):
+        if audit_setting('MODE', 'async') == 'sync':
+            self._write([entry])
+            return
+        self.worker.ensure_started()
+        try:
+            self.queue.put_nowait(entry)
+            self._count('queued')
+        except queue.Full:
+            self._count('dropped')
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['pending'] = self.queue.qsize() if self.queue is not None else 0
+        return stats
+
+    def flush(self):
+        """Block until everything queued so far has been written (or failed)."""
+        if self.queue is not None:
+            self.queue.join()
+
+    def stop(self):
+        self.worker.stop()
+
+    def _count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def _new_queue(self):
+        self.queue = queue.Queue(maxsize=audit_setting('MAX_QUEUE', 10000))
+
+    def _run(self):
+        batch_size = audit_setting('BATCH_SIZE', 100)
+        interval = audit_setting('FLUSH_INTERVAL_MS', 200) / 1000
+        while True:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=interval))
+                while len(batch) < batch_size:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                close_old_connections()
+                self._write(batch)
+                for _ in batch:
+                    self.queue.task_done()
+            elif self.worker.stopping.is_set():
+                connection.close()
+                return
+
+    def _write(self, entries):
+        from .models import ActivityLog
+        try:
+            # Its own transaction, so a rejected batch leaves the connection usable for the retry
+            with transaction.atomic() if len(entries) > 1 else nullcontext():
+                ActivityLog.objects.bulk_create(entries)
+            self._count('written', len(entries))
+        except IntegrityError:
+            if len(entries) > 1: # A row whose user is gone: write the rest one by one and drop only it
+                for entry in entries:
+                    self._write([entry])
+                return
+            self._count('failed')
+            logger.warning("Dropping activity log entry %r for user %s", entries[0].action, entries[0].user_id, exc_info=True)
+        except Exception:
+            self._count('failed', len(entries))
+            logger.exception("Error writing %d activity log entries", len(entries))
+
+
+audit_sink = AuditSink()
+atexit.register(audit_sink.stop)
@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def cache_setting(name, default):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, default)
+
+
+class ResponseCache:
+    """
+    Caches list response data per resource, keyed by the caller's role, the
+    query string and the generation of every model the response depends on.
+
+    Writes bump their model's generation (after the surrounding transaction
+    commits), which changes the key of every dependent entry; stale entries are
+    never read again and age out after TIMEOUT. Generations live in the same
+    cache as the entries, so with a shared backend (file, redis) a write in one
+    worker invalidates every worker.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    @property
+    def cache(self):
+        return caches[cache_setting('ALIAS', 'default')]
+
+    def enabled(self, resource):
+        return bool(resource) and cache_setting('ENABLED', True) and cache_setting('ENDPOINTS', {}).get(resource, True)
+
+    def generations(self, models):
+        keys = [self._generation_key(model) for model in models]
+        found = self.cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                # A fresh (or evicted) counter starts somewhere no old entry could have used
+                self.cache.add(key, time.time_ns(), timeout=None)
+                found[key] = self.cache.get(key)
+        return [found[key] for key in keys]
+
+    def bump(self, *models):
+        def bump_now():
+            for model in set(models):
+                key = self._generation_key(model)
+                try:
+                    self.cache.incr(key)
+                except ValueError:
+                    self.cache.add(key, time.time_ns(), timeout=None)
+        transaction.on_commit(bump_now)
+
+    def key(self, resource, models, request):
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        generations = '.'.join(str(g) for g in self.generations(models))
+        digest = hashlib.md5(params.encode()).hexdigest()
+        return f"response:{resource}:{getattr(request.user, 'role', '')}:{generations}:{digest}"
+
+    def get(self, resource, key):
+        data = self.cache.get(key)
+        self._count(resource, 'misses' if data is None else 'hits')
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, timeout=cache_setting('TIMEOUT', 300))
+
+    def stats(self):
+        with self.lock:
+            return {resource: dict(counts) for resource, counts in self.counters.items()}
+
+    def _count(self, resource, name):
+        with self.lock:
+            self.counters[resource][name] += 1
+
+    def _generation_key(self, model):
+        return f"generation:{model._meta.label_lower}"
+
+
+response_cache = ResponseCache()
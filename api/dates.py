@@ -0,0 +1,58 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+# Formats seen in legacy rows besides ISO 8601 ("2026-01-05", "2026-01-05T13:53:31.244Z", ...)
+LEGACY_DATE_FORMATS = ['%m/%d/%Y', '%d/%m/%Y', '%Y/%m/%d']
+
+
+def parse_legacy_datetime(value):
+    """
+    Parse the date strings the old CharField columns held into an aware
+    datetime (UTC when no offset was given). Returns None if unparseable.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime.combine(value, time.min)
+    else:
+        value = (value or '').strip()
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            for fmt in LEGACY_DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(value, fmt)
+                    break
+                except ValueError:
+                    continue
+            else:
+                return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def is_date_only(value):
+    return isinstance(value, str) and len(value.strip()) == 10
+
+
+def date_range_filter(field, startDate=None, endDate=None):
+    """
+    Lookup kwargs for a ?startDate=&endDate= pair on a DateTimeField. A
+    date-only endDate covers that whole day, so "2026-01-31" still matches
+    rows stamped 2026-01-31T17:00. Unparseable values are ignored.
+    """
+    lookups = {}
+    start = parse_legacy_datetime(startDate)
+    end = parse_legacy_datetime(endDate)
+    if start:
+        lookups[f'{field}__gte'] = start
+    if end:
+        if is_date_only(endDate):
+            lookups[f'{field}__lt'] = end + timedelta(days=1)
+        else:
+            lookups[f'{field}__lte'] = end
+    return lookups
@@ -0,0 +1,275 @@
+"""
+Change notifications pushed over Server-Sent Events.
+
+The viewset write hooks publish compact events once their transaction commits:
+
+    {"resource": "transaction", "id": 42, "op": "update", "version": 1768000000123}
+
+`version` is the row's updatedAt (or deletion time) in epoch milliseconds. A
+write touching more than EVENTS['MAX_IDS_PER_WRITE'] rows publishes a single
+{"id": null, "op": "bulk"} event per resource instead; clients answer it (and
+the "resync" event sent after their queue overflowed) with a
+?updatedSince= delta fetch.
+
+Subscribers connect to GET /api/events?token=<access token>[&resources=task,project],
+which the ASGI app in plansculpt_backend/asgi.py routes here before Django.
+Resources whose API is admin-only (ADMIN_ONLY_RESOURCES) are never sent to
+other users. Events fan out through an in-process broker; with
+EVENTS['BACKEND'] = 'redis' they go through Redis pub/sub first so every
+worker process sees every write. If the Redis subscription drops, the
+listener reconnects with backoff and sends every subscriber a "resync".
+
+Memory budget per connection: one Subscription (deque of at most QUEUE_SIZE
+event lists, an asyncio.Event) plus the connection's coroutine and disconnect
+watcher task. benchmarks/events_fanout.py measures this at roughly 8.5 KiB
+per idle subscriber (~8 MB for 1,000) before the server's own per-connection
+buffers; a full queue adds about QUEUE_SIZE x 250 bytes. Dispatch wakes each
+event loop once per write, not once per subscriber.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+from .workers import LazyWorker
+
+logger = logging.getLogger('api.events')
+
+# Resources only admins can read through the API (UserViewSet is IsAdmin)
+ADMIN_ONLY_RESOURCES = {'user'}
+
+
+def events_setting(name, default):
+    return getattr(settings, 'EVENTS', {}).get(name, default)
+
+
+def version_of(moment):
+    return int(moment.timestamp() * 1000) if moment else int(time.time() * 1000)
+
+
+class Subscription:
+    """One connected client: a bounded queue drained by its own event loop."""
+
+    def __init__(self, loop, resources=None, maxsize=100, hidden=()):
+        self.loop = loop
+        self.resources = resources
+        self.hidden = set(hidden)
+        self.pending = deque(maxlen=maxsize)
+        self.ready = asyncio.Event()
+        self.overflowed = False
+
+    def offer(self, events):
+        """Queue `events` (filtered to this subscriber's resources). Must run on self.loop."""
+        events = [e for e in events if self.wants(e['resource'])]
+        if not events:
+            return
+        if len(self.pending) == self.pending.maxlen:
+            self.overflowed = True # Oldest batch falls off; the client is told to resync
+        self.pending.append(events)
+        self.ready.set()
+
+    def wants(self, resource):
+        if resource is None: # resync
+            return True
+        return resource not in self.hidden and (self.resources is None or resource in self.resources)
+
+    async def next_batch(self, timeout):
+        """Events queued so far (empty list on timeout); a 'resync' event replaces anything dropped."""
+        if not self.pending:
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        batch = [event for events in self.pending for event in events]
+        self.pending.clear()
+        if self.overflowed:
+            self.overflowed = False
+            batch.insert(0, {'resource': None, 'id': None, 'op': 'resync', 'version': version_of(None)})
+        return batch
+
+
+class RedisBackend:
+    """Relays published events through a Redis channel so every process's broker sees them."""
+
+    def __init__(self, broker):
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured("EVENTS['BACKEND'] = 'redis' requires the redis package") from exc
+        self.broker = broker
+        self.channel = events_setting('CHANNEL', 'plansculpt-events')
+        self.client = redis.Redis.from_url(events_setting('REDIS_URL', 'redis://127.0.0.1:6379/0'))
+        self.listener = LazyWorker(self._listen, 'events-redis')
+
+    def publish(self, events):
+        self.client.publish(self.channel, json.dumps(events))
+
+    def _listen(self):
+        delay, lost = 0, False
+        while True:
+            if delay:
+                time.sleep(delay)
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                if lost: # Whatever was published meanwhile never reached us
+                    self.broker.dispatch([{'resource': None, 'id': None, 'op': 'resync', 'version': version_of(None)}])
+                delay, lost = 0, False
+                for message in pubsub.listen():
+                    try:
+                        self.broker.dispatch(json.loads(message['data']))
+                    except (TypeError, ValueError):
+                        logger.exception("Dropping malformed event message")
+                delay, lost = 0.5, True # listen() only returns once the subscription is gone
+            except Exception:
+                delay, lost = min(max(delay * 2, 0.5), 30), True
+                logger.exception("Lost the Redis event subscription; reconnecting in %.1f s", delay)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+class Broker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.backend = None
+        self.counters = {'published': 0, 'delivered': 0}
+
+    def subscribe(self, resources=None, hidden=()):
+        subscription = Subscription(asyncio.get_running_loop(), resources, events_setting('QUEUE_SIZE', 100), hidden)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self, events):
+        backend = self._backend()
+        if backend is not None:
+            backend.publish(events)
+        else:
+            self.dispatch(events)
+
+    def dispatch(self, events):
+        # Called from any thread: one wake-up per event loop, not per subscriber
+        by_loop = {}
+        with self.lock:
+            for subscription in self.subscribers:
+                by_loop.setdefault(subscription.loop, []).append(subscription)
+            self.counters['published'] += len(events)
+            self.counters['delivered'] += len(events) * len(self.subscribers)
+        for loop, subscriptions in by_loop.items():
+            loop.call_soon_threadsafe(self._deliver, subscriptions, events)
+
+    @staticmethod
+    def _deliver(subscriptions, events):
+        for subscription in subscriptions:
+            subscription.offer(events)
+
+    def stats(self):
+        with self.lock:
+            return {**self.counters, 'subscribers': len(self.subscribers)}
+
+    def _backend(self):
+        if events_setting('BACKEND', 'memory') != 'redis':
+            return None
+        with self.lock:
+            if self.backend is None:
+                self.backend = RedisBackend(self)
+        self.backend.listener.ensure_started() # redis-py reconnects after a fork; the thread is restarted here
+        return self.backend
+
+
+broker = Broker()
+
+
+def publish_changes(changes):
+    """
+    Queue [(resource, id, op, updated_at), ...] for publication when the
+    current transaction commits (immediately outside one).
+    """
+    grouped = {}
+    for resource, pk, op, moment in changes:
+        grouped.setdefault(resource, []).append({'resource': resource, 'id': pk, 'op': op, 'version': version_of(moment)})
+    events = []
+    limit = events_setting('MAX_IDS_PER_WRITE', 100)
+    for resource, rows in grouped.items():
+        if len(rows) > limit:
+            rows = [{'resource': resource, 'id': None, 'op': 'bulk', 'version': max(r['version'] for r in rows)}]
+        events.extend(rows)
+    if events:
+        transaction.on_commit(lambda: broker.publish(events))
+
+
+def authenticate_token(token):
+    """Role of the user behind a valid, active access token, else None. Runs in a worker thread."""
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.tokens import AccessToken
+    from .models import User
+    try:
+        user_id = AccessToken(token)['user_id']
+    except (TokenError, KeyError):
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).values_list('role', flat=True).first()
+
+
+def format_event(event):
+    return f"event: change\ndata: {json.dumps(event, separators=(',', ':'))}\n\n".encode()
+
+
+async def sse_app(scope, receive, send):
+    """ASGI endpoint streaming change events to one subscriber until it disconnects."""
+    from asgiref.sync import sync_to_async
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    role = await sync_to_async(authenticate_token)((query.get('token') or [''])[0])
+    cors = [(b'access-control-allow-origin', b'*')]
+    if role is None:
+        await send({'type': 'http.response.start', 'status': 401, 'headers': [(b'content-type', b'application/json')] + cors})
+        await send({'type': 'http.response.body', 'body': b'{"error": "Invalid or missing token"}'})
+        return
+
+    resources = query.get('resources')
+    subscription = broker.subscribe(set(resources[0].split(',')) if resources else None,
+                                    hidden=() if role == 'admin' else ADMIN_ONLY_RESOURCES)
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+        subscription.ready.set() # Wake the writer so it can exit
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    heartbeat = events_setting('HEARTBEAT_SECONDS', 15)
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'), # Don't let a proxy hold events back
+        ] + cors})
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+        while not disconnected.is_set():
+            batch = await subscription.next_batch(heartbeat)
+            if disconnected.is_set():
+                break
+            body = b''.join(format_event(event) for event in batch) or b': ping\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    except OSError:
+        pass # Client went away mid-write
+    finally:
+        broker.unsubscribe(subscription)
+        watcher.cancel()
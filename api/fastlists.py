@@ -0,0 +1,173 @@
+"""
+Read-only fast path for GET list responses.
+
+ModelSerializer renders a row by walking its fields, resolving each one with
+get_attribute() on a model instance and calling its to_representation(). On
+large lists that, plus building the instances, is most of the request's CPU.
+
+A ValuesSerializer reads only the columns its serializer renders with
+queryset.values() and turns each row dict into the response dict with a list
+of (key, column, converter) steps compiled once from serializer_class's
+fields. Fields whose DRF representation of a database value is the value
+itself (strings, ints, pks) get no converter; the rest keep the field's own
+to_representation, so the output is exactly what serializer_class produces.
+SerializerMethodFields and to_representation overrides have no column to read
+and are listed in `computed` instead.
+
+Used by ValuesListMixin in api/views.py; tests compare the rendered bytes of
+both paths for every serializer here.
+"""
+import decimal
+import json
+
+from rest_framework import fields, relations
+from rest_framework.settings import api_settings
+
+from .serializers import EmployeeSerializer, TaskSerializer, TransactionSerializer, InvoiceSerializer
+
+# Exact classes only: subclasses (LegacyDateField, ...) may change the representation
+IDENTITY_FIELDS = (
+    fields.ReadOnlyField, fields.CharField, fields.EmailField, fields.ChoiceField,
+    fields.IntegerField, fields.BooleanField,
+)
+
+
+def iso_datetimes(field):
+    # DateTimeField.to_representation with the timezone lookup (a context-local
+    # read per call) hoisted out of the row loop; anything unusual goes the slow way
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != fields.ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def render(value):
+        if isinstance(value, str) or value.tzinfo is None:
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return render
+
+
+def fixed_decimals(field):
+    # DecimalField.to_representation with the quantize exponent and context built once
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.decimal_places is None or field.normalize_output or not coerce_to_string or field.localize:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+
+    def render(value):
+        if not isinstance(value, decimal.Decimal):
+            return field.to_representation(value)
+        return f'{value.quantize(exponent, rounding=field.rounding, context=context):f}'
+    return render
+
+
+def converter(field):
+    """
+    None when the field renders a database value unchanged, else a function
+    returning the value converter for one render() call, so per-request state
+    (active timezone, decimal context) is read once per list rather than per row.
+    """
+    if type(field) in IDENTITY_FIELDS:
+        return None
+    if isinstance(field, relations.RelatedField):
+        # .values() yields the pk that PrimaryKeyRelatedField would render; any other relation needs `computed`
+        if (isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None
+                and type(field).to_representation is relations.PrimaryKeyRelatedField.to_representation):
+            return None
+        raise TypeError(f"{field.field_name}: {type(field).__name__} can't render from a column; add it to `computed`")
+    if isinstance(field, fields.DateTimeField) and type(field).to_representation is fields.DateTimeField.to_representation:
+        return lambda: iso_datetimes(field)
+    if isinstance(field, fields.DecimalField) and type(field).to_representation is fields.DecimalField.to_representation:
+        return lambda: fixed_decimals(field)
+    return lambda: field.to_representation
+
+
+def related_details(relation, names):
+    """A `computed` entry for a get_<relation>_details() method: selected columns of a FK target, or None."""
+    def build(row):
+        if row[relation] is None:
+            return None
+        return {name: row[f'{relation}__{name}'] for name in names}
+    return [relation] + [f'{relation}__{name}' for name in names], build
+
+
+class ValuesSerializer:
+    serializer_class = None
+    computed = {} # field name -> (columns, function(row))
+
+    _steps = None
+    _columns = None
+
+    @classmethod
+    def compile(cls):
+        """(steps, columns) for serializer_class, built once per class."""
+        if cls.__dict__.get('_steps') is None:
+            steps, columns = [], []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                if name in cls.computed:
+                    needed, build = cls.computed[name]
+                    steps.append((name, None, build))
+                    columns.extend(needed)
+                    continue
+                if field.source == '*':
+                    raise TypeError(f"{cls.__name__}: {name} has no column; add it to `computed`")
+                column = field.source.replace('.', '__')
+                steps.append((name, column, converter(field)))
+                columns.append(column)
+            cls._steps = steps
+            cls._columns = list(dict.fromkeys(columns))
+        return cls._steps, cls._columns
+
+    def queryset(self, queryset):
+        return queryset.values(*self.compile()[1])
+
+    def render(self, rows):
+        steps = [(name, column, bind() if column is not None and bind is not None else bind)
+                 for name, column, bind in self.compile()[0]]
+        data = []
+        for row in rows:
+            out = {}
+            for name, column, convert in steps:
+                if column is None:
+                    out[name] = convert(row)
+                    continue
+                value = row[column]
+                # Like Serializer.to_representation, None skips the field's conversion
+                out[name] = value if convert is None or value is None else convert(value)
+            data.append(out)
+        return data
+
+
+class EmployeeValuesSerializer(ValuesSerializer):
+    serializer_class = EmployeeSerializer
+
+
+class TaskValuesSerializer(ValuesSerializer):
+    serializer_class = TaskSerializer
+
+
+def invoice_items(row):
+    # Same fallback as InvoiceSerializer.to_representation
+    try:
+        return json.loads(row['items'])
+    except Exception:
+        return []
+
+
+class InvoiceValuesSerializer(ValuesSerializer):
+    serializer_class = InvoiceSerializer
+    computed = {'items': (['items'], invoice_items)}
+
+
+class TransactionValuesSerializer(ValuesSerializer):
+    serializer_class = TransactionSerializer
+    computed = {
+        'project_details': related_details('project', ['name', 'client', 'clientEmail', 'clientPhone']),
+        'employee_details': related_details('employee', ['name', 'email', 'phone', 'role']),
+    }
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from api import rollups
+
+
+class Command(BaseCommand):
+    help = 'Compare ProjectRollup rows with totals recomputed from the Transaction/Task tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rebuild the rollups that drifted')
+
+    def handle(self, *args, **options):
+        drifted = []
+        for project_id, diffs in rollups.drift():
+            drifted.append(project_id)
+            details = ', '.join(f"{field} {stored} != {fresh}" for field, (stored, fresh) in diffs.items())
+            self.stdout.write(f"Project {project_id}: {details}")
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All project rollups match'))
+            return
+        if options['fix']:
+            rollups.rebuild(drifted)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(drifted)} project rollups'))
+            return
+        raise CommandError(f'{len(drifted)} project rollups have drifted; run with --fix or rebuild_rollups')
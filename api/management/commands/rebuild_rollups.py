@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute ProjectRollup rows from the Transaction/Task tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('projects', nargs='*', type=int, help='Project ids (default: all projects)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rollups.rebuild(options['projects'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} project rollups'))
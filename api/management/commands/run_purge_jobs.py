@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api.models import PurgeJob
+from api.purge import run
+
+
+class Command(BaseCommand):
+    help = 'Run purge jobs left pending or running (e.g. by a restart), in this process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help='Also retry failed jobs')
+
+    def handle(self, *args, **options):
+        statuses = ['pending', 'running'] + (['failed'] if options['failed'] else [])
+        jobs = PurgeJob.objects.filter(status__in=statuses).order_by('createdAt')
+        if options['failed']:
+            jobs.filter(status='failed').update(status='pending', error=None, finishedAt=None)
+        for job in jobs:
+            run(job.pk)
+            job.refresh_from_db()
+            self.stdout.write(f'Purge job {job.pk} ({job.resource} {job.objectId}): {job.status}, {job.deleted} rows deleted')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Employee, Project, IdSequence, scan_custom_id_sequences
+
+
+class Command(BaseCommand):
+    help = 'Seed the customId sequence counters from existing Employee/Project ids'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model, prefix in [(Employee, 'E'), (Project, 'P')]:
+                for year, highest in sorted(scan_custom_id_sequences(model, prefix).items()):
+                    seq, created = IdSequence.objects.select_for_update().get_or_create(
+                        prefix=prefix, year=year, defaults={'value': highest}
+                    )
+                    # Never move a counter backwards
+                    if not created and seq.value < highest:
+                        seq.value = highest
+                        seq.save(update_fields=['value'])
+                    self.stdout.write(f"{prefix}-{year}: {seq.value}")
+        self.stdout.write(self.style.SUCCESS('Sequences seeded'))
@@ -0,0 +1,242 @@
+import json
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from api import rollups
+from api.models import (User, Employee, Project, Task, Invoice, Transaction, ActivityLog, IdSequence,
+                        encode_transaction_id, scan_custom_id_sequences)
+
+FIRST_NAMES = ['Ava', 'Ben', 'Chloe', 'Daniel', 'Emma', 'Farid', 'Grace', 'Hiro', 'Isla', 'Jamal', 'Kim', 'Liam',
+               'Maya', 'Noah', 'Olivia', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tariq', 'Uma', 'Victor', 'Wen', 'Zoe']
+LAST_NAMES = ['Adams', 'Baker', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Huang', 'Ito', 'Jones', 'Khan',
+              'Lopez', 'Müller', 'Nguyen', "O'Brien", 'Patel', 'Rossi', 'Smith', 'Tanaka', 'Walker']
+ROLES = ['Architect', 'Designer', 'Engineer', 'Site Manager', 'Electrician', 'Plumber', 'Carpenter', 'Surveyor', 'Accountant']
+DEPARTMENTS = ['General', 'Design', 'Construction', 'Finance', 'Operations']
+COMPANIES = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Stark', 'Wayne', 'Wonka', 'Tyrell', 'Soylent', 'Hooli']
+PROJECT_KINDS = ['Office Fit-out', 'Warehouse', 'Retail Store', 'Residential Block', 'Clinic', 'School Wing', 'Data Room']
+TASK_VERBS = ['Design', 'Review', 'Install', 'Inspect', 'Survey', 'Order', 'Paint', 'Wire', 'Plumb', 'Document']
+TASK_OBJECTS = ['floor plan', 'foundation', 'roof', 'HVAC', 'lighting', 'facade', 'drainage', 'permits', 'handover pack']
+INCOME_CATEGORIES = ['Sales', 'Consulting', 'Milestone Payment', 'Retainer']
+EXPENSE_CATEGORIES = ['Labor', 'Materials', 'Equipment', 'Travel', 'Software', 'Subcontractor']
+ACTIONS = ['LOGIN', 'CREATE_TASK', 'UPDATE_TASK', 'CREATE_PROJECT', 'UPDATE_PROJECT', 'CREATE_EMPLOYEE',
+           'UPDATE_EMPLOYEE', 'BULK_CREATE_TRANSACTION', 'DELETE_TRANSACTION', 'RUN_PAYROLL']
+
+DEFAULTS = {
+    'users': 50,
+    'employees': 10_000,
+    'projects': 5_000,
+    'invoices': 20_000,
+    'tasks': 500_000,
+    'transactions': 5_000_000,
+    'activity': 1_000_000,
+}
+HISTORY_DAYS = 3 * 365
+
+
+class Command(BaseCommand):
+    help = ('Insert large volumes of realistic, FK-consistent synthetic data with batched INSERTs '
+            '(benchmarks and load tests; never run it against real data)')
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f'--{name}', type=int, default=None, help=f'rows to insert (default {default:,} x --scale)')
+        parser.add_argument('--scale', type=float, default=1.0, help='multiplier for every default count, e.g. 0.01')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=42, help='random seed; the same seed gives the same data')
+        parser.add_argument('--append', action='store_true', help='allow seeding a database that already has data')
+
+    def handle(self, *args, **options):
+        if not options['append'] and (Transaction.objects.exists() or Employee.objects.exists()):
+            raise CommandError('Database already has data; pass --append to add synthetic rows to it anyway')
+        counts = {name: options[name] if options[name] is not None else max(1, int(default * options['scale']))
+                  for name, default in DEFAULTS.items()}
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.naive_text = connection.vendor == 'sqlite' # How Django's SQLite backend stores datetimes
+        self.stdout.write(f"Seeding {connection.settings_dict['NAME']}: "
+                          + ', '.join(f'{count:,} {name}' for name, count in counts.items()))
+
+        started = time.perf_counter()
+        users = self.seed_users(counts['users'])
+        employees = self.seed_employees(counts['employees'])
+        projects = self.seed_projects(counts['projects'])
+        invoices = self.seed_invoices(counts['invoices'], projects)
+        self.seed_tasks(counts['tasks'], projects, employees)
+        self.seed_transactions(counts['transactions'], projects, employees, invoices)
+        self.seed_activity(counts['activity'], users)
+
+        # Raw INSERTs bypass the model hooks that keep totals current
+        self.timed('project rollups', lambda: rollups.rebuild([pk for pk, _ in projects]))
+        with connection.cursor() as cursor:
+            self.timed('ANALYZE', lambda: cursor.execute('ANALYZE'))
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s'))
+
+    # Helpers
+
+    def timed(self, label, fn):
+        started = time.perf_counter()
+        result = fn()
+        self.stdout.write(f'  {label}: {time.perf_counter() - started:.1f}s')
+        return result
+
+    def moment(self, days_back=HISTORY_DAYS):
+        # An aware datetime within the last `days_back` days
+        return self.now - timedelta(seconds=self.rng.randrange(days_back * 86400), microseconds=self.rng.randrange(10**6))
+
+    def timeline(self, i, n, days_back=HISTORY_DAYS):
+        # The i-th of n rows written over the last `days_back` days: createdAt rises with
+        # the primary key as in real data, which also keeps the time indexes append-only
+        return self.now - timedelta(seconds=(n - i - self.rng.random()) / n * days_back * 86400)
+
+    def stamp(self, value):
+        # adapt_datetimefield_value() for an aware UTC value, without its per-call timezone lookups
+        return str(value.replace(tzinfo=None)) if self.naive_text else value
+
+    def insert(self, model, columns, rows, total, pks=False):
+        """executemany() `rows` (tuples in `columns` order) in batches; with pks=True, return the new primary keys."""
+        started = time.perf_counter()
+        before = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        table = connection.ops.quote_name(model._meta.db_table)
+        sql = (f"INSERT INTO {table} ({', '.join(connection.ops.quote_name(c) for c in columns)}) "
+               f"VALUES ({', '.join(['%s'] * len(columns))})")
+        batch = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            for row in rows:
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    cursor.executemany(sql, batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'  {model._meta.verbose_name_plural}: {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f}/s)')
+        if pks:
+            return list(model.objects.filter(pk__gt=before).order_by('pk').values_list('pk', flat=True))
+
+    def custom_ids(self, model, prefix, width, created):
+        """customIds for rows created at `created`, reserved from IdSequence like next_custom_id."""
+        per_year = Counter(moment.year for moment in created)
+        next_seq = {}
+        for year, count in per_year.items():
+            seed = lambda year=year: scan_custom_id_sequences(model, prefix).get(year, 0)
+            next_seq[year] = IdSequence.reserve(prefix, year, count, seed=seed) - count + 1
+        ids = []
+        for moment in created:
+            ids.append(f'{prefix}-{str(next_seq[moment.year]).zfill(width)}-{moment.year}')
+            next_seq[moment.year] += 1
+        return ids
+
+    def name(self):
+        return f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+
+    # Tables, parents first
+
+    def seed_users(self, n):
+        rng, stamp = self.rng, self.stamp
+        offset = User.objects.count()
+        rows = []
+        for i in range(offset, offset + n):
+            joined = stamp(self.moment())
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            rows.append(('!', False, f'synthetic{i}', first, last, f'synthetic{i}@example.test', False, True, joined,
+                         'admin' if i % 25 == 0 else 'user', f'{first} {last}', joined))
+        columns = ['password', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+                   'date_joined', 'role', 'fullName', 'updatedAt']
+        return self.insert(User, columns, rows, n, pks=True)
+
+    def seed_employees(self, n):
+        rng, stamp = self.rng, self.stamp
+        created = sorted(self.moment() for _ in range(n))
+        rows, names = [], []
+        for moment, custom_id in zip(created, self.custom_ids(Employee, 'E', 3, created)):
+            fixed = rng.random() < 0.8
+            name = self.name()
+            names.append(name)
+            rows.append((name, rng.choice(ROLES), rng.choice(DEPARTMENTS), 'fixed' if fixed else 'freelance',
+                         Decimal(rng.randrange(250_000, 1_200_000)) / 100 if fixed else None,
+                         f"{name.lower().replace(' ', '.').replace(chr(39), '')}@example.test", f'555-{rng.randrange(10000):04d}',
+                         custom_id, 'active' if rng.random() < 0.95 else 'inactive', stamp(moment), stamp(moment)))
+        columns = ['name', 'role', 'department', 'type', 'salary', 'email', 'phone', 'customId', 'status', 'createdAt', 'updatedAt']
+        return list(zip(self.insert(Employee, columns, rows, n, pks=True), names))
+
+    def seed_projects(self, n):
+        rng, stamp = self.rng, self.stamp
+        created = sorted(self.moment() for _ in range(n))
+        rows, clients = [], []
+        for moment, custom_id in zip(created, self.custom_ids(Project, 'P', 5, created)):
+            client = f'{rng.choice(COMPANIES)} {rng.choice(["Ltd", "Inc", "Group", "Holdings"])}'
+            clients.append(client)
+            rows.append((f'{client.split()[0]} {rng.choice(PROJECT_KINDS)}', client, f'accounts@{client.split()[0].lower()}.example.test',
+                         f'555-{rng.randrange(10000):04d}', 'Synthetic project', Decimal(rng.randrange(50_000, 5_000_000)),
+                         moment.date(), rng.choices(['In Progress', 'Completed', 'On Hold'], [6, 3, 1])[0],
+                         custom_id, stamp(moment), stamp(moment)))
+        columns = ['name', 'client', 'clientEmail', 'clientPhone', 'description', 'income', 'startDate', 'status',
+                   'customId', 'createdAt', 'updatedAt']
+        return list(zip(self.insert(Project, columns, rows, n, pks=True), clients))
+
+    def seed_invoices(self, n, projects):
+        rng, stamp = self.rng, self.stamp
+
+        def rows():
+            for i in range(n):
+                project, client = rng.choice(projects)
+                items = [{'description': f'{rng.choice(TASK_VERBS)} {rng.choice(TASK_OBJECTS)}',
+                          'quantity': rng.randrange(1, 20), 'rate': rng.randrange(50, 500)} for _ in range(rng.randrange(1, 5))]
+                total = sum(item['quantity'] * item['rate'] for item in items)
+                moment = self.timeline(i, n)
+                yield (project, client, f'accounts@{client.split()[0].lower()}.example.test', json.dumps(items), Decimal(total),
+                       rng.choices(['Draft', 'Sent', 'Pending', 'Paid'], [1, 2, 2, 5])[0], moment.date(), stamp(moment), stamp(moment))
+        columns = ['project_id', 'clientName', 'clientEmail', 'items', 'total', 'status', 'date', 'createdAt', 'updatedAt']
+        return self.insert(Invoice, columns, rows(), n, pks=True)
+
+    def seed_tasks(self, n, projects, employees):
+        rng, stamp = self.rng, self.stamp
+
+        def rows():
+            for i in range(n):
+                project = rng.choice(projects)[0]
+                assignee, name = rng.choice(employees) if rng.random() < 0.85 else (None, None)
+                status = rng.choices(['Pending', 'In Progress', 'Completed'], [3, 2, 5])[0]
+                paid = 'Paid' if status == 'Completed' and rng.random() < 0.7 else 'Pending'
+                moment = stamp(self.timeline(i, n))
+                yield (f'{rng.choice(TASK_VERBS)} {rng.choice(TASK_OBJECTS)}', project, assignee, name,
+                       Decimal(rng.randrange(5_000, 500_000)) / 100, status, paid, moment, moment)
+        columns = ['title', 'project_id', 'assignee_id', 'assigneeName', 'cost', 'status', 'paymentStatus', 'createdAt', 'updatedAt']
+        self.insert(Task, columns, rows(), n)
+
+    def seed_transactions(self, n, projects, employees, invoices):
+        rng, stamp = self.rng, self.stamp
+        # Same allocator and encoding as TransactionManager.bulk_create, reserved in one go
+        first_id = IdSequence.reserve('TXN', 0, n) - n + 1
+
+        def rows():
+            for i in range(n):
+                income = rng.random() < 0.3
+                category = rng.choice(INCOME_CATEGORIES if income else EXPENSE_CATEGORIES)
+                project = rng.choice(projects)[0] if rng.random() < 0.75 else None
+                employee = rng.choice(employees)[0] if not income and rng.random() < 0.4 else None
+                invoice = rng.choice(invoices) if income and invoices and rng.random() < 0.3 else None
+                moment = self.timeline(i, n)
+                yield ('income' if income else 'expense', Decimal(rng.randrange(1_000, 2_500_000 if income else 500_000)) / 100,
+                       category, f'{category} #{i}', stamp(moment - timedelta(days=rng.randrange(3))), project, employee, invoice,
+                       encode_transaction_id(first_id + i), stamp(moment), stamp(moment))
+        columns = ['type', 'amount', 'category', 'description', 'date', 'project_id', 'employee_id', 'invoice_id',
+                   'customId', 'createdAt', 'updatedAt']
+        self.insert(Transaction, columns, rows(), n)
+
+    def seed_activity(self, n, users):
+        rng, stamp = self.rng, self.stamp
+
+        def rows():
+            for i in range(n):
+                action = rng.choice(ACTIONS)
+                yield (rng.choice(users), action, f'{action.replace("_", " ").capitalize()} (synthetic)',
+                       f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}', stamp(self.timeline(i, n)))
+        self.insert(ActivityLog, ['user_id', 'action', 'details', 'ip', 'createdAt'], rows(), n)
@@ -0,0 +1,167 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+from .workers import LazyWorker
+
+logger = logging.getLogger('api.metrics')
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# name: (type, help, buckets)
+FAMILIES = {
+    'plansculpt_http_requests_total': ('counter', 'Requests served, by route, method and status.', None),
+    'plansculpt_http_request_duration_seconds': ('histogram', 'Wall time per request, including any streamed body.', SECONDS_BUCKETS),
+    'plansculpt_http_request_db_seconds': ('histogram', 'Time spent executing SQL per request.', SECONDS_BUCKETS),
+    'plansculpt_http_request_queries': ('histogram', 'SQL statements executed per request.', QUERY_BUCKETS),
+    'plansculpt_http_slow_requests_total': ('counter', "Requests over METRICS['SLOW_REQUEST_MS'].", None),
+    'plansculpt_db_slow_queries_total': ('counter', "Queries over METRICS['SLOW_QUERY_MS'], by the route that ran them.", None),
+}
+
+
+def metrics_setting(name, default):
+    return getattr(settings, 'METRICS', {}).get(name, default)
+
+
+def label_text(labels):
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels)
+
+
+class RequestMetrics:
+    """
+    Per-route counters and histograms for the Prometheus text format.
+
+    Every worker process keeps its own series. With METRICS['MULTIPROCESS_DIR']
+    set, a daemon thread writes this process's series to <dir>/<pid>.json every
+    FLUSH_INTERVAL_MS, and render() sums every file in the directory, so a
+    scrape answered by any worker reports all of them (up to one interval
+    behind). Files of exited workers stay, which keeps the counters monotonic;
+    empty the directory when the server is deployed, not while it runs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {} # key: per-bucket counts (last one +Inf), then the sum
+        self.flusher = LazyWorker(self._run, 'metrics-flusher')
+
+    def observe(self, route, method, status, seconds, db_seconds, queries, slow_queries, slow):
+        labels = (('route', route), ('method', method))
+        if metrics_setting('MULTIPROCESS_DIR', ''):
+            self.flusher.ensure_started()
+        with self.lock:
+            if self.pid != os.getpid():
+                self._reset() # Forked: the parent's numbers are the parent's to report
+            self._inc('plansculpt_http_requests_total', labels + (('status', str(status)),))
+            self._observe('plansculpt_http_request_duration_seconds', labels, seconds)
+            self._observe('plansculpt_http_request_db_seconds', labels, db_seconds)
+            self._observe('plansculpt_http_request_queries', labels, queries)
+            if slow:
+                self._inc('plansculpt_http_slow_requests_total', labels)
+            if slow_queries:
+                self._inc('plansculpt_db_slow_queries_total', labels[:1], slow_queries)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    def render(self):
+        directory = metrics_setting('MULTIPROCESS_DIR', '')
+        if not directory:
+            return self._format([self.snapshot()])
+        self.write_snapshot()
+        snapshots = []
+        for path in Path(directory).glob('*.json'):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                logger.warning('Skipping unreadable metrics file %s', path)
+        return self._format(snapshots)
+
+    def write_snapshot(self):
+        directory = metrics_setting('MULTIPROCESS_DIR', '')
+        if not directory:
+            return
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        path = Path(directory) / f'{os.getpid()}.json'
+        temp = path.with_suffix('.tmp')
+        temp.write_text(json.dumps(self.snapshot()))
+        os.replace(temp, path) # Readers never see a half-written file
+
+    def reset(self):
+        with self.lock:
+            self._reset()
+
+    def stop(self):
+        if self.flusher.stop():
+            self.write_snapshot()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+
+    def _inc(self, name, labels, n=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def _observe(self, name, labels, value):
+        buckets = FAMILIES[name][2]
+        values = self.histograms.get((name, labels))
+        if values is None:
+            values = self.histograms[(name, labels)] = [0] * (len(buckets) + 2)
+        values[bisect.bisect_left(buckets, value)] += 1
+        values[-1] += value
+
+    def _run(self):
+        while not self.flusher.stopping.wait(metrics_setting('FLUSH_INTERVAL_MS', 1000) / 1000):
+            try:
+                self.write_snapshot()
+            except OSError:
+                logger.exception('Could not write the metrics snapshot')
+
+    @staticmethod
+    def _format(snapshots):
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    merged[i] += value
+
+        lines = []
+        for name, (kind, help_text, buckets) in FAMILIES.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            if kind == 'counter':
+                lines += [f'{name}{{{label_text(labels)}}} {value}'
+                          for (family, labels), value in sorted(counters.items()) if family == name]
+                continue
+            for (family, labels), values in sorted(histograms.items()):
+                if family != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip([f'{b:g}' for b in buckets] + ['+Inf'], values[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_text(labels + (("le", bound),))}}} {cumulative}')
+                lines += [f'{name}_sum{{{label_text(labels)}}} {values[-1]}', f'{name}_count{{{label_text(labels)}}} {cumulative}']
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+atexit.register(request_metrics.stop)
@@ -0,0 +1,315 @@
+import cProfile
+import threading
+import time
+import uuid
+import zlib
+from itertools import islice
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .metrics import logger as metrics_logger, metrics_setting, request_metrics
+from .profiling import StackSampler, build_report, profiler_setting, save_report
+from .views import IsAdmin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Chunks of a sync streaming body read per trip to the sync thread under ASGI
+ASYNC_STREAM_BATCH = 64
+
+
+def compression_setting(name, default):
+    return getattr(settings, 'RESPONSE_COMPRESSION', {}).get(name, default)
+
+
+def accepted_encodings(header):
+    """Codings from an Accept-Encoding header with a non-zero q value, lowercased."""
+    accepted = set()
+    for part in header.split(','):
+        coding, *params = [p.strip() for p in part.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def gzip_chunks(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31) # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def brotli_chunks(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def batched_async(chunks, batch_size):
+    """An async iterator over the sync `chunks`, reading `batch_size` at a time on Django's sync thread."""
+    iterator = iter(chunks)
+    read = sync_to_async(lambda: b''.join(islice(iterator, batch_size)), thread_sensitive=True)
+    try:
+        while chunk := await read():
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)() # A disconnect mid-export: close the DB cursor there too
+
+
+class AsyncStreamingMiddleware:
+    """
+    Under ASGI, Django consumes a sync streaming body with sync_to_async(list)
+    before sending a byte, so an export would be built in memory. This hands
+    the body over as an async iterator instead, ASYNC_STREAM_BATCH chunks per
+    hop, so exports stay flat in memory on ASGI too. Outermost, so the other
+    middleware (and their sync wrappers around the body) run unchanged, on
+    the sync thread. WSGI requests are left alone.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming and not response.is_async and isinstance(request, ASGIRequest):
+            response.streaming_content = batched_async(response.streaming_content, ASYNC_STREAM_BATCH)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Brotli- or gzip-encodes responses of at least RESPONSE_COMPRESSION['MIN_SIZE']
+    bytes, preferring brotli when the client accepts it and the brotli package
+    is installed. Streaming responses (exports) are always compressed.
+
+    Like Django's GZipMiddleware, a strong ETag becomes weak on an encoded
+    body; ConditionalGetMixin compares If-None-Match weakly, so 304s still work.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compression_setting('ENABLED', True) or response.has_header('Content-Encoding'):
+            return response
+        if response.streaming:
+            if response.is_async:
+                return response # Not produced by this API's views
+        elif len(response.content) < compression_setting('MIN_SIZE', 1024):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and ('br' in accepted or '*' in accepted):
+            coding, compress = 'br', lambda chunks: brotli_chunks(chunks, compression_setting('BROTLI_QUALITY', 4))
+        elif 'gzip' in accepted or '*' in accepted:
+            coding, compress = 'gzip', lambda chunks: gzip_chunks(chunks, compression_setting('GZIP_LEVEL', 6))
+        else:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            content = b''.join(compress([response.content]))
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
+
+
+class QueryProbe:
+    """execute_wrapper that counts and times one request's SQL, keeping the first MAX_LOGGED_QUERIES statements."""
+
+    def __init__(self, slow_seconds, keep):
+        self.slow_seconds, self.keep = slow_seconds, keep
+        self.count, self.seconds = 0, 0.0
+        self.statements, self.slow = [], []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.statements) < self.keep:
+                self.statements.append((elapsed, sql))
+            if elapsed >= self.slow_seconds:
+                self.slow.append((elapsed, sql))
+
+
+class MetricsMiddleware:
+    """
+    Records route, method, status, wall time, DB time and query count for every
+    request into api.metrics.request_metrics (served at /api/metrics). Routes
+    are URL names (task-list, task-pay) or, for unnamed paths, the pattern, so
+    ids never become label values.
+
+    Requests slower than METRICS['SLOW_REQUEST_MS'] are logged with their SQL
+    (placeholders, not parameters); each query slower than SLOW_QUERY_MS is
+    counted and logged on its own. For streaming responses (exports) the clock
+    and the probe keep running until the body has been sent.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics_setting('ENABLED', True):
+            return self.get_response(request)
+        started = time.perf_counter()
+        probe = QueryProbe(metrics_setting('SLOW_QUERY_MS', 100) / 1000, metrics_setting('MAX_LOGGED_QUERIES', 50))
+        wrappers = connections[DEFAULT_DB_ALIAS].execute_wrappers
+        wrappers.append(probe)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            wrappers.remove(probe)
+            raise
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.streamed(response.streaming_content, request, response, started, probe, wrappers)
+        else:
+            wrappers.remove(probe)
+            self.record(request, response, started, probe)
+        return response
+
+    def streamed(self, chunks, request, response, started, probe, wrappers):
+        try:
+            yield from chunks
+        finally:
+            wrappers.remove(probe)
+            self.record(request, response, started, probe)
+
+    def record(self, request, response, started, probe):
+        seconds = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name or match.route) if match else 'unmatched'
+        slow = seconds * 1000 >= metrics_setting('SLOW_REQUEST_MS', 1000)
+        request_metrics.observe(route, request.method, response.status_code, seconds, probe.seconds, probe.count,
+                                len(probe.slow), slow)
+        for elapsed, sql in probe.slow:
+            metrics_logger.warning('Slow query (%.0f ms) in %s %s: %s', elapsed * 1000, request.method, route, sql)
+        if slow:
+            more = probe.count - len(probe.statements)
+            metrics_logger.warning(
+                'Slow request %s %s -> %s: %.0f ms, %d queries, %.0f ms in the database%s',
+                request.method, request.get_full_path(), response.status_code, seconds * 1000, probe.count,
+                probe.seconds * 1000,
+                ''.join(f'\n  {elapsed * 1000:8.1f} ms  {sql}' for elapsed, sql in probe.statements)
+                + (f'\n  ... {more} more' if more else ''))
+
+
+def requested_by_admin(request):
+    # DRF authenticates inside the view; the profiler has to decide before it runs
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and IsAdmin().has_permission(SimpleNamespace(user=authenticated[0]), None)
+
+
+class ProfilerMiddleware:
+    """
+    Runs a single request under cProfile when an admin asks for it with an
+    "X-Profile: 1" header or ?profile=1. The profile (pstats, collapsed stacks
+    and the request's SQL, see api/profiling.py) is stored under
+    PROFILER['DIRECTORY'] and named by the X-Profile-Id response header;
+    "inline" also returns it as a JSON report in place of the response body
+    (except for streaming exports, whose body is profiled as it is sent).
+
+    The flag is ignored for anyone but an admin. Without it a request costs one
+    header and one query-string lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.META.get('HTTP_X_PROFILE') or request.GET.get('profile')
+        if mode not in ('1', 'inline') or not profiler_setting('ENABLED', True) or not requested_by_admin(request):
+            return self.get_response(request)
+
+        profile_id = f'{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}'
+        profiler = cProfile.Profile()
+        sampler = StackSampler({cProfile.Profile.runcall.__code__, self.streamed.__code__}, profiler_setting('SAMPLE_INTERVAL_MS', 1) / 1000)
+        probe = QueryProbe(float('inf'), profiler_setting('MAX_QUERIES', 1000))
+        wrappers = connections[DEFAULT_DB_ALIAS].execute_wrappers
+        wrappers.append(probe)
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            response = profiler.runcall(self.get_response, request)
+        except BaseException:
+            wrappers.remove(probe)
+            sampler.stop()
+            raise
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.streamed(response.streaming_content, profile_id, request, response,
+                                                       profiler, sampler, probe, wrappers, started)
+            response.headers['X-Profile-Id'] = profile_id
+            return response
+
+        wrappers.remove(probe)
+        sampler.stop()
+        stats, report = build_report(profile_id, request, response.status_code, time.perf_counter() - started,
+                                     profiler, sampler, probe)
+        save_report(stats, report)
+        if mode == 'inline':
+            response = JsonResponse(report)
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    def streamed(self, chunks, profile_id, request, response, profiler, sampler, probe, wrappers, started):
+        iterator = iter(chunks)
+        try:
+            while True:
+                sampler.thread_id = threading.get_ident() # ASGI may send each chunk from another thread
+                profiler.enable()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    profiler.disable()
+                yield chunk
+        finally:
+            wrappers.remove(probe)
+            sampler.stop()
+            save_report(*build_report(profile_id, request, response.status_code, time.perf_counter() - started,
+                                      profiler, sampler, probe))
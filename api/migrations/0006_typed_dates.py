@@ -0,0 +1,152 @@
+# Generated by Django 6.0 on 2026-10-18 15:10
+
+import datetime
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+LEGACY_DATE_FORMATS = ['%m/%d/%Y', '%d/%m/%Y', '%Y/%m/%d']
+
+
+def parse_legacy(value):
+    # Kept local to the migration so later changes to api.dates can't alter history
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        for fmt in LEGACY_DATE_FORMATS:
+            try:
+                parsed = datetime.datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def convert(model, source, target, as_date, required):
+    # Walk the table in pk order, BATCH_SIZE rows at a time, so memory stays flat
+    batch = []
+    for obj in model.objects.only('pk', source, 'createdAt').order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        parsed = parse_legacy(getattr(obj, source))
+        if parsed is None and required:
+            parsed = obj.createdAt # Unparseable legacy value: fall back to when the row was made
+        if parsed is not None and as_date:
+            parsed = parsed.astimezone(datetime.timezone.utc).date()
+        setattr(obj, target, parsed)
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_update(batch, [target])
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, [target])
+
+
+def forwards(apps, schema_editor):
+    convert(apps.get_model('api', 'Transaction'), 'date', 'date_typed', as_date=False, required=True)
+    convert(apps.get_model('api', 'Invoice'), 'date', 'date_typed', as_date=True, required=True)
+    convert(apps.get_model('api', 'Project'), 'startDate', 'startDate_typed', as_date=True, required=False)
+
+
+def backwards(apps, schema_editor):
+    for model_name, source, target in [('Transaction', 'date_typed', 'date'), ('Invoice', 'date_typed', 'date'), ('Project', 'startDate_typed', 'startDate')]:
+        model = apps.get_model('api', model_name)
+        batch = []
+        for obj in model.objects.only('pk', source).order_by('pk').iterator(chunk_size=BATCH_SIZE):
+            value = getattr(obj, source)
+            setattr(obj, target, value.isoformat() if value else '')
+            batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, [target])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, [target])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_payrollrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='date_typed',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='date_typed',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='startDate_typed',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='date',
+        ),
+        migrations.RemoveField(
+            model_name='invoice',
+            name='date',
+        ),
+        migrations.RemoveField(
+            model_name='project',
+            name='startDate',
+        ),
+        migrations.RenameField(
+            model_name='transaction',
+            old_name='date_typed',
+            new_name='date',
+        ),
+        migrations.RenameField(
+            model_name='invoice',
+            old_name='date_typed',
+            new_name='date',
+        ),
+        migrations.RenameField(
+            model_name='project',
+            old_name='startDate_typed',
+            new_name='startDate',
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='date',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='invoice',
+            name='date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='startDate',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['date'], name='invoice_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date'], name='txn_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['project', 'date'], name='txn_project_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['employee', 'date'], name='txn_employee_date_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-18 15:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+BATCH_SIZE = 2000
+
+
+def build_rollups(apps, schema_editor):
+    # Grouped aggregates instead of api.rollups so later changes there can't alter history
+    Project = apps.get_model('api', 'Project')
+    ProjectRollup = apps.get_model('api', 'ProjectRollup')
+    Transaction = apps.get_model('api', 'Transaction')
+    Task = apps.get_model('api', 'Task')
+    totals = {}
+    for row in Transaction.objects.filter(project__isnull=False).values('project').annotate(
+        income=Sum('amount', filter=Q(type='income')), expense=Sum('amount', filter=Q(type='expense'))
+    ).order_by():
+        totals[row['project']] = {'income': row['income'] or 0, 'expense': row['expense'] or 0}
+    for row in Task.objects.values('project').annotate(
+        taskCount=Count('id'), completedTaskCount=Count('id', filter=Q(status='Completed'))
+    ).order_by():
+        totals.setdefault(row['project'], {}).update(taskCount=row['taskCount'], completedTaskCount=row['completedTaskCount'])
+    batch = []
+    for project_id in Project.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=BATCH_SIZE):
+        batch.append(ProjectRollup(project_id=project_id, **totals.get(project_id, {})))
+        if len(batch) >= BATCH_SIZE:
+            ProjectRollup.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ProjectRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectRollup',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='api.project')),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('taskCount', models.IntegerField(default=0)),
+                ('completedTaskCount', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
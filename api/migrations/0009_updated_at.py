@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-18 15:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing rows were last known to change when they were created
+    for model_name, created in [('User', 'date_joined'), ('Employee', 'createdAt'), ('Project', 'createdAt'),
+                                ('Task', 'createdAt'), ('Invoice', 'createdAt'), ('Transaction', 'createdAt')]:
+        apps.get_model('api', model_name).objects.update(updatedAt=F(created))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_project_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='updatedAt',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='updatedAt',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='updatedAt',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='projectrollup',
+            name='updatedAt',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updatedAt',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='updatedAt',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='updatedAt',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 18:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_purge_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='createdAt',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
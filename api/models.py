@@ -1,5 +1,13 @@
-from django.db import models
+from django.db import models, transaction, connection, connections, DEFAULT_DB_ALIAS, IntegrityError
+from django.utils.connection import ConnectionDoesNotExist
+from django.db.models import F
+from django.db.models.signals import pre_delete, post_delete
+from django.dispatch import receiver
+import threading
+from django.utils import timezone
+from datetime import date
 from django.contrib.auth.models import AbstractUser
+from . import rollups
 
 # User Model
 class User(AbstractUser):
@@ -7,6 +15,15 @@ class User(AbstractUser):
     fullName = models.CharField(max_length=255, null=True, blank=True)
     phone = models.CharField(max_length=20, null=True, blank=True)
     dob = models.DateField(null=True, blank=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    # Indexes below mirror the filter + ORDER BY shapes in api/views.py; the
+    # trailing -id matches the keyset pagination tiebreaker (api/pagination.py).
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['-date_joined', '-id'], name='user_joined_idx'),
+            models.Index(fields=['updatedAt'], name='user_updated_idx'), # ?updatedSince=
+        ]
 
     def __str__(self):
         return self.username
@@ -29,6 +46,14 @@ class Employee(models.Model):
     
     status = models.CharField(max_length=50, default='active')
     createdAt = models.DateTimeField(auto_now_add=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-createdAt', '-id'], name='employee_created_idx'),
+            models.Index(fields=['type', 'status'], name='employee_payroll_idx'), # run-payroll selection
+            models.Index(fields=['updatedAt'], name='employee_updated_idx'), # ?updatedSince=
+        ]
 
     def __str__(self):
         return self.name
@@ -41,16 +66,82 @@ class Project(models.Model):
     clientPhone = models.CharField(max_length=50, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
     income = models.DecimalField(max_digits=10, decimal_places=2, default=0) # Budget
-    startDate = models.CharField(max_length=50, null=True, blank=True) # Legacy used string
+    startDate = models.DateField(null=True, blank=True)
     status = models.CharField(max_length=50, default='In Progress')
     customId = models.CharField(max_length=50, unique=True, null=True, blank=True)
     createdAt = models.DateTimeField(auto_now_add=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-createdAt', '-id'], name='project_created_idx'),
+            models.Index(fields=['updatedAt'], name='project_updated_idx'), # ?updatedSince=
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if adding:
+                ProjectRollup.objects.create(project=self)
 
     def __str__(self):
         return self.name
 
+# Per-project totals kept in step with Transaction/Task writes (see api/rollups.py)
+class ProjectRollup(models.Model):
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    taskCount = models.IntegerField(default=0)
+    completedTaskCount = models.IntegerField(default=0)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updatedAt'], name='rollup_updated_idx'), # Project ?updatedSince=
+        ]
+
+    def __str__(self):
+        return f"Rollup {self.project_id}"
+
+class RollupTracked(models.Model):
+    """
+    Rows that count towards a ProjectRollup. rollup_key() is the row's
+    contribution; save() moves it from the stored key in the same transaction.
+    Deletes go through the delete receivers below, bulk_create through the
+    model's manager.
+    """
+    ROLLUP_KEY = ()
+
+    class Meta:
+        abstract = True
+
+    def rollup_key(self):
+        return tuple(getattr(self, field) for field in self.ROLLUP_KEY)
+
+    def stored_rollup_key(self):
+        """The key as stored (None if the row is gone), with the row locked until the transaction ends."""
+        return type(self).objects.select_for_update().filter(pk=self.pk).values_list(*self.ROLLUP_KEY).first()
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            # Not the values this copy was loaded with: another save of the same
+            # row since that read has already moved the rollup
+            old = None if self._state.adding else self.stored_rollup_key()
+            super().save(*args, **kwargs)
+            rollups.changed(self, old, self.rollup_key())
+
+class RollupManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            rollups.created(objs)
+        return created
+
 # Task Model
-class Task(models.Model):
+class Task(RollupTracked):
     title = models.CharField(max_length=255)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks')
     assignee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks')
@@ -59,6 +150,21 @@ class Task(models.Model):
     status = models.CharField(max_length=50, default='Pending')
     paymentStatus = models.CharField(max_length=50, default='Pending')
     createdAt = models.DateTimeField(auto_now_add=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    objects = RollupManager()
+
+    ROLLUP_KEY = ('project_id', 'status')
+    rollup_delta = staticmethod(rollups.task_delta)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-createdAt', '-id'], name='task_created_idx'),
+            models.Index(fields=['project', '-createdAt', '-id'], name='task_project_created_idx'),
+            models.Index(fields=['assignee', '-createdAt', '-id'], name='task_assignee_created_idx'),
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'), # Project task counts
+            models.Index(fields=['updatedAt'], name='task_updated_idx'), # ?updatedSince=
+        ]
 
     def __str__(self):
         return self.title
@@ -71,48 +177,284 @@ class Invoice(models.Model):
     items = models.TextField() # JSON string
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=50, default='Draft')
-    date = models.CharField(max_length=50, default='') # Legacy used default NOW, but as string.
+    date = models.DateField(default=date.today)
     createdAt = models.DateTimeField(auto_now_add=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='invoice_date_idx'),
+            models.Index(fields=['-createdAt', '-id'], name='invoice_created_idx'),
+            models.Index(fields=['status', 'project'], name='invoice_status_project_idx'), # Outstanding totals
+            models.Index(fields=['updatedAt'], name='invoice_updated_idx'), # ?updatedSince=
+        ]
 
     def __str__(self):
         return f"Invoice {self.id}"
 
+# Transaction customIds: 10 uppercase letters, allocated in blocks from IdSequence
+# (one UPDATE per TRANSACTION_ID_BLOCK ids, no per-row uniqueness probe), then
+# scrambled with a multiplier coprime to 26 so they still look random. A block
+# wanted inside a transaction is reserved on a connection of its own, which
+# commits at once, so the IdSequence row lock isn't held until the caller
+# commits (a rollback leaves a gap). SQLite has one writer at a time anyway, so
+# there the block comes out of the caller's transaction and what it didn't use
+# is handed to the other writers only once that commits.
+TRANSACTION_ID_LENGTH = 10
+TRANSACTION_ID_SPACE = 26 ** TRANSACTION_ID_LENGTH
+TRANSACTION_ID_MULTIPLIER = 25214903917 # Odd and not a multiple of 13, so the scramble is a bijection
+TRANSACTION_ID_BLOCK = 1000
+ID_BLOCK_ALIAS = 'id-block'
+
+def encode_transaction_id(n):
+    n = (n * TRANSACTION_ID_MULTIPLIER) % TRANSACTION_ID_SPACE
+    letters = []
+    for _ in range(TRANSACTION_ID_LENGTH):
+        n, r = divmod(n, 26)
+        letters.append(chr(ord('A') + r))
+    return ''.join(reversed(letters))
+
+class _TransactionIdBlock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next = self.end = 0
+
+    def take(self, count):
+        with self.lock:
+            if self.end - self.next >= count:
+                values = range(self.next, self.next + count)
+                self.next += count
+                return [encode_transaction_id(v) for v in values]
+            size = max(count, TRANSACTION_ID_BLOCK)
+            if not connection.in_atomic_block:
+                high = IdSequence.reserve('TXN', 0, size)
+            elif connection.vendor != 'sqlite':
+                high = IdSequence.reserve('TXN', 0, size, using=self.side_connection())
+            else:
+                # Could still roll back: the rest of the block is only shared once it can't
+                high = IdSequence.reserve('TXN', 0, size)
+                values = range(high - size + 1, high - size + 1 + count)
+                transaction.on_commit(lambda: self.offer(values.stop, high + 1))
+                return [encode_transaction_id(v) for v in values]
+            values = range(high - size + 1, high - size + 1 + count)
+            self.next, self.end = values.stop, high + 1
+            return [encode_transaction_id(v) for v in values]
+
+    def offer(self, start, end):
+        with self.lock:
+            if self.next >= self.end: # Otherwise the spare ids become a gap
+                self.next, self.end = start, end
+
+    @staticmethod
+    def side_connection():
+        # One per thread, like connections['default'], but never inside the caller's transaction
+        try:
+            side = connections[ID_BLOCK_ALIAS]
+        except ConnectionDoesNotExist:
+            side = connections[ID_BLOCK_ALIAS] = connections.create_connection(DEFAULT_DB_ALIAS)
+        side.close_if_unusable_or_obsolete()
+        return ID_BLOCK_ALIAS
+
+_transaction_ids = _TransactionIdBlock()
+
+def new_transaction_ids(count):
+    return _transaction_ids.take(count)
+
+class TransactionManager(RollupManager):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        missing = [obj for obj in objs if not obj.customId]
+        for obj, custom_id in zip(missing, new_transaction_ids(len(missing))):
+            obj.customId = custom_id
+        return super().bulk_create(objs, *args, **kwargs)
+
 # Transaction Model
-class Transaction(models.Model):
+class Transaction(RollupTracked):
     TYPES = [('income', 'income'), ('expense', 'expense')]
     
     type = models.CharField(max_length=20, choices=TYPES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.CharField(max_length=100)
     description = models.CharField(max_length=255)
-    date = models.CharField(max_length=50)
+    date = models.DateTimeField()
     project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
     employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
     invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name='transaction_record')
     customId = models.CharField(max_length=20, unique=True, null=True, blank=True)
     createdAt = models.DateTimeField(auto_now_add=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    objects = TransactionManager()
+
+    ROLLUP_KEY = ('project_id', 'type', 'amount')
+    rollup_delta = staticmethod(rollups.transaction_delta)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='txn_date_idx'),
+            models.Index(fields=['project', 'date'], name='txn_project_date_idx'),
+            models.Index(fields=['employee', 'date'], name='txn_employee_date_idx'),
+            models.Index(fields=['-createdAt', '-id'], name='txn_created_idx'),
+            models.Index(fields=['project', '-createdAt', '-id'], name='txn_project_created_idx'),
+            models.Index(fields=['employee', '-createdAt', '-id'], name='txn_employee_created_idx'),
+            models.Index(fields=['type', 'date'], name='txn_type_date_idx'),
+            # Covers the per-project income/expense sums without touching the table
+            models.Index(fields=['project', 'type', 'amount'], name='txn_project_type_amount_idx'),
+            models.Index(fields=['updatedAt'], name='txn_updated_idx'), # ?updatedSince=
+        ]
 
     def save(self, *args, **kwargs):
         if not self.customId:
-            import random, string
-            while True:
-                # 10 digit random alphabets (Uppercased for readability)
-                new_id = ''.join(random.choices(string.ascii_uppercase, k=10))
-                if not Transaction.objects.filter(customId=new_id).exists():
-                    self.customId = new_id
-                    break
+            self.customId = new_transaction_ids(1)[0]
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.type} - {self.amount} ({self.customId})"
 
+@receiver(pre_delete, sender=Task)
+@receiver(pre_delete, sender=Transaction)
+def lock_rollup_key(sender, instance, **kwargs):
+    # A copy that another request already deleted must not be subtracted twice
+    instance._stored_rollup_key = instance.stored_rollup_key()
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Transaction)
+def remove_from_rollup(sender, instance, **kwargs):
+    # Runs inside the deleting collector's transaction, once per row, including cascades
+    rollups.changed(instance, instance._stored_rollup_key, None)
+
+# Deleted rows, so ?updatedSince= can tell clients what to drop; pruned after
+# SYNC['TOMBSTONE_RETENTION_DAYS'] (prune_tombstones)
+class Tombstone(models.Model):
+    resource = models.CharField(max_length=50) # model_name, e.g. 'transaction'
+    objectId = models.IntegerField()
+    deletedAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'deletedAt'], name='tombstone_resource_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource} {self.objectId} deleted"
+
+    @classmethod
+    def record(cls, *targets):
+        """Record (and return) tombstones for model instances and/or querysets about to be deleted."""
+        rows = []
+        for target in targets:
+            if isinstance(target, models.Model):
+                rows.append(cls(resource=target._meta.model_name, objectId=target.pk))
+            else:
+                resource = target.model._meta.model_name
+                rows.extend(cls(resource=resource, objectId=pk) for pk in target.values_list('pk', flat=True).iterator())
+        return cls.objects.bulk_create(rows, batch_size=1000)
+
+# One row per paid month; the unique month makes re-running payroll a no-op
+class PayrollRun(models.Model):
+    month = models.CharField(max_length=7, unique=True) # YYYY-MM
+    employeeCount = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    runBy = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True, related_name='payroll_runs')
+    createdAt = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Payroll {self.month}"
+
+# A project/employee delete too large for one request, run in chunks by api/purge.py
+class PurgeJob(models.Model):
+    STATUSES = [('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')]
+    resource = models.CharField(max_length=50) # model_name of the deleted object: 'project' or 'employee'
+    objectId = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    total = models.IntegerField(default=0) # Dependent rows counted when the job was queued
+    deleted = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    requestedBy = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True, related_name='purge_jobs')
+    createdAt = models.DateTimeField(auto_now_add=True)
+    startedAt = models.DateTimeField(null=True, blank=True)
+    finishedAt = models.DateTimeField(null=True, blank=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'objectId', 'status'], name='purge_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"Purge {self.resource} {self.objectId} ({self.status})"
+
 # Activity Log
 class ActivityLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_logs')
     action = models.CharField(max_length=100)
     details = models.TextField(null=True, blank=True)
     ip = models.CharField(max_length=50, null=True, blank=True)
-    createdAt = models.DateTimeField(auto_now_add=True)
+    createdAt = models.DateTimeField(default=timezone.now, editable=False) # When it happened, not when the writer got to it
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-createdAt', '-id'], name='activity_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.action} by {self.user.username}"
+
+# Per-prefix, per-year counters for customIds like E-001-2026 / P-00001-2026
+class IdSequence(models.Model):
+    prefix = models.CharField(max_length=10)
+    year = models.IntegerField()
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'year'], name='unique_id_sequence'),
+        ]
+
+    def __str__(self):
+        return f"{self.prefix}-{self.year}: {self.value}"
+
+    @classmethod
+    def reserve(cls, prefix, year, count=1, seed=None, using=DEFAULT_DB_ALIAS):
+        """
+        Atomically advance the counter by `count` and return the new value; the
+        caller owns (value - count, value]. The UPDATE takes the row lock, so
+        concurrent workers serialize on it instead of racing to the same id.
+        `seed()` supplies the starting value the first time a prefix/year is seen.
+        """
+        rows = cls.objects.using(using)
+        with transaction.atomic(using=using):
+            if not rows.filter(prefix=prefix, year=year).update(value=F('value') + count):
+                try:
+                    with transaction.atomic(using=using):
+                        rows.create(prefix=prefix, year=year, value=(seed() if seed else 0) + count)
+                except IntegrityError:
+                    # Another worker created it first
+                    rows.filter(prefix=prefix, year=year).update(value=F('value') + count)
+            return rows.get(prefix=prefix, year=year).value
+
+    @classmethod
+    def next_value(cls, prefix, year, seed=None):
+        return cls.reserve(prefix, year, 1, seed)
+
+
+def scan_custom_id_sequences(model, prefix):
+    # {year: highest seq} parsed from existing customIds ("<prefix>-<seq>-<year>")
+    highest = {}
+    for custom_id in model.objects.filter(customId__startswith=f"{prefix}-").values_list('customId', flat=True).iterator():
+        parts = custom_id.split('-')
+        if len(parts) == 3:
+            try:
+                seq, year = int(parts[1]), int(parts[2])
+            except ValueError:
+                continue
+            highest[year] = max(highest.get(year, 0), seq)
+    return highest
+
+
+def next_custom_id(model, prefix, width, year):
+    """Allocate the next "<prefix>-<seq>-<year>" id for `model`."""
+    # An unseeded counter continues from whatever ids already exist
+    seed = lambda: scan_custom_id_sequences(model, prefix).get(year, 0)
+    seq = IdSequence.next_value(prefix, year, seed=seed)
+    return f"{prefix}-{str(seq).zfill(width)}-{year}"
@@ -0,0 +1,105 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def pagination_setting(name, default):
+    return getattr(settings, 'API_PAGINATION', {}).get(name, default)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination on the queryset's leading sort key plus id,
+    e.g. (-createdAt, id). Each page is a single indexed range scan, so the
+    cost doesn't grow with how deep the client has walked.
+
+    Opt-in: a request without ?limit= or ?cursor= gets the full list, unless
+    API_PAGINATION['ALLOW_UNPAGINATED'] is switched off.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (self.limit_query_param not in params and self.cursor_query_param not in params
+                and pagination_setting('ALLOW_UNPAGINATED', True)):
+            return None
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.field, self.descending = self.get_sort_key(queryset)
+
+        prefix = '-' if self.descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            value, pk = self.decode_cursor(cursor)
+            op = 'lt' if self.descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'id__{op}': pk})
+            )
+
+        page = list(queryset[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_limit(self, request):
+        default = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 50
+        max_limit = pagination_setting('MAX_LIMIT', 500)
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, default))
+        except (TypeError, ValueError):
+            limit = default
+        return max(1, min(limit, max_limit))
+
+    def get_sort_key(self, queryset):
+        ordering = queryset.query.order_by or ('-createdAt',)
+        key = ordering[0]
+        return key.lstrip('-'), key.startswith('-')
+
+    def encode_cursor(self, obj):
+        # obj is a model instance, or a .values() row from the list fast path
+        value, pk = (obj[self.field], obj['id']) if isinstance(obj, dict) else (getattr(obj, self.field), obj.pk)
+        payload = json.dumps([value.isoformat(), pk]).encode()
+        return urlsafe_b64encode(payload).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = json.loads(urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(value), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
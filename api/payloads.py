@@ -0,0 +1,129 @@
+"""
+Structured, sampled logging of request payloads (the api.payloads logger).
+
+log_payload() writes one JSON line per event with the request's method, path,
+user and body. Fields named in PAYLOAD_LOG['REDACT'] are masked at any depth,
+long values are truncated, and only a SAMPLE_RATE share of requests is logged
+(decided once per request, so a request's events stay together). Warnings
+and errors are always logged.
+
+settings.LOGGING sends the logger to QueuedRotatingFileHandler: the request
+thread only builds the payload dict and enqueues the record; a background
+listener thread formats it and writes the file, so a request never waits on
+JSON encoding or disk. When the queue is full, records are dropped rather
+than blocking.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+
+from django.conf import settings
+
+from .workers import LazyWorker
+
+logger = logging.getLogger('api.payloads')
+
+REDACTED = '[REDACTED]'
+
+
+def payload_setting(name, default):
+    return getattr(settings, 'PAYLOAD_LOG', {}).get(name, default)
+
+
+def redact(value, fields, limit):
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in fields else redact(item, fields, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item, fields, limit) for item in value]
+    if isinstance(value, str) and len(value) > limit:
+        return f'{value[:limit]}... ({len(value)} chars)'
+    return value
+
+
+def request_body(request):
+    data = request.data
+    if hasattr(data, 'lists'): # QueryDict from a form or multipart body
+        return {key: values if len(values) > 1 else values[0] for key, values in data.lists()}
+    return data
+
+
+def sampled(request):
+    decision = getattr(request, '_payload_sampled', None)
+    if decision is None:
+        decision = request._payload_sampled = random.random() < payload_setting('SAMPLE_RATE', 1.0)
+    return decision
+
+
+def log_payload(request, event, level=logging.INFO, body=True, **fields):
+    """Log `event` for this request (plus any extra `fields`) if the request is sampled or level >= WARNING."""
+    if not logger.isEnabledFor(level) or (level < logging.WARNING and not sampled(request)):
+        return
+    redacted = {name.lower() for name in payload_setting('REDACT', ())}
+    limit = payload_setting('MAX_VALUE_LENGTH', 1000)
+    user = getattr(request, 'user', None)
+    logger.log(level, event, extra={'payload': {
+        'event': event,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': user.pk if user is not None and user.is_authenticated else None,
+        **({'body': redact(request_body(request), redacted, limit)} if body else {}),
+        **redact(fields, redacted, limit),
+    }})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger and the record's payload (or message)."""
+
+    def format(self, record):
+        entry = {'time': self.formatTime(record), 'level': record.levelname, 'logger': record.name}
+        entry.update(getattr(record, 'payload', None) or {'message': record.getMessage()})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class QueuedRotatingFileHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler in front of a size-rotated file, drained by a LazyWorker
+    (api/workers.py) that starts with the first record.
+    """
+
+    def __init__(self, filename, maxBytes=10 * 1024 * 1024, backupCount=5, maxQueue=10000, encoding='utf-8'):
+        super().__init__(queue.Queue(maxsize=maxQueue))
+        self.target = logging.handlers.RotatingFileHandler(filename, maxBytes=maxBytes, backupCount=backupCount,
+                                                           encoding=encoding, delay=True)
+        self.listener = LazyWorker(self._drain, 'payload-log-writer', on_start=self._new_queue)
+        self.dropped = 0
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt) # Formatting happens on the listener thread
+
+    def prepare(self, record):
+        # The queue stays in this process, so the record needs no pickling; just
+        # freeze the message, as QueueHandler does, before the caller's args change
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        self.listener.ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self): # Also run by logging.shutdown() at exit
+        if self.listener.running:
+            self.queue.put(None) # After everything already queued
+            self.listener.stop()
+        self.target.close()
+        super().close()
+
+    def _new_queue(self):
+        if self.listener.pid is not None: # Forked: the inherited queue belongs to the parent's listener
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+
+    def _drain(self):
+        while (record := self.queue.get()) is not None:
+            self.target.handle(record)
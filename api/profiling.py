@@ -0,0 +1,117 @@
+"""
+Profiles for ProfilerMiddleware (api/middleware.py), which runs a single
+admin request under cProfile and a stack sampler.
+
+Each profile is written to PROFILER['DIRECTORY'] as three files:
+
+    <id>.pstats      python -m pstats <file>, snakeviz, etc.
+    <id>.collapsed   "frame;frame;frame samples" lines for flamegraph.pl,
+                     speedscope or inferno
+    <id>.sql         the request's SQL statements with their timings
+
+cProfile only records caller/callee pairs, which can't be turned back into
+stacks through Django's recursive middleware chain, so the collapsed stacks
+come from sampling the request thread every SAMPLE_INTERVAL_MS instead. While
+the request holds the GIL a sample can wait for the interpreter's switch
+interval (5 ms), so expect roughly 200 samples per second of CPU time.
+"""
+import logging
+import pstats
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger('api.profiling')
+
+
+def profiler_setting(name, default):
+    return getattr(settings, 'PROFILER', {}).get(name, default)
+
+
+def frame_label(func):
+    filename, lineno, name = func
+    if filename == '~':
+        return name # Builtins: "<built-in method time.sleep>"
+    path = Path(filename)
+    try:
+        short = path.relative_to(settings.BASE_DIR)
+    except ValueError:
+        short = Path(*path.parts[-2:])
+    return f'{name} ({short}:{lineno})'.replace(';', ':')
+
+
+class StackSampler(threading.Thread):
+    """Counts the Python stacks one thread is in, below a boundary frame, every interval."""
+
+    def __init__(self, boundaries, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.boundaries = boundaries # Code objects whose callers aren't part of the request
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and frame.f_code not in self.boundaries:
+                code = frame.f_code
+                labels.append(frame_label((code.co_filename, code.co_firstlineno, code.co_name)))
+                frame = frame.f_back
+            if frame is not None and labels: # Outside the boundary: between streamed chunks
+                self.stacks[';'.join(reversed(labels))] += 1
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.stacks.items()))
+
+
+def top_functions(stats, limit):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{
+        'function': frame_label(func),
+        'calls': calls,
+        'ownMs': round(own * 1000, 3),
+        'cumulativeMs': round(cumulative * 1000, 3),
+    } for func, (_, calls, own, cumulative, _) in rows]
+
+
+def build_report(profile_id, request, status, seconds, profiler, sampler, probe):
+    stats = pstats.Stats(profiler)
+    return stats, {
+        'profileId': profile_id,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': status,
+        'durationMs': round(seconds * 1000, 3),
+        'dbMs': round(probe.seconds * 1000, 3),
+        'queryCount': probe.count,
+        'queries': [{'ms': round(elapsed * 1000, 3), 'sql': sql} for elapsed, sql in probe.statements],
+        'functions': top_functions(stats, profiler_setting('TOP_FUNCTIONS', 30)),
+        'samples': sum(sampler.stacks.values()),
+        'collapsed': sampler.collapsed(),
+    }
+
+
+def save_report(stats, report):
+    directory = Path(profiler_setting('DIRECTORY', ''))
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        base = directory / report['profileId']
+        stats.dump_stats(base.with_suffix('.pstats'))
+        base.with_suffix('.collapsed').write_text(report['collapsed'])
+        lines = [f"{report['method']} {report['path']} -> {report['status']}: {report['durationMs']:.1f} ms, "
+                 f"{report['queryCount']} queries, {report['dbMs']:.1f} ms in the database"]
+        lines += [f"{query['ms']:8.1f} ms  {query['sql']}" for query in report['queries']]
+        if report['queryCount'] > len(report['queries']):
+            lines.append(f"... {report['queryCount'] - len(report['queries'])} more")
+        base.with_suffix('.sql').write_text('\n'.join(lines) + '\n')
+    except OSError:
+        logger.exception('Could not write profile %s', report['profileId'])
@@ -0,0 +1,208 @@
+"""
+Cascade deletes for projects and employees, and the background purge jobs
+that take over when a cascade is too big for one request.
+
+QuerySet.delete() loads every row it removes so it can emulate ON DELETE and
+send post_delete, which keeps ProjectRollup current one row at a time. Here
+the dependent rows' pks are read and locked (SELECT ... FOR UPDATE) instead,
+and each batch of CHUNK_SIZE pks goes with one GROUP BY for the rollup change
+and one DELETE ... WHERE id IN, so the rows subtracted are exactly the rows
+deleted even under READ COMMITTED. SET_NULL references are cleared with one
+UPDATE that also moves their updatedAt, and tombstones, change events and
+cache bumps are recorded as before. A row added after the pks were read is
+left for the collector when the object itself is deleted.
+
+Cascades over PURGE['THRESHOLD'] rows become a PurgeJob. It deletes
+CHUNK_SIZE rows per transaction (rollups stay exact after every chunk) and
+records its progress on the job row, then deletes whatever is left, and the
+object itself, in a final transaction. Until then the object stays visible.
+'thread' mode runs jobs one at a time on a daemon thread in the process that
+queued them; 'sync' runs them when the queuing request commits, which is what
+the tests use. run_purge_jobs picks up jobs a restart left unfinished.
+"""
+import atexit
+import logging
+import queue
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from . import rollups
+from .cache import response_cache
+from .events import publish_changes
+from .workers import LazyWorker
+
+logger = logging.getLogger('api.purge')
+
+
+def purge_setting(name, default):
+    return getattr(settings, 'PURGE', {}).get(name, default)
+
+
+def dependents(instance):
+    """Querysets of the rows deleted along with `instance`, in deletion order."""
+    from .models import Project, Employee, Task, Invoice, Transaction
+    if isinstance(instance, Project):
+        return [Transaction.objects.filter(project=instance), Invoice.objects.filter(project=instance),
+                Task.objects.filter(project=instance)]
+    if isinstance(instance, Employee):
+        return [Task.objects.filter(assignee=instance), Transaction.objects.filter(employee=instance)]
+    raise TypeError(f'No purge cascade for {type(instance).__name__}')
+
+
+def cascade_size(instance):
+    return sum(rows.count() for rows in dependents(instance))
+
+
+def record_deletes(*targets):
+    """Tombstone and announce instances and/or querysets that are about to be deleted."""
+    from .models import Tombstone
+    publish_changes([(t.resource, t.objectId, 'delete', t.deletedAt) for t in Tombstone.record(*targets)])
+
+
+def rollup_deltas(rows):
+    """Rollup deltas for deleting `rows` (Tasks or Transactions), from one GROUP BY."""
+    from .models import Task, Transaction
+    deltas = rollups._deltas()
+    if rows.model is Transaction:
+        for row in rows.order_by().values('project_id', 'type').annotate(total=Sum('amount')):
+            rollups.transaction_delta(deltas, (row['project_id'], row['type'], row['total']), -1)
+    elif rows.model is Task:
+        for row in rows.order_by().values('project_id', 'status').annotate(n=Count('pk')):
+            rollups.task_delta(deltas, (row['project_id'], row['status']), -row['n'])
+    return deltas
+
+
+def locked_pks(rows, limit=None):
+    """The pks of `rows` (the first `limit`), locked until the transaction ends."""
+    pks = rows.select_for_update().order_by('pk').values_list('pk', flat=True)
+    return list(pks[:limit] if limit else pks)
+
+
+def clear_invoice(invoice_pks):
+    # Transaction.invoice is on_delete=SET_NULL; the rows change, so move updatedAt and announce them
+    from .models import Transaction
+    pks = locked_pks(Transaction.objects.filter(invoice_id__in=invoice_pks))
+    if pks:
+        now = timezone.now()
+        Transaction.objects.filter(pk__in=pks).update(invoice=None, updatedAt=now)
+        publish_changes([('transaction', pk, 'update', now) for pk in pks])
+
+
+def delete_pks(model, pks):
+    """Delete the `model` rows with these (locked) pks without the collector; returns how many went."""
+    from .models import Invoice
+    if not pks:
+        return 0
+    rows = model.objects.filter(pk__in=pks)
+    if model is Invoice:
+        clear_invoice(pks)
+    deltas = rollup_deltas(rows)
+    record_deletes(rows)
+    with connections[rows.db].cursor() as cursor:
+        quote = cursor.db.ops.quote_name
+        cursor.execute(f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} IN '
+                       f'({", ".join(["%s"] * len(pks))})', pks)
+        count = cursor.rowcount
+    rollups.apply(deltas)
+    return count
+
+
+def delete_rows(rows):
+    """Delete `rows` CHUNK_SIZE pks at a time and return how many went. Call inside a transaction."""
+    pks = locked_pks(rows)
+    chunk_size = purge_setting('CHUNK_SIZE', 5000)
+    return sum(delete_pks(rows.model, pks[start:start + chunk_size]) for start in range(0, len(pks), chunk_size))
+
+
+def delete_cascade(instance):
+    """Delete `instance` and its dependents; returns the number of dependent rows deleted."""
+    count = sum(delete_rows(rows) for rows in dependents(instance))
+    record_deletes(instance)
+    instance.delete() # The collector only has the object, its rollup row and rows added since their pks were read
+    return count
+
+
+def queue_purge(instance, user):
+    """
+    The unfinished PurgeJob for `instance`, or a new one that starts once the
+    current transaction commits.
+    """
+    from .models import PurgeJob
+    resource = instance._meta.model_name
+    job = PurgeJob.objects.filter(resource=resource, objectId=instance.pk, status__in=['pending', 'running']).first()
+    if job is not None:
+        return job
+    job = PurgeJob.objects.create(resource=resource, objectId=instance.pk, total=cascade_size(instance), requestedBy=user)
+    transaction.on_commit(lambda: purge_worker.submit(job.pk))
+    return job
+
+
+def run(job_id):
+    """Run (or resume) one purge job to completion."""
+    from .models import PurgeJob, Project, Employee
+    job = PurgeJob.objects.filter(pk=job_id).exclude(status__in=['done', 'failed']).first()
+    if job is None:
+        return
+    PurgeJob.objects.filter(pk=job.pk).update(status='running', startedAt=job.startedAt or timezone.now(), updatedAt=timezone.now())
+    model = {'project': Project, 'employee': Employee}[job.resource]
+    chunk_size = purge_setting('CHUNK_SIZE', 5000)
+    try:
+        instance = model.objects.filter(pk=job.objectId).first()
+        if instance is not None:
+            touched = [model] + [rows.model for rows in dependents(instance)]
+            for rows in dependents(instance):
+                while True:
+                    with transaction.atomic():
+                        pks = locked_pks(rows, chunk_size)
+                        if not pks:
+                            break
+                        count = delete_pks(rows.model, pks)
+                        response_cache.bump(rows.model)
+                        PurgeJob.objects.filter(pk=job.pk).update(deleted=F('deleted') + count, updatedAt=timezone.now())
+            with transaction.atomic():
+                # Rows added since their table was emptied go with the object
+                count = delete_cascade(instance)
+                response_cache.bump(*touched)
+                PurgeJob.objects.filter(pk=job.pk).update(deleted=F('deleted') + count)
+        PurgeJob.objects.filter(pk=job.pk).update(status='done', finishedAt=timezone.now(), updatedAt=timezone.now())
+    except Exception as exc:
+        logger.exception('Purge job %s failed', job.pk)
+        PurgeJob.objects.filter(pk=job.pk).update(status='failed', error=str(exc), finishedAt=timezone.now(), updatedAt=timezone.now())
+
+
+class PurgeWorker:
+    """Runs queued purge jobs on a daemon thread, or inline in 'sync' mode."""
+
+    def __init__(self):
+        self.queue = None
+        self.worker = LazyWorker(self._run, 'purge-worker', on_start=self._new_queue)
+
+    def submit(self, job_id):
+        if purge_setting('MODE', 'thread') == 'sync':
+            run(job_id)
+            return
+        self.worker.ensure_started()
+        self.queue.put(job_id)
+
+    def stop(self):
+        self.worker.stop() # A job cut short stays 'running' for run_purge_jobs
+
+    def _new_queue(self):
+        self.queue = queue.Queue()
+
+    def _run(self):
+        while not self.worker.stopping.is_set():
+            try:
+                job_id = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            close_old_connections()
+            run(job_id)
+        connection.close()
+
+
+purge_worker = PurgeWorker()
+atexit.register(purge_worker.stop)
@@ -0,0 +1,77 @@
+"""
+orjson-backed JSON renderer and parser, selected with settings.JSON_BACKEND.
+
+orjson writes datetimes, dates, UUIDs and dict/list/str subclasses
+(ReturnDict, ErrorDetail) natively, in the same text DRF's JSONEncoder
+produces; anything else (Decimal, lazy strings, querysets, ...) goes through
+that encoder's default(), so a response renders the same as with
+rest_framework.renderers.JSONRenderer, only faster. Decimal fields reach the
+renderer as strings already (COERCE_DECIMAL_TO_STRING); a raw Decimal in a
+view's Response (e.g. /finance/summary totals) is still written as a number.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def require_orjson():
+    if orjson is None:
+        raise ImproperlyConfigured("JSON_BACKEND = 'orjson' requires the orjson package")
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None # JSON is binary (utf-8), same as JSONRenderer
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    default = staticmethod(JSONEncoder().default)
+    get_indent = JSONRenderer.get_indent
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        require_orjson()
+        if data is None:
+            return b''
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2 # orjson's only indent width (browsable API, ?indent=)
+        ret = orjson.dumps(data, default=self.default, option=options)
+        # Like JSONRenderer, escape U+2028/U+2029 so the output is valid JavaScript too
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        require_orjson()
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        body = stream.read()
+        try:
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except (orjson.JSONDecodeError, UnicodeDecodeError) as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Prometheus text exposition format for /api/metrics; error responses render as their detail text."""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = f"{data.get('detail', data)}\n"
+        return data.encode(self.charset)
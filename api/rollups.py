@@ -0,0 +1,132 @@
+"""
+Incrementally maintained per-project totals (ProjectRollup).
+
+Every Transaction/Task write applies a delta to its project's rollup row in the
+same database transaction, so /api/projects/ reads one joined row per project
+instead of aggregating the ledger. `fresh_totals` recomputes from raw rows and
+backs the rebuild_rollups / check_rollups commands.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Sum, Count, OuterRef, Subquery, IntegerField, DecimalField, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+ROLLUP_FIELDS = ['income', 'expense', 'taskCount', 'completedTaskCount']
+
+
+def _project_total(model, field, aggregate, output_field, **filters):
+    # Correlated subquery so every total lands in the same SELECT without join fan-out
+    return Subquery(
+        model.objects.filter(project=OuterRef('pk'), **filters)
+        .order_by().values('project')
+        .annotate(total=aggregate(field))
+        .values('total'),
+        output_field=output_field,
+    )
+
+
+def fresh_totals(projects):
+    """Annotate `projects` with totals computed from the raw Transaction/Task rows."""
+    from .models import Transaction, Task
+    amount = DecimalField(max_digits=14, decimal_places=2)
+    return projects.annotate(
+        fresh_income=Coalesce(_project_total(Transaction, 'amount', Sum, amount, type='income'), Value(Decimal(0)), output_field=amount),
+        fresh_expense=Coalesce(_project_total(Transaction, 'amount', Sum, amount, type='expense'), Value(Decimal(0)), output_field=amount),
+        fresh_taskCount=Coalesce(_project_total(Task, 'id', Count, IntegerField()), 0),
+        fresh_completedTaskCount=Coalesce(_project_total(Task, 'id', Count, IntegerField(), status='Completed'), 0),
+    )
+
+
+def apply(deltas):
+    """
+    Add {project_id: {field: delta}} to the rollup rows with F() updates.
+    A project without a rollup row (mid-delete, or never built) is skipped;
+    check_rollups reports it and rebuild_rollups fills it in.
+    """
+    from .models import ProjectRollup
+    for project_id, changes in deltas.items():
+        changes = {field: value for field, value in changes.items() if value}
+        if project_id is None or not changes:
+            continue
+        ProjectRollup.objects.filter(project_id=project_id).update(
+            updatedAt=timezone.now(), **{field: F(field) + value for field, value in changes.items()}
+        )
+
+
+def transaction_delta(deltas, key, sign):
+    project_id, type_, amount = key
+    if project_id is not None and type_ in ('income', 'expense'):
+        deltas[project_id][type_] += sign * Decimal(str(amount or 0))
+
+
+def task_delta(deltas, key, sign):
+    project_id, status = key
+    if project_id is not None:
+        deltas[project_id]['taskCount'] += sign
+        if status == 'Completed':
+            deltas[project_id]['completedTaskCount'] += sign
+
+
+def _deltas():
+    return defaultdict(lambda: defaultdict(int))
+
+
+def changed(obj, old, new):
+    """Move `obj`'s contribution from key `old` to key `new` (either may be None)."""
+    if old != new:
+        deltas = _deltas()
+        if old is not None:
+            obj.rollup_delta(deltas, old, -1)
+        if new is not None:
+            obj.rollup_delta(deltas, new, 1)
+        apply(deltas)
+
+
+def created(objs):
+    deltas = _deltas()
+    for obj in objs:
+        obj.rollup_delta(deltas, obj.rollup_key(), 1)
+    apply(deltas)
+
+
+def rebuild(project_ids=None, batch_size=1000):
+    """
+    Recompute rollups from raw rows (all projects, or just `project_ids`) and
+    return how many were written. Each batch locks its rollup rows first, so a
+    concurrent write either lands before the recount or applies its delta after.
+    """
+    from django.db import transaction
+    from .models import Project, ProjectRollup
+    projects = Project.objects.order_by('pk')
+    if project_ids is not None:
+        projects = projects.filter(pk__in=project_ids)
+    ids = list(projects.values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        with transaction.atomic():
+            list(ProjectRollup.objects.select_for_update().filter(project_id__in=chunk).values_list('pk'))
+            now = timezone.now()
+            rows = [
+                ProjectRollup(project_id=project.pk, updatedAt=now, **{f: getattr(project, f'fresh_{f}') for f in ROLLUP_FIELDS})
+                for project in fresh_totals(Project.objects.filter(pk__in=chunk)).only('pk')
+            ]
+            ProjectRollup.objects.bulk_create(rows, update_conflicts=True, unique_fields=['project'], update_fields=ROLLUP_FIELDS + ['updatedAt'])
+    return len(ids)
+
+
+def drift(batch_size=1000):
+    """Yield (project_id, {field: (stored, fresh)}) for every rollup that disagrees with the raw rows."""
+    from .models import Project
+    projects = fresh_totals(Project.objects.order_by('pk').select_related('rollup'))
+    for project in projects.iterator(chunk_size=batch_size):
+        rollup = getattr(project, 'rollup', None)
+        diffs = {}
+        for field in ROLLUP_FIELDS:
+            stored = getattr(rollup, field) if rollup else None
+            fresh = getattr(project, f'fresh_{field}')
+            if stored != fresh:
+                diffs[field] = (stored, fresh)
+        if diffs:
+            yield project.pk, diffs
@@ -1,7 +1,29 @@
 from rest_framework import serializers
-from .models import User, Employee, Project, Task, Invoice, Transaction, ActivityLog
+from .models import User, Employee, Project, ProjectRollup, Task, Invoice, Transaction, ActivityLog, PurgeJob
+from .dates import parse_legacy_datetime
 import json
 
+# Date columns used to be free-form strings; keep accepting what clients already
+# send ("2026-01-05", "2026-01-05T13:53:31.244Z", "" for no date, ...).
+class LegacyDateTimeField(serializers.DateTimeField):
+    def to_internal_value(self, value):
+        parsed = parse_legacy_datetime(value)
+        if parsed is None:
+            self.fail('invalid', format='ISO 8601')
+        return parsed
+
+class LegacyDateField(serializers.DateField):
+    def validate_empty_values(self, data):
+        if data == '' and self.allow_null:
+            return (True, None)
+        return super().validate_empty_values(data)
+
+    def to_internal_value(self, value):
+        parsed = parse_legacy_datetime(value)
+        if parsed is None:
+            self.fail('invalid', format='YYYY-MM-DD')
+        return parsed.date()
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -22,6 +44,7 @@ class EmployeeSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class ProjectSerializer(serializers.ModelSerializer):
+    startDate = LegacyDateField(required=False, allow_null=True)
     actualIncome = serializers.SerializerMethodField()
     actualExpenses = serializers.SerializerMethodField()
     remainingBudget = serializers.SerializerMethodField()
@@ -33,13 +56,33 @@ class ProjectSerializer(serializers.ModelSerializer):
         model = Project
         fields = '__all__'
 
+    # Totals come from the project's ProjectRollup row (select_related by
+    # ProjectViewSet.get_queryset); a project without one falls back to querying directly.
+    def _rollup(self, obj):
+        try:
+            return obj.rollup
+        except ProjectRollup.DoesNotExist:
+            return None
+
+    def _sum_amount(self, obj, type_):
+        rollup = self._rollup(obj)
+        if rollup is not None:
+            return getattr(rollup, type_) or 0
+        return sum(t.amount for t in obj.transactions.all() if t.type == type_)
+
+    def _task_counts(self, obj):
+        rollup = self._rollup(obj)
+        if rollup is not None:
+            return rollup.taskCount, rollup.completedTaskCount
+        return obj.tasks.count(), obj.tasks.filter(status='Completed').count()
+
     def get_actualIncome(self, obj):
         # Sum of income transactions
-        return sum(t.amount for t in obj.transactions.all() if t.type == 'income')
+        return self._sum_amount(obj, 'income')
 
     def get_actualExpenses(self, obj):
         # Sum of expense transactions
-        return sum(t.amount for t in obj.transactions.all() if t.type == 'expense')
+        return self._sum_amount(obj, 'expense')
 
     def get_remainingBudget(self, obj):
         # Budget (income field in project) - Actual Expenses
@@ -47,15 +90,14 @@ class ProjectSerializer(serializers.ModelSerializer):
         return (obj.income or 0) - expenses
 
     def get_taskCount(self, obj):
-        return obj.tasks.count()
+        return self._task_counts(obj)[0]
 
     def get_completedTaskCount(self, obj):
-        return obj.tasks.filter(status='Completed').count()
+        return self._task_counts(obj)[1]
 
     def get_progress(self, obj):
-        total = obj.tasks.count()
+        total, completed = self._task_counts(obj)
         if total == 0: return 0
-        completed = obj.tasks.filter(status='Completed').count()
         return round((completed / total) * 100)
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -77,6 +119,7 @@ class TaskSerializer(serializers.ModelSerializer):
 class InvoiceSerializer(serializers.ModelSerializer):
     items_json = serializers.JSONField(source='items', required=False) # Helper to handle JSON parsing if needed
     projectId = serializers.ReadOnlyField(source='project_id')
+    date = LegacyDateField(required=False)
 
     class Meta:
         model = Invoice
@@ -106,11 +149,28 @@ class InvoiceSerializer(serializers.ModelSerializer):
             data['items'] = json.dumps(data['items'])
         return super().to_internal_value(data)
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    # Resolves pks from context['preloaded'][field_name] (a pk -> instance map
+    # built with in_bulk) so validating a batch doesn't cost a query per row.
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.field_name)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        try:
+            return preloaded[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
 class TransactionSerializer(serializers.ModelSerializer):
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     employeeId = serializers.ReadOnlyField(source='employee_id')
     projectId = serializers.ReadOnlyField(source='project_id')
     project_details = serializers.SerializerMethodField()
     employee_details = serializers.SerializerMethodField()
+    date = LegacyDateTimeField()
 
     class Meta:
         model = Transaction
@@ -147,3 +207,17 @@ class ActivityLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = ActivityLog
         fields = '__all__'
+
+class PurgeJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PurgeJob
+        fields = '__all__'
+
+    def get_progress(self, obj):
+        # Percent of the rows counted when queued; held below 100 until the job is done,
+        # since rows added meanwhile are deleted too
+        if obj.status == 'done':
+            return 100
+        return min(99, obj.deleted * 100 // obj.total) if obj.total else 0
@@ -1,3 +1,1356 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import pstats
+import runpy
+import tempfile
+import threading
+import time
+import asyncio
+from unittest import mock, skipUnless
+from datetime import datetime, timedelta
+from pathlib import Path
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import (User, Employee, Project, ProjectRollup, Task, Invoice, Transaction, ActivityLog, IdSequence, PurgeJob, Tombstone,
+                     TRANSACTION_ID_BLOCK, _TransactionIdBlock, encode_transaction_id, new_transaction_ids)
+from . import rollups
+from .cache import response_cache
+from .events import RedisBackend, Subscription, broker, sse_app
+from .middleware import brotli
+from .metrics import RequestMetrics, request_metrics
+from .payloads import JsonFormatter, QueuedRotatingFileHandler
+from .purge import purge_worker
+from .workers import LazyWorker
+from .audit import AuditSink
+from .dates import date_range_filter, parse_legacy_datetime as day
+from .serializers import ProjectSerializer
+
+
+# The settings default to production behaviour: audit rows and purge jobs off the
+# request thread, every request's payload logged, list responses cached. Tests
+# want writes visible when the request returns and no payloads.log, so they run
+# inline unless a class opts back in (PayloadLogTests, PurgeThreadTests,
+# ResponseCacheTests).
+INLINE = {
+    'ACTIVITY_LOG': {**settings.ACTIVITY_LOG, 'MODE': 'sync'},
+    'PURGE': {**settings.PURGE, 'MODE': 'sync'},
+    'PAYLOAD_LOG': {**settings.PAYLOAD_LOG, 'SAMPLE_RATE': 0},
+    'RESPONSE_CACHE': {**settings.RESPONSE_CACHE, 'ENABLED': False},
+}
+
+
+@override_settings(**INLINE)
+class ApiTestCase(TestCase):
+    def setUp(self):
+        # The test's rollback takes back IdSequence, so no block may outlive it
+        self.enterContext(mock.patch('api.models._transaction_ids', _TransactionIdBlock()))
+        self.user = User.objects.create(username='admin_test', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+
+class FinanceSummaryTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(name='Alpha', client='ACME')
+        self.other = Project.objects.create(name='Beta', client='Globex')
+        Transaction.objects.create(type='income', amount=1000, category='Sales', description='a', date=day('2026-01-10'), project=self.project)
+        Transaction.objects.create(type='expense', amount=300, category='Labor', description='b', date=day('2026-01-15'), project=self.project)
+        Transaction.objects.create(type='income', amount=50, category='Sales', description='c', date=day('2026-02-01'), project=self.other)
+        Invoice.objects.create(items='[]', total=200, status='Pending', date='2026-01-20', project=self.project)
+        Invoice.objects.create(items='[]', total=75, status='Sent', date='2026-01-21', project=self.other)
+        Invoice.objects.create(items='[]', total=999, status='Paid', date='2026-01-22', project=self.project)
+
+    def test_summary_totals(self):
+        res = self.client.get('/api/finance/summary')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['income'], Decimal('1050'))
+        self.assertEqual(res.data['expense'], Decimal('300'))
+        self.assertEqual(res.data['balance'], Decimal('750'))
+        self.assertEqual(res.data['outstandingInvoices'], Decimal('275'))
+        self.assertEqual(len(res.data['recentTransactions']), 3)
+
+    def test_summary_honors_filters(self):
+        res = self.client.get('/api/finance/summary', {'projectId': self.project.id, 'startDate': '2026-01-12', 'endDate': '2026-01-31'})
+        self.assertEqual(res.data['income'], 0)
+        self.assertEqual(res.data['expense'], Decimal('300'))
+        self.assertEqual(res.data['outstandingInvoices'], Decimal('200'))
+
+    def test_summary_is_also_routed_on_transactions(self):
+        res = self.client.get('/api/transactions/summary/', {'type': 'income'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['expense'], 0)
+
+
+class ProjectListQueryTests(ApiTestCase):
+    def _seed_project(self, i):
+        project = Project.objects.create(name=f'P{i}', client='C', income=500)
+        Transaction.objects.create(type='income', amount=100 + i, category='Sales', description='x', date=day('2026-01-01'), project=project)
+        Transaction.objects.create(type='expense', amount=40, category='Labor', description='y', date=day('2026-01-02'), project=project)
+        Task.objects.create(title='t1', project=project, status='Completed')
+        Task.objects.create(title='t2', project=project)
+        return project
+
+    def test_query_count_is_constant(self):
+        # One ETag aggregate plus one SELECT joined to the rollups
+        for i in range(3):
+            self._seed_project(i)
+        with self.assertNumQueries(2):
+            self.client.get('/api/projects/')
+        for i in range(3, 20):
+            self._seed_project(i)
+        with self.assertNumQueries(2):
+            res = self.client.get('/api/projects/')
+        self.assertEqual(len(res.data), 20)
+
+    def test_output_matches_unannotated_serializer(self):
+        self._seed_project(1)
+        Project.objects.create(name='Empty', client='C')
+        res = self.client.get('/api/projects/')
+        ProjectRollup.objects.all().delete() # Serializer falls back to counting the raw rows
+        expected = JSONRenderer().render(ProjectSerializer(Project.objects.order_by('-createdAt'), many=True).data)
+        self.assertEqual(res.content, expected)
+
+
+class ProjectRollupTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alpha = Project.objects.create(name='Alpha', client='C')
+        self.beta = Project.objects.create(name='Beta', client='C')
+        self.employee = Employee.objects.create(name='E', role='Dev')
+
+    def assertNoDrift(self):
+        self.assertEqual(list(rollups.drift()), [])
+
+    def _txn(self, **kwargs):
+        data = {'type': 'income', 'amount': 100, 'category': 'Sales', 'description': 'x', 'date': '2026-01-01', 'projectId': self.alpha.id}
+        data.update(kwargs)
+        res = self.client.post('/api/transactions/', data, format='json')
+        self.assertEqual(res.status_code, 201, res.data)
+        return res.data['id']
+
+    def test_transaction_writes_move_totals(self):
+        txn = self._txn()
+        self._txn(type='expense', amount=30)
+        rollup = ProjectRollup.objects.get(project=self.alpha)
+        self.assertEqual((rollup.income, rollup.expense), (Decimal('100'), Decimal('30')))
+
+        self.client.patch(f'/api/transactions/{txn}/', {'amount': 250}, format='json')
+        self.assertEqual(ProjectRollup.objects.get(project=self.alpha).income, Decimal('250'))
+        self.client.patch(f'/api/transactions/{txn}/', {'type': 'expense'}, format='json')
+        self.assertNoDrift()
+        self.client.patch(f'/api/transactions/{txn}/', {'projectId': self.beta.id}, format='json')
+        self.assertEqual(ProjectRollup.objects.get(project=self.beta).expense, Decimal('250'))
+        self.assertNoDrift()
+        self.client.delete(f'/api/transactions/{txn}/')
+        self.assertEqual(ProjectRollup.objects.get(project=self.beta).expense, 0)
+        self.assertNoDrift()
+
+    def test_task_writes_move_counts(self):
+        res = self.client.post('/api/tasks/', {'title': 'T', 'project': self.alpha.id}, format='json')
+        task = res.data['id']
+        self.client.post('/api/tasks/', {'title': 'U', 'project': self.alpha.id, 'status': 'Completed'}, format='json')
+        res = self.client.get(f'/api/projects/{self.alpha.id}/')
+        self.assertEqual((res.data['taskCount'], res.data['completedTaskCount'], res.data['progress']), (2, 1, 50))
+
+        self.client.patch(f'/api/tasks/{task}/', {'status': 'Completed'}, format='json')
+        self.assertEqual(ProjectRollup.objects.get(project=self.alpha).completedTaskCount, 2)
+        self.client.patch(f'/api/tasks/{task}/', {'project': self.beta.id}, format='json')
+        self.assertEqual(ProjectRollup.objects.get(project=self.beta).taskCount, 1)
+        self.assertNoDrift()
+
+    def test_cascading_deletes_and_bulk_inserts(self):
+        Task.objects.create(title='T', project=self.alpha, assignee=self.employee, status='Completed')
+        self._txn(employeeId=self.employee.id)
+        self._txn(projectId=self.beta.id, employeeId=self.employee.id)
+        rows = [{'type': 'expense', 'amount': 5, 'category': 'Labor', 'description': 'b', 'date': '2026-01-02', 'projectId': self.beta.id}] * 4
+        self.client.post('/api/transactions/bulk/', rows, format='json')
+        self.assertEqual(ProjectRollup.objects.get(project=self.beta).expense, Decimal('20'))
+
+        self.client.delete(f'/api/employees/{self.employee.id}/')
+        self.assertNoDrift()
+        self.assertEqual(ProjectRollup.objects.get(project=self.alpha).taskCount, 0)
+        self.client.delete(f'/api/projects/{self.beta.id}/')
+        self.assertFalse(ProjectRollup.objects.filter(project_id=self.beta.id).exists())
+        self.assertNoDrift()
+
+    def test_stale_copies_do_not_apply_a_delta_twice(self):
+        task = Task.objects.create(title='T', project=self.alpha)
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        first.status = second.status = 'Completed'
+        first.save()
+        second.save()
+        rollup = ProjectRollup.objects.get(project=self.alpha)
+        self.assertEqual((rollup.taskCount, rollup.completedTaskCount), (1, 1))
+
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        first.delete()
+        second.delete()
+        self.assertEqual(ProjectRollup.objects.get(project=self.alpha).taskCount, 0)
+        self.assertNoDrift()
+
+    def test_check_and_rebuild_commands(self):
+        self._txn()
+        ProjectRollup.objects.filter(project=self.alpha).update(income=1)
+        ProjectRollup.objects.filter(project=self.beta).delete()
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('check_rollups', stdout=out)
+        self.assertIn(f'Project {self.alpha.id}: income 1.00 != 100', out.getvalue())
+        call_command('check_rollups', '--fix', stdout=io.StringIO())
+        self.assertNoDrift()
+
+        ProjectRollup.objects.update(taskCount=9)
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        self.assertNoDrift()
+
+
+class ListQueryGrowthTests(ApiTestCase):
+    # Every list endpoint must cost the same number of queries regardless of row count
+    def _seed(self, n):
+        for _ in range(n):
+            project = Project.objects.create(name='P', client='C')
+            employee = Employee.objects.create(name='E', role='Dev')
+            invoice = Invoice.objects.create(items='[{"desc": "x"}]', total=10, project=project)
+            Task.objects.create(title='T', project=project, assignee=employee, cost=5)
+            Transaction.objects.create(type='expense', amount=5, category='Labor', description='d', date=day('2026-01-01'),
+                                       project=project, employee=employee, invoice=invoice)
+            ActivityLog.objects.create(user=self.user, action='TEST', details='d')
+            User.objects.create(username=f'u{User.objects.count()}')
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def test_list_endpoints_do_not_grow_with_result_size(self):
+        urls = ['/api/users/', '/api/employees/', '/api/projects/', '/api/tasks/',
+                '/api/invoices/', '/api/transactions/', f'/api/users/{self.user.id}/activity/']
+        self._seed(2)
+        before = {url: self._count_queries(url) for url in urls}
+        self._seed(10)
+        after = {url: self._count_queries(url) for url in urls}
+        self.assertEqual(before, after)
+
+
+class KeysetPaginationTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(name='P', client='C')
+        for i in range(7):
+            Task.objects.create(title=f'T{i}', project=self.project)
+        # Force createdAt ties so the id tiebreaker is exercised
+        first = Task.objects.order_by('id').first()
+        Task.objects.filter(id__lte=first.id + 3).update(createdAt=first.createdAt)
+
+    def test_unpaginated_by_default(self):
+        res = self.client.get('/api/tasks/')
+        self.assertIsInstance(res.data, list)
+        self.assertEqual(len(res.data), 7)
+
+    def test_walks_all_pages_without_gaps(self):
+        seen = []
+        url = '/api/tasks/?limit=3'
+        while url:
+            res = self.client.get(url)
+            self.assertLessEqual(len(res.data['results']), 3)
+            seen += [t['id'] for t in res.data['results']]
+            url = res.data['next']
+        expected = list(Task.objects.order_by('-createdAt', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_limit_is_capped(self):
+        with self.settings(API_PAGINATION={'MAX_LIMIT': 2}):
+            res = self.client.get('/api/tasks/?limit=1000')
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_compatibility_switch_forces_pages(self):
+        with self.settings(API_PAGINATION={'ALLOW_UNPAGINATED': False}):
+            res = self.client.get('/api/tasks/')
+        self.assertIn('results', res.data)
+
+    def test_invalid_cursor(self):
+        res = self.client.get('/api/tasks/?cursor=garbage')
+        self.assertEqual(res.status_code, 404)
+
+    def test_activity_pages(self):
+        for i in range(4):
+            ActivityLog.objects.create(user=self.user, action='TEST', details=str(i))
+        res = self.client.get(f'/api/users/{self.user.id}/activity/?limit=3')
+        self.assertEqual(len(res.data['results']), 3)
+        res = self.client.get(res.data['next'])
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+
+
+class ExportTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        project = Project.objects.create(name='Alpha', client='ACME')
+        Transaction.objects.create(type='income', amount=100, category='Sales', description='a, "quoted"', date=day('2026-01-10'), project=project)
+        Transaction.objects.create(type='expense', amount=30, category='Labor', description='b', date=day('2026-02-10'))
+        ActivityLog.objects.create(user=self.user, action='LOGIN', details='User logged in')
+
+    def _body(self, res):
+        self.assertTrue(res.streaming)
+        return b''.join(res.streaming_content).decode()
+
+    def test_transactions_ndjson_matches_list(self):
+        res = self.client.get('/api/transactions/export/')
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._body(res).splitlines()]
+        self.assertEqual(rows, json.loads(self.client.get('/api/transactions/').content))
+
+    def test_transactions_csv_with_filters(self):
+        res = self.client.get('/api/transactions/export/', {'exportFormat': 'csv', 'type': 'income'})
+        rows = list(csv.DictReader(io.StringIO(self._body(res))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['description'], 'a, "quoted"')
+        self.assertEqual(json.loads(rows[0]['project_details'])['name'], 'Alpha')
+
+    def test_activity_export(self):
+        res = self.client.get(f'/api/users/{self.user.id}/activity/export/', {'exportFormat': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(self._body(res))))
+        self.assertEqual([r['action'] for r in rows], ['LOGIN'])
+        self.assertEqual(rows[0]['username'], 'admin_test')
+
+    def test_activity_export_date_range(self):
+        url = f'/api/users/{self.user.id}/activity/export/'
+        today = timezone.now().date().isoformat()
+        self.assertEqual(len(self._body(self.client.get(url, {'startDate': today, 'endDate': today})).splitlines()), 1)
+        self.assertEqual(self._body(self.client.get(url, {'endDate': '2000-01-01'})), '')
+        res = self.client.get(url, {'startDate': 'garbage'})
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('startDate', res.data)
+
+    def test_transaction_export_rejects_bad_dates(self):
+        res = self.client.get('/api/transactions/export/', {'startDate': '2026-13-45'})
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('startDate', res.data)
+        self.assertEqual(self.client.get('/api/transactions/export/', {'endDate': '2026-01-31'}).status_code, 200)
+
+    async def test_asgi_exports_stream_without_buffering(self):
+        token = RefreshToken.for_user(self.user).access_token
+        with mock.patch('api.middleware.ASYNC_STREAM_BATCH', 1):
+            res = await AsyncClient().get('/api/transactions/export/', headers={'Authorization': f'Bearer {token}'})
+            self.assertTrue(res.is_async) # Not the sync_to_async(list) Django falls back to
+            chunks = [chunk async for chunk in res]
+        self.assertEqual(len(chunks), 2) # One row per hop onto the sync thread
+        self.assertEqual([json.loads(chunk)['type'] for chunk in chunks], ['expense', 'income'])
+
+    def test_unknown_format(self):
+        res = self.client.get('/api/transactions/export/', {'exportFormat': 'xml'})
+        self.assertEqual(res.status_code, 400)
+
+
+class CustomIdSequenceTests(ApiTestCase):
+    def test_employee_ids_continue_from_existing_data(self):
+        year = datetime.now().year
+        Employee.objects.create(name='Old', role='Dev', customId=f'E-007-{year}')
+        res = self.client.post('/api/employees/', {'name': 'A', 'role': 'Dev', 'customId': 'E-999-1999'}, format='json')
+        self.assertEqual(res.data['customId'], f'E-008-{year}')
+        res = self.client.post('/api/employees/', {'name': 'B', 'role': 'Dev'}, format='json')
+        self.assertEqual(res.data['customId'], f'E-009-{year}')
+
+    def test_project_ids(self):
+        year = datetime.now().year
+        res = self.client.post('/api/projects/', {'name': 'A', 'client': 'C'}, format='json')
+        self.assertEqual(res.data['customId'], f'P-00001-{year}')
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post('/api/projects/', {'name': 'B', 'client': 'C'}, format='json')
+        self.assertEqual(res.data['customId'], f'P-00002-{year}')
+        # Allocation no longer scans existing projects
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "api_project"' in q['sql']])
+
+    def test_failed_insert_does_not_burn_an_id(self):
+        res = self.client.post('/api/projects/', {'name': 'A'}, format='json')
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(IdSequence.objects.exists())
+
+    def test_seed_command(self):
+        Project.objects.create(name='A', client='C', customId='P-00042-2025')
+        Project.objects.create(name='B', client='C', customId='P-00003-2026')
+        IdSequence.objects.create(prefix='P', year=2026, value=10)
+        call_command('seed_id_sequences', stdout=io.StringIO())
+        self.assertEqual(IdSequence.objects.get(prefix='P', year=2025).value, 42)
+        self.assertEqual(IdSequence.objects.get(prefix='P', year=2026).value, 10)
+
+
+class TransactionCustomIdTests(ApiTestCase):
+    def test_ids_are_unique_uppercase_and_probe_free(self):
+        with CaptureQueriesContext(connection) as ctx:
+            Transaction.objects.create(type='income', amount=1, category='c', description='d', date=day('2026-01-01'))
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "api_transaction"' in q['sql']])
+        objs = Transaction.objects.bulk_create([
+            Transaction(type='expense', amount=i, category='c', description='d', date=day('2026-01-01')) for i in range(50)
+        ])
+        ids = set(Transaction.objects.values_list('customId', flat=True))
+        self.assertEqual(len(ids), 51)
+        self.assertTrue(all(len(i) == 10 and i.isalpha() and i.isupper() for i in ids))
+        self.assertTrue({o.customId for o in objs} <= ids)
+
+    def test_a_block_reserved_in_a_transaction_is_shared_once_it_commits(self):
+        def create():
+            Transaction.objects.create(type='income', amount=1, category='c', description='d', date=day('2026-01-01'))
+        with CaptureQueriesContext(connection) as first, self.captureOnCommitCallbacks(execute=True):
+            create()
+        with CaptureQueriesContext(connection) as second:
+            create()
+        sequence = lambda ctx: [q for q in ctx.captured_queries if 'api_idsequence' in q['sql']]
+        self.assertTrue(sequence(first))
+        self.assertEqual(sequence(second), [])
+        self.assertEqual(IdSequence.objects.get(prefix='TXN').value, TRANSACTION_ID_BLOCK)
+
+    def test_overlapping_atomic_writers_do_not_wait_on_the_sequence_row(self):
+        # Outside SQLite the block commits on its own connection before the first writer's transaction ends
+        writing = mock.Mock(in_atomic_block=True, vendor='postgresql')
+        with mock.patch('api.models.connection', writing), \
+                mock.patch.object(_TransactionIdBlock, 'side_connection', return_value='id-block'), \
+                mock.patch.object(IdSequence, 'reserve', return_value=TRANSACTION_ID_BLOCK) as reserve:
+            first, second = new_transaction_ids(1), []
+            writer = threading.Thread(target=lambda: second.extend(new_transaction_ids(2)))
+            writer.start()
+            writer.join(5)
+        reserve.assert_called_once_with('TXN', 0, TRANSACTION_ID_BLOCK, using='id-block')
+        self.assertEqual(len(set(first + second)), 3)
+
+    def test_side_connection_is_not_the_callers(self):
+        alias = _TransactionIdBlock.side_connection()
+        self.addCleanup(connections[alias].close)
+        self.assertIsNot(connections[alias], connection)
+        self.assertFalse(connections[alias].in_atomic_block)
+
+    def test_encoding_is_a_bijection_over_a_range(self):
+        encoded = {encode_transaction_id(n) for n in range(1, 20001)}
+        self.assertEqual(len(encoded), 20000)
+
+    def test_task_pay_assigns_id(self):
+        project = Project.objects.create(name='P', client='C')
+        task = Task.objects.create(title='T', project=project, cost=25)
+        res = self.client.post(f'/api/tasks/{task.id}/pay/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(Transaction.objects.get().customId), 10)
+
+
+class BulkTransactionTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(name='P', client='C')
+        self.employees = [Employee.objects.create(name=f'E{i}', role='Dev') for i in range(30)]
+
+    def _rows(self):
+        return [{'type': 'expense', 'amount': 100 + e.id, 'category': 'Salary', 'description': f'Salary {e.name}',
+                 'date': '2026-03-01', 'employeeId': e.id, 'projectId': self.project.id} for e in self.employees]
+
+    def test_bulk_insert_uses_a_handful_of_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post('/api/transactions/bulk/', self._rows(), format='json')
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(res.data['created'], 30)
+        self.assertEqual(Transaction.objects.count(), 30)
+        self.assertEqual(len(set(Transaction.objects.values_list('customId', flat=True))), 30)
+        self.assertEqual(res.data['results'][0]['employee_details']['name'], 'E0')
+        # in_bulk lookups, id block reservation (incl. first-use counter row), one INSERT, one log
+        self.assertLessEqual(len(ctx.captured_queries), 15)
+
+    def test_invalid_rows_commit_nothing(self):
+        rows = self._rows()
+        rows[3]['employeeId'] = 999999
+        del rows[7]['amount']
+        res = self.client.post('/api/transactions/bulk/', rows, format='json')
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual([e['index'] for e in res.data['errors']], [3, 7])
+        self.assertIn('employee', res.data['errors'][0]['errors'])
+        self.assertFalse(Transaction.objects.exists())
+
+
+class PayrollRunTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        Employee.objects.create(name='Fixed', role='Dev', type='fixed', salary=1000)
+        Employee.objects.create(name='Fixed2', role='Dev', type='fixed', salary=2500)
+        Employee.objects.create(name='Inactive', role='Dev', type='fixed', salary=900, status='inactive')
+        Employee.objects.create(name='Freelance', role='Dev', type='freelance', salary=700)
+        Employee.objects.create(name='NoSalary', role='Dev', type='fixed')
+
+    def test_pays_eligible_employees_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post('/api/employees/run-payroll/', {'month': '2026-03'}, format='json')
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual((res.data['count'], res.data['total']), (2, Decimal('3500')))
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('description', flat=True)),
+            ['Monthly Salary - Fixed (March 2026)', 'Monthly Salary - Fixed2 (March 2026)'],
+        )
+        self.assertEqual(ActivityLog.objects.filter(action='RUN_PAYROLL').count(), 1)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'INSERT INTO "api_transaction"' in q['sql']]), 1)
+
+        res = self.client.post('/api/employees/run-payroll/', {'month': '2026-03'}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.data['alreadyRan'])
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_invalid_month(self):
+        res = self.client.post('/api/employees/run-payroll/', {'month': 'March'}, format='json')
+        self.assertEqual(res.status_code, 400)
+
+
+class LazyWorkerTests(SimpleTestCase):
+    def test_starts_once_per_process(self):
+        starts = []
+        worker = LazyWorker(lambda: worker.stopping.wait(), 'test-worker', on_start=lambda: starts.append(os.getpid()))
+        self.addCleanup(worker.stop)
+        worker.ensure_started()
+        first = worker.thread
+        worker.ensure_started()
+        self.assertEqual((worker.thread, len(starts)), (first, 1))
+        with mock.patch('api.workers.os.getpid', return_value=-1): # As seen from a forked child
+            self.assertFalse(worker.running)
+            worker.ensure_started()
+        self.assertIsNot(worker.thread, first)
+        self.assertEqual(len(starts), 2)
+        self.assertTrue(worker.stop()) # Sets stopping, which both threads wait on
+        first.join(5)
+
+
+@override_settings(**INLINE)
+class AuditSinkTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='audit_test', role='admin')
+        self.sink = AuditSink()
+
+    def tearDown(self):
+        self.sink.stop()
+
+    def _entry(self, i):
+        return ActivityLog(user_id=self.user.id, action='TEST', details=str(i), ip='127.0.0.1')
+
+    def test_async_batches_and_flushes(self):
+        with self.settings(ACTIVITY_LOG={'MODE': 'async', 'BATCH_SIZE': 5, 'FLUSH_INTERVAL_MS': 10}):
+            for i in range(12):
+                self.sink.submit(self._entry(i))
+            self.sink.flush()
+        self.assertEqual(ActivityLog.objects.count(), 12)
+        stats = self.sink.stats()
+        self.assertEqual((stats['queued'], stats['written'], stats['dropped'], stats['pending']), (12, 12, 0, 0))
+
+    def test_entries_keep_their_time_and_a_bad_row_only_loses_itself(self):
+        entries = [self._entry(i) for i in range(4)]
+        entries[2].user_id = self.user.id + 1000 # Deleted while the entry sat in the queue
+        stamped = entries[0].createdAt
+        with self.settings(ACTIVITY_LOG={'MODE': 'async', 'BATCH_SIZE': 10, 'FLUSH_INTERVAL_MS': 50}), \
+                self.assertLogs('api.audit', 'WARNING'):
+            for entry in entries:
+                self.sink.submit(entry)
+            self.sink.flush()
+        self.assertEqual(sorted(ActivityLog.objects.values_list('details', flat=True)), ['0', '1', '3'])
+        self.assertEqual(ActivityLog.objects.get(details='0').createdAt, stamped)
+        stats = self.sink.stats()
+        self.assertEqual((stats['written'], stats['failed']), (3, 1))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        gate = threading.Event()
+        write = self.sink._write
+        self.sink._write = lambda entries: (gate.wait(), write(entries))
+        with self.settings(ACTIVITY_LOG={'MODE': 'async', 'BATCH_SIZE': 1, 'MAX_QUEUE': 2, 'FLUSH_INTERVAL_MS': 10}):
+            for i in range(6):
+                self.sink.submit(self._entry(i))
+            gate.set()
+            self.sink.flush()
+        stats = self.sink.stats()
+        self.assertGreaterEqual(stats['dropped'], 1)
+        self.assertEqual(stats['written'] + stats['dropped'], 6)
+        self.assertEqual(ActivityLog.objects.count(), stats['written'])
+
+
+class TypedDateTests(ApiTestCase):
+    def _post(self, date):
+        return self.client.post('/api/transactions/', {'type': 'income', 'amount': 10, 'category': 'c',
+                                                       'description': 'd', 'date': date}, format='json')
+
+    def test_accepts_legacy_string_formats(self):
+        for value in ['2026-01-05', '2026-01-05T13:53:31.244Z', '2026-01-05T13:53:31.244935']:
+            res = self._post(value)
+            self.assertEqual(res.status_code, 201, (value, res.data))
+            self.assertTrue(res.data['date'].startswith('2026-01-05T'))
+        self.assertEqual(self._post('not a date').status_code, 400)
+
+    def test_project_start_date_may_be_blank(self):
+        res = self.client.post('/api/projects/', {'name': 'A', 'client': 'C', 'startDate': ''}, format='json')
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertIsNone(res.data['startDate'])
+
+    def test_date_only_end_date_covers_the_whole_day(self):
+        self._post('2026-01-31T17:00:00Z')
+        self._post('2026-02-01T00:00:00Z')
+        res = self.client.get('/api/transactions/', {'startDate': '2026-01-01', 'endDate': '2026-01-31'})
+        self.assertEqual(len(res.data), 1)
+
+    def test_range_query_uses_an_index(self):
+        qs = Transaction.objects.filter(project_id=1, **date_range_filter('date', '2026-01-01', '2026-01-31'))
+        plan = qs.explain()
+        self.assertIn('txn_project_date_idx', plan)
+
+
+CACHE_ON = {'ENABLED': True, 'TIMEOUT': 60, 'ENDPOINTS': {'projects': True, 'employees': True, 'invoices': True}}
+
+
+@override_settings(RESPONSE_CACHE=CACHE_ON)
+class ResponseCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        response_cache.counters.clear()
+        self.project = Project.objects.create(name='P', client='C')
+
+    def test_repeat_list_is_served_from_cache(self):
+        self.assertEqual(self.client.get('/api/projects/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            res = self.client.get('/api/projects/')
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.data[0]['name'], 'P')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=res['ETag']).status_code, 304)
+        self.assertEqual(response_cache.stats()['projects'], {'hits': 2, 'misses': 1})
+
+    def test_writes_invalidate_dependent_lists(self):
+        self.client.get('/api/projects/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/transactions/', {'type': 'income', 'amount': 75, 'category': 'Sales', 'description': 'x',
+                                                    'date': '2026-01-01', 'projectId': self.project.id}, format='json')
+        res = self.client.get('/api/projects/')
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data[0]['actualIncome'], Decimal('75'))
+
+        self.client.get('/api/invoices/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/projects/{self.project.id}/')
+        self.assertEqual(self.client.get('/api/projects/').data, [])
+        self.assertEqual(self.client.get('/api/invoices/')['X-Cache'], 'MISS')
+
+    def test_entries_are_keyed_by_role_and_query(self):
+        self.client.get('/api/employees/')
+        self.assertEqual(self.client.get('/api/employees/', {'limit': 1})['X-Cache'], 'MISS')
+        viewer = User.objects.create(username='viewer', role='user')
+        self.client.force_authenticate(user=viewer)
+        self.assertEqual(self.client.get('/api/employees/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/employees/')['X-Cache'], 'HIT')
+
+    @override_settings(RESPONSE_CACHE={**CACHE_ON, 'ENDPOINTS': {'projects': False}})
+    def test_endpoint_can_be_switched_off(self):
+        self.client.get('/api/projects/')
+        res = self.client.get('/api/projects/')
+        self.assertNotIn('X-Cache', res)
+        self.assertEqual(self.client.get('/api/cache/stats').data, {})
+
+
+class ConditionalGetTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(name='P', client='C')
+        self.employee = Employee.objects.create(name='E', role='Dev')
+        self.txn = Transaction.objects.create(type='income', amount=10, category='c', description='d', date=day('2026-01-01'),
+                                              project=self.project, employee=self.employee)
+
+    def _revalidate(self, url, etag, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_list_and_detail_return_304(self):
+        for url in ['/api/users/', '/api/employees/', '/api/projects/', '/api/tasks/', '/api/invoices/',
+                    '/api/transactions/', f'/api/projects/{self.project.id}/', f'/api/transactions/{self.txn.id}/']:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200, url)
+            etag = res['ETag']
+            with self.assertNumQueries(1):
+                again = self._revalidate(url, etag)
+            self.assertEqual(again.status_code, 304, url)
+            self.assertEqual(again['ETag'], etag)
+            self.assertEqual(again.content, b'')
+
+    def test_tag_follows_rows_relations_and_query(self):
+        url = '/api/transactions/'
+        etag = self.client.get(url, {'projectId': self.project.id})['ETag']
+        self.assertEqual(self._revalidate(url, etag, projectId=self.project.id).status_code, 304)
+        self.assertEqual(self._revalidate(url, etag).status_code, 200) # Different filter, different tag
+
+        self.employee.name = 'Renamed' # Shown through employee_details
+        self.employee.save()
+        res = self._revalidate(url, etag, projectId=self.project.id)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data[0]['employee_details']['name'], 'Renamed')
+
+        etag = res['ETag']
+        self.txn.delete()
+        self.assertEqual(self._revalidate(url, etag, projectId=self.project.id).status_code, 200)
+
+    def test_list_tag_does_not_join_relations(self):
+        etag = self.client.get('/api/transactions/')['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._revalidate('/api/transactions/', etag).status_code, 304)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        self.assertIn('FROM "api_employee"', queries[0]['sql'])
+
+    def test_paginated_tag_covers_only_the_page(self):
+        older = Transaction.objects.create(type='income', amount=5, category='c', description='old', date=day('2026-01-01'))
+        Transaction.objects.filter(pk=older.pk).update(createdAt=timezone.now() - timedelta(days=1))
+        newest = Transaction.objects.create(type='income', amount=5, category='c', description='new', date=day('2026-01-01'),
+                                            employee=self.employee)
+        url = '/api/transactions/'
+        etag = self.client.get(url, {'limit': 1})['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._revalidate(url, etag, limit=1).status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+        self.assertIn('LIMIT 2', queries[0]['sql'])
+
+        older.description = 'changed' # Not on the first page
+        older.save()
+        self.assertEqual(self._revalidate(url, etag, limit=1).status_code, 304)
+        self.employee.name = 'Renamed' # Rendered on it
+        self.employee.save()
+        self.assertEqual(self._revalidate(url, etag, limit=1).status_code, 200)
+        newest.delete()
+        self.assertEqual(self._revalidate(url, etag, limit=1).status_code, 200)
+
+    def test_project_tag_moves_with_its_totals(self):
+        url = f'/api/projects/{self.project.id}/'
+        etag = self.client.get(url)['ETag']
+        Task.objects.create(title='T', project=self.project)
+        res = self._revalidate(url, etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['taskCount'], 1)
+        self.assertEqual(self.client.get('/api/projects/abc/').status_code, 404)
+
+
+class DeltaSyncTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(name='P', client='C')
+        self.employee = Employee.objects.create(name='E', role='Dev')
+        self.txn = Transaction.objects.create(type='income', amount=10, category='c', description='d', date=day('2026-01-01'),
+                                              project=self.project, employee=self.employee)
+        self.since = (timezone.now() - timedelta(seconds=1)).isoformat()
+        self.old = Employee.objects.create(name='Old', role='Dev')
+        Employee.objects.filter(pk=self.old.pk).update(updatedAt=timezone.now() - timedelta(days=1))
+
+    def test_plain_list_hands_out_a_cursor(self):
+        res = self.client.get('/api/tasks/')
+        self.assertTrue(day(res['X-Sync-Cursor']) <= timezone.now())
+
+    def test_only_changed_rows_and_tombstones_are_returned(self):
+        res = self.client.get('/api/employees/', {'updatedSince': self.since})
+        self.assertEqual([e['name'] for e in res.data['results']], ['E'])
+        self.assertEqual(res.data['deleted'], [])
+
+        res = self.client.get('/api/employees/', {'updatedSince': res.data['cursor']})
+        self.assertNotIn('Old', [e['name'] for e in res.data['results']]) # At most the overlap window again
+
+        self.client.delete(f'/api/employees/{self.employee.id}/')
+        res = self.client.get('/api/transactions/', {'updatedSince': self.since})
+        self.assertEqual((res.data['results'], res.data['deleted']), ([], [self.txn.id]))
+        res = self.client.get('/api/employees/', {'updatedSince': self.since})
+        self.assertEqual(res.data['deleted'], [self.employee.id])
+
+    def test_relation_and_rollup_changes_count_as_changes(self):
+        since = timezone.now().isoformat()
+        Task.objects.create(title='T', project=self.project) # Only the project's rollup moves
+        res = self.client.get('/api/projects/', {'updatedSince': since})
+        self.assertEqual([(p['id'], p['taskCount']) for p in res.data['results']], [(self.project.id, 1)])
+
+        since = timezone.now().isoformat()
+        self.employee.name = 'Renamed'
+        self.employee.save()
+        res = self.client.get('/api/transactions/', {'updatedSince': since})
+        self.assertEqual(res.data['results'][0]['employee_details']['name'], 'Renamed')
+
+    def test_project_cascade_tombstones_children(self):
+        task = Task.objects.create(title='T', project=self.project)
+        self.client.delete(f'/api/projects/{self.project.id}/')
+        res = self.client.get('/api/tasks/', {'updatedSince': self.since})
+        self.assertEqual(res.data['deleted'], [task.id])
+        self.assertEqual(Tombstone.objects.filter(resource='project').count(), 1)
+
+    def test_bad_and_expired_cursors(self):
+        self.assertEqual(self.client.get('/api/tasks/', {'updatedSince': 'nope'}).status_code, 400)
+        expired = (timezone.now() - timedelta(days=31)).isoformat()
+        self.assertEqual(self.client.get('/api/tasks/', {'updatedSince': expired}).status_code, 410)
+        self.assertEqual(self.client.get('/api/tasks/', {'updatedSince': self.since, 'syncPage': 'nope'}).status_code, 400)
+
+    def test_deltas_are_paged_and_end_with_the_first_pages_cursor(self):
+        tasks = [Task.objects.create(title=f'T{n}', project=self.project) for n in range(3)]
+        gone = Task.objects.create(title='Gone', project=self.project)
+        self.client.delete(f'/api/tasks/{gone.id}/')
+        res = self.client.get('/api/tasks/', {'updatedSince': self.since, 'limit': 2})
+        pages, deleted = [[t['id'] for t in res.data['results']]], res.data['deleted']
+        self.assertIsNone(res.data['cursor'])
+        late = Task.objects.create(title='Late', project=self.project) # Changed while paging
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            pages.append([t['id'] for t in res.data['results']])
+            deleted += res.data['deleted']
+        self.assertEqual((pages[0], deleted), ([tasks[0].id, tasks[1].id], [gone.id]))
+        self.assertEqual(pages[1][0], tasks[2].id)
+        self.assertLess(day(res.data['cursor']), late.updatedAt) # So the next sync picks it up again
+
+    def test_relation_changes_are_matched_without_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/transactions/', {'updatedSince': self.since})
+        sql = next(q['sql'] for q in queries.captured_queries if 'FROM "api_transaction"' in q['sql'])
+        self.assertNotIn('"api_employee"."updatedAt" >=', sql) # Not filtered through the select_related join
+        self.assertIn('"employee_id" IN (SELECT U0."id"', sql)
+
+
+class ChangeEventTests(ApiTestCase):
+    def _published(self, call):
+        with mock.patch.object(broker, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            call()
+        return [(e['resource'], e['id'], e['op']) for args in publish.call_args_list for e in args[0][0]]
+
+    def test_write_hooks_publish_compact_events(self):
+        project = Project.objects.create(name='P', client='C')
+        events = self._published(lambda: self.client.post('/api/tasks/', {'title': 'T', 'project': project.id}, format='json'))
+        task = Task.objects.get()
+        self.assertEqual(events, [('task', task.id, 'create')])
+        self.assertEqual(self._published(lambda: self.client.patch(f'/api/tasks/{task.id}/', {'status': 'Done'}, format='json')),
+                         [('task', task.id, 'update')])
+        self.assertEqual(self._published(lambda: self.client.delete(f'/api/projects/{project.id}/')),
+                         [('task', task.id, 'delete'), ('project', project.id, 'delete')])
+
+    def test_large_writes_collapse_to_one_bulk_event(self):
+        rows = [{'type': 'expense', 'amount': 1, 'category': 'c', 'description': 'd', 'date': '2026-01-01'}] * 101
+        events = self._published(lambda: self.client.post('/api/transactions/bulk/', rows, format='json'))
+        self.assertEqual(events, [('transaction', None, 'bulk')])
+
+    def test_full_subscriber_queue_asks_for_a_resync(self):
+        async def run():
+            subscription = Subscription(asyncio.get_running_loop(), {'task'}, maxsize=2)
+            for i in range(3):
+                subscription.offer([{'resource': 'task', 'id': i, 'op': 'update', 'version': 1}])
+            subscription.offer([{'resource': 'project', 'id': 9, 'op': 'update', 'version': 1}]) # Not subscribed
+            await asyncio.sleep(0)
+            return await subscription.next_batch(1)
+        self.assertEqual([(e['op'], e['id']) for e in asyncio.run(run())], [('resync', None), ('update', 1), ('update', 2)])
+
+
+    def test_redis_listener_reconnects_and_asks_for_a_resync(self):
+        class Stop(BaseException):
+            pass
+
+        class PubSub:
+            def __init__(self, messages):
+                self.messages = messages
+            def subscribe(self, channel):
+                pass
+            def listen(self):
+                for message in self.messages:
+                    if isinstance(message, BaseException):
+                        raise message
+                    yield message
+            def close(self):
+                pass
+
+        sessions = iter([PubSub([ConnectionError('reset')]), PubSub([{'data': '[{"resource": "task"}]'}, Stop()])])
+        backend = RedisBackend.__new__(RedisBackend)
+        backend.broker, backend.channel = mock.Mock(), 'test'
+        backend.client = mock.Mock(pubsub=lambda **kwargs: next(sessions))
+        with mock.patch('api.events.time.sleep') as sleep, self.assertLogs('api.events', 'ERROR'), self.assertRaises(Stop):
+            backend._listen()
+        sleep.assert_called_once_with(0.5)
+        dispatched = [call.args[0] for call in backend.broker.dispatch.call_args_list]
+        self.assertEqual([events[0].get('op') for events in dispatched], ['resync', None])
+        self.assertEqual(dispatched[1], [{'resource': 'task'}])
+
+    def test_admin_only_resources_are_hidden_from_other_users(self):
+        async def run():
+            subscription = Subscription(asyncio.get_running_loop(), None, hidden={'user'})
+            subscription.offer([{'resource': 'user', 'id': 1, 'op': 'update', 'version': 1},
+                                {'resource': 'task', 'id': 2, 'op': 'update', 'version': 1},
+                                {'resource': None, 'id': None, 'op': 'resync', 'version': 1}])
+            return await subscription.next_batch(1)
+        self.assertEqual([e['resource'] for e in asyncio.run(run())], ['task', None])
+
+
+@override_settings(**INLINE)
+class EventStreamTests(TransactionTestCase):
+    def _stream(self, token, publish=(), resources='task'):
+        async def run():
+            incoming, sent = asyncio.Queue(), []
+            async def send(message):
+                sent.append(message)
+                if message.get('body', b'').startswith(b'retry'):
+                    broker.dispatch(list(publish))
+                elif message.get('body', b'').startswith(b'event'):
+                    await incoming.put({'type': 'http.disconnect'})
+            scope = {'type': 'http', 'path': '/api/events', 'query_string': f'token={token}&resources={resources}'.encode()}
+            await asyncio.wait_for(sse_app(scope, incoming.get, send), 5)
+            return sent
+        return asyncio.run(run())
+
+    def test_streams_events_to_authenticated_subscribers(self):
+        user = User.objects.create(username='viewer')
+        token = str(RefreshToken.for_user(user).access_token)
+        sent = self._stream(token, [{'resource': 'project', 'id': 1, 'op': 'update', 'version': 1},
+                                    {'resource': 'task', 'id': 7, 'op': 'delete', 'version': 2}])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        self.assertEqual(sent[2]['body'], b'event: change\ndata: {"resource":"task","id":7,"op":"delete","version":2}\n\n')
+        self.assertEqual(broker.stats()['subscribers'], 0)
+
+    def test_user_events_only_reach_admins(self):
+        published = [{'resource': 'user', 'id': 1, 'op': 'update', 'version': 1},
+                     {'resource': 'task', 'id': 7, 'op': 'update', 'version': 2}]
+        for role, expected in [('user', b'"resource":"task"'), ('admin', b'"resource":"user"')]:
+            user = User.objects.create(username=f'{role}-subscriber', role=role)
+            sent = self._stream(str(RefreshToken.for_user(user).access_token), published, resources='user,task')
+            self.assertIn(expected, sent[2]['body'], role)
+            if role == 'user':
+                self.assertNotIn(b'"resource":"user"', sent[2]['body'])
+
+    def test_rejects_bad_tokens(self):
+        self.assertEqual(self._stream('nope')[0]['status'], 401)
+
+
+class FastListTests(ApiTestCase):
+    # The .values() path must render byte-for-byte what the serializers render
+    URLS = ['/api/employees/', '/api/tasks/', '/api/invoices/', '/api/transactions/',
+            '/api/tasks/?limit=2', '/api/transactions/?limit=2', '/api/transactions/?projectId={project}&type=expense']
+
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(name='Alpha', client='ACME', clientEmail='a@acme.test')
+        paid = Employee.objects.create(name='Ann', role='Dev', salary=Decimal('1234.50'), email='ann@x.test', dob='1990-01-01')
+        bare = Employee.objects.create(name='Bob', role='Ops', type='freelance', department=None)
+        Task.objects.create(title='T1', project=self.project, assignee=paid, cost=Decimal('12.5'), status='Completed')
+        Task.objects.create(title='T2', project=self.project)
+        good = Invoice.objects.create(items='[{"desc": "Design", "qty": 2, "price": 10.5}]', total=21, project=self.project, date='2026-02-03')
+        Invoice.objects.create(items='not json', total=0)
+        Invoice.objects.create(items='', clientName='Walk-in')
+        Transaction.objects.create(type='expense', amount=Decimal('99.99'), category='Labor', description='a',
+                                   date=day('2026-01-05T13:53:31.244Z'), project=self.project, employee=paid, invoice=good)
+        Transaction.objects.create(type='income', amount=5, category='Sales', description='b', date=day('2026-01-06'), employee=bare)
+        Transaction.objects.create(type='expense', amount=1, category='Misc', description='c', date=day('2026-01-07'))
+
+    def test_fast_lists_match_the_serializers(self):
+        for url in self.URLS:
+            url = url.format(project=self.project.id)
+            with self.settings(FAST_LISTS=False):
+                expected = self.client.get(url)
+            fast = self.client.get(url)
+            self.assertEqual(fast.status_code, 200, url)
+            self.assertEqual(fast.content, expected.content, url)
+
+    def test_matches_in_another_timezone(self):
+        with timezone.override('America/New_York'):
+            with self.settings(FAST_LISTS=False):
+                expected = self.client.get('/api/transactions/')
+            self.assertEqual(self.client.get('/api/transactions/').content, expected.content)
+
+    def test_later_pages_match(self):
+        url = '/api/transactions/?limit=1'
+        while url:
+            with self.settings(FAST_LISTS=False):
+                expected = self.client.get(url)
+            fast = self.client.get(url)
+            self.assertEqual(fast.content, expected.content, url)
+            url = fast.data['next']
+
+    def test_one_query_per_list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/transactions/')
+        rows = [q['sql'] for q in ctx.captured_queries if 'api_transaction' in q['sql'] and 'COUNT' not in q['sql']]
+        self.assertEqual(len(rows), 1)
+
+
+class JsonBackendTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        project = Project.objects.create(name='Caf\u00e9 \u2028 Ltd', client='ACME')
+        Transaction.objects.create(type='income', amount=Decimal('1050.25'), category='Sales', description='a',
+                                   date=day('2026-01-05T13:53:31.244Z'), project=project)
+        Invoice.objects.create(items='[{"desc": "x", "qty": 1.5}]', total=10)
+
+    def test_orjson_renders_like_the_stdlib_renderer(self):
+        for url in ['/api/transactions/', '/api/projects/', '/api/invoices/', '/api/finance/summary', '/api/tasks/?cursor=bad']:
+            fast = self.client.get(url)
+            self.assertEqual(fast['Content-Type'], 'application/json', url)
+            self.assertEqual(fast.content, JSONRenderer().render(fast.data), url)
+
+    def test_orjson_parser(self):
+        res = self.client.post('/api/projects/', b'{"name": "N\\u00e9", "client": "C", "income": 12.5}', content_type='application/json')
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(Project.objects.get(pk=res.data['id']).name, 'Né')
+        res = self.client.post('/api/projects/', b'{"name": ', content_type='application/json')
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('JSON parse error', res.data['detail'])
+
+    def test_default_backend_needs_orjson_installed(self):
+        path = str(Path(settings.BASE_DIR, 'plansculpt_backend', 'settings.py'))
+        with mock.patch.dict(os.environ), mock.patch('importlib.util.find_spec', return_value=None):
+            os.environ.pop('JSON_BACKEND', None)
+            fallback = runpy.run_path(path)
+        self.assertEqual(fallback['JSON_BACKEND'], 'stdlib')
+        self.assertEqual(fallback['REST_FRAMEWORK']['DEFAULT_RENDERER_CLASSES'][0], 'rest_framework.renderers.JSONRenderer')
+
+
+@override_settings(RESPONSE_COMPRESSION={'ENABLED': True, 'MIN_SIZE': 200})
+class CompressionTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(20):
+            Employee.objects.create(name=f'Employee {i}', role='Dev')
+
+    def test_gzip_above_threshold(self):
+        plain = self.client.get('/api/employees/')
+        res = self.client.get('/api/employees/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertLess(len(res.content), len(plain.content))
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+
+    def test_small_or_unaccepted_responses_are_left_alone(self):
+        self.assertFalse(self.client.get('/api/tasks/', HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+        self.assertFalse(self.client.get('/api/employees/').has_header('Content-Encoding'))
+        self.assertFalse(self.client.get('/api/employees/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity').has_header('Content-Encoding'))
+
+    def test_weak_etag_still_revalidates(self):
+        res = self.client.get('/api/employees/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(res['ETag'].startswith('W/"'))
+        again = self.client.get('/api/employees/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_streaming_export_is_compressed(self):
+        Transaction.objects.create(type='income', amount=5, category='Sales', description='d', date=day('2026-01-01'))
+        plain = b''.join(self.client.get('/api/transactions/export/').streaming_content)
+        res = self.client.get('/api/transactions/export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(res.streaming_content)), plain)
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        res = self.client.get('/api/employees/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(res.content), self.client.get('/api/employees/').content)
+
+
+class SyntheticSeedTests(ApiTestCase):
+    counts = {'users': 3, 'employees': 20, 'projects': 5, 'invoices': 10, 'tasks': 200, 'transactions': 500, 'activity': 50}
+
+    def test_seeds_consistent_data(self):
+        call_command('seed_synthetic', batch_size=64, stdout=io.StringIO(), **self.counts)
+        self.assertEqual(Task.objects.count(), 200)
+        self.assertEqual(Transaction.objects.count(), 500)
+        self.assertEqual(ActivityLog.objects.count(), 50)
+        self.assertFalse(Task.objects.exclude(project__in=Project.objects.all()).exists())
+        self.assertFalse(Transaction.objects.filter(employee__isnull=False).exclude(employee__in=Employee.objects.all()).exists())
+        self.assertEqual(Transaction.objects.values('customId').distinct().count(), 500)
+        call_command('check_rollups', stdout=io.StringIO())
+
+        # Raw inserts leave the id allocators where the API expects them
+        res = self.client.post('/api/transactions/', {'type': 'income', 'amount': 5, 'category': 'Sales', 'description': 'd',
+                                                      'date': '2026-01-01'}, format='json')
+        self.assertEqual(res.status_code, 201)
+        self.assertFalse(Transaction.objects.exclude(pk=res.data['id']).filter(customId=res.data['customId']).exists())
+
+        with self.assertRaises(CommandError):
+            call_command('seed_synthetic', stdout=io.StringIO(), **self.counts)
+        call_command('seed_synthetic', '--append', stdout=io.StringIO(), **self.counts)
+        self.assertEqual(Employee.objects.count(), 40)
+
+
+class MetricsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        request_metrics.reset()
+
+    def test_requests_are_counted_per_route(self):
+        self.client.get('/api/employees/')
+        self.client.get(f'/api/employees/{Employee.objects.create(name="A", role="Dev").id}/')
+        self.client.get('/api/nowhere/')
+        res = self.client.get('/api/metrics')
+        self.assertEqual(res['Content-Type'], 'text/plain; charset=utf-8')
+        text = res.content.decode()
+        self.assertIn('plansculpt_http_requests_total{route="employee-list",method="GET",status="200"} 1', text)
+        self.assertIn('plansculpt_http_requests_total{route="employee-detail",method="GET",status="200"} 1', text)
+        self.assertIn('plansculpt_http_requests_total{route="unmatched",method="GET",status="404"} 1', text)
+        self.assertIn('plansculpt_http_request_duration_seconds_bucket{route="employee-list",method="GET",le="+Inf"} 1', text)
+        self.assertIn('# TYPE plansculpt_http_request_queries histogram', text)
+        queries = [line for line in text.splitlines() if line.startswith('plansculpt_http_request_queries_sum{route="employee-list"')]
+        self.assertGreater(float(queries[0].split()[-1]), 0)
+
+    def test_streamed_exports_are_recorded_once_sent(self):
+        Transaction.objects.create(type='income', amount=5, category='Sales', description='d', date=day('2026-01-01'))
+        res = self.client.get('/api/transactions/export/')
+        self.assertNotIn('route="transaction-export"', request_metrics.render())
+        b''.join(res.streaming_content)
+        self.assertIn('plansculpt_http_requests_total{route="transaction-export",method="GET",status="200"} 1',
+                      request_metrics.render())
+
+    @override_settings(METRICS={'SLOW_REQUEST_MS': 0, 'SLOW_QUERY_MS': 0})
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('api.metrics', 'WARNING') as logs:
+            self.client.get('/api/projects/')
+        self.assertTrue(any(line.startswith('WARNING:api.metrics:Slow query') for line in logs.output))
+        slow = [line for line in logs.output if 'Slow request GET /api/projects/ -> 200' in line]
+        self.assertIn('SELECT', slow[0])
+        text = request_metrics.render()
+        self.assertIn('plansculpt_http_slow_requests_total{route="project-list",method="GET"} 1', text)
+        self.assertIn('plansculpt_db_slow_queries_total{route="project-list"}', text)
+
+    def test_workers_are_summed_through_the_shared_directory(self):
+        other = RequestMetrics() # Another worker process's series, as its flusher writes them
+        other.observe('employee-list', 'GET', 200, 0.2, 0.01, 3, 0, False)
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS={'MULTIPROCESS_DIR': directory}):
+            Path(directory, '99999.json').write_text(json.dumps(other.snapshot()))
+            self.client.get('/api/employees/')
+            text = request_metrics.render()
+            request_metrics.stop()
+        self.assertIn('plansculpt_http_requests_total{route="employee-list",method="GET",status="200"} 2', text)
+        self.assertIn('plansculpt_http_request_queries_count{route="employee-list",method="GET"} 2', text)
+
+    @override_settings(METRICS={'TOKEN': 's3cret'})
+    def test_token_protects_the_endpoint(self):
+        self.assertEqual(APIClient().get('/api/metrics').status_code, 403)
+        self.assertEqual(APIClient().get('/api/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(APIClient().get('/api/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    def test_without_a_token_only_admins_may_scrape(self):
+        viewer = User.objects.create(username='viewer', role='user')
+        self.assertEqual(APIClient().get('/api/metrics').status_code, 401)
+        for user, expected in [(viewer, 403), (self.user, 200)]:
+            token = str(RefreshToken.for_user(user).access_token)
+            self.assertEqual(APIClient().get('/api/metrics', HTTP_AUTHORIZATION=f'Bearer {token}').status_code, expected)
+
+
+class ProfilerTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.enterContext(override_settings(PROFILER={'DIRECTORY': self.directory.name}))
+        Project.objects.create(name='A', client='C')
+
+    def _client(self, user):
+        return APIClient(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_admin_request_is_profiled_and_stored(self):
+        res = self._client(self.user).get('/api/projects/', HTTP_X_PROFILE='1')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()[0]['name'], 'A')
+        base = Path(self.directory.name, res['X-Profile-Id'])
+        functions = {func[2] for func in pstats.Stats(str(base.with_suffix('.pstats'))).stats}
+        self.assertIn('list', functions)
+        self.assertTrue(base.with_suffix('.collapsed').exists())
+        sql = base.with_suffix('.sql').read_text()
+        self.assertTrue(sql.startswith('GET /api/projects/ -> 200'))
+        self.assertIn('FROM "api_project"', sql)
+
+    def test_inline_report(self):
+        res = self._client(self.user).get('/api/projects/?profile=inline')
+        report = res.json()
+        self.assertEqual(report['profileId'], res['X-Profile-Id'])
+        self.assertEqual((report['status'], report['path']), (200, '/api/projects/?profile=inline'))
+        self.assertEqual(report['queryCount'], len(report['queries']))
+        self.assertTrue(any('api_project' in query['sql'] for query in report['queries']))
+        self.assertTrue(report['functions'][0]['cumulativeMs'] >= report['functions'][-1]['cumulativeMs'])
+        for line in report['collapsed'].splitlines():
+            stack, samples = line.rsplit(' ', 1)
+            self.assertGreater(int(samples), 0)
+
+    def test_streamed_export_is_profiled_until_sent(self):
+        Transaction.objects.create(type='income', amount=5, category='Sales', description='d', date=day('2026-01-01'))
+        res = self._client(self.user).get('/api/transactions/export/?profile=inline')
+        base = Path(self.directory.name, res['X-Profile-Id'])
+        self.assertFalse(base.with_suffix('.sql').exists())
+        self.assertIn(b'"description":"d"', b''.join(res.streaming_content).replace(b' ', b''))
+        self.assertIn('FROM "api_transaction"', base.with_suffix('.sql').read_text())
+
+    def test_flag_is_ignored_for_non_admins(self):
+        member = User.objects.create(username='member', role='user')
+        for client, flag in [(self._client(member), '1'), (self.client, '1'), (self._client(self.user), '0')]:
+            res = client.get('/api/tasks/', HTTP_X_PROFILE=flag)
+            self.assertNotIn('X-Profile-Id', res)
+        self.assertEqual(list(Path(self.directory.name).iterdir()), [])
+
+
+@override_settings(PAYLOAD_LOG={'SAMPLE_RATE': 1.0, 'REDACT': ['password', 'token'], 'MAX_VALUE_LENGTH': 20})
+class PayloadLogTests(ApiTestCase):
+    def test_payloads_are_structured_and_redacted(self):
+        with self.assertLogs('api.payloads', 'INFO') as logs:
+            self.client.post('/api/projects/', {'name': 'A', 'client': 'C', 'description': 'x' * 50,
+                                                'contacts': [{'name': 'N', 'Password': 'hunter2'}], 'token': 't'}, format='json')
+        payload = logs.records[0].payload
+        self.assertEqual((payload['event'], payload['method'], payload['path'], payload['user']),
+                         ('project.create', 'POST', '/api/projects/', self.user.id))
+        self.assertEqual(payload['body']['token'], '[REDACTED]')
+        self.assertEqual(payload['body']['contacts'], [{'name': 'N', 'Password': '[REDACTED]'}])
+        self.assertEqual(payload['body']['description'], 'x' * 20 + '... (50 chars)')
+        self.assertNotIn('hunter2', JsonFormatter().format(logs.records[0]))
+
+    def test_unsampled_requests_log_only_errors(self):
+        task = Task.objects.create(title='T', project=Project.objects.create(name='P', client='C'), cost=25)
+        with override_settings(PAYLOAD_LOG={'SAMPLE_RATE': 0}), self.assertNoLogs('api.payloads'):
+            self.client.patch(f'/api/tasks/{task.id}/', {'status': 'Completed'}, format='json')
+            self.client.post(f'/api/tasks/{task.id}/pay/')
+        with override_settings(PAYLOAD_LOG={'SAMPLE_RATE': 0}), self.assertLogs('api.payloads', 'ERROR') as logs, \
+                self.assertLogs('django.request', 'ERROR'), \
+                mock.patch.object(Transaction.objects, 'create', side_effect=RuntimeError('disk full')):
+            self.client.post(f'/api/tasks/{task.id}/pay/') # The 500 is captured here, not appended to ERROR_LOG_FILE
+        self.assertEqual((logs.records[0].payload['event'], logs.records[0].payload['error']), ('task.pay.failed', 'disk full'))
+
+    def test_handler_writes_json_lines_off_thread_and_rotates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, 'payloads.log')
+            handler = QueuedRotatingFileHandler(path, maxBytes=400, backupCount=2)
+            handler.setFormatter(JsonFormatter())
+            log = logging.getLogger('payload-handler-test')
+            log.propagate = False
+            log.addHandler(handler)
+            self.addCleanup(log.removeHandler, handler)
+            for i in range(10):
+                log.warning('event', extra={'payload': {'event': 'e', 'i': i}})
+            handler.close() # Drains the queue
+            self.assertEqual(sorted(p.name for p in path.parent.iterdir()), ['payloads.log', 'payloads.log.1', 'payloads.log.2'])
+            last = [json.loads(line) for line in path.read_text().splitlines()]
+            self.assertEqual(last[-1]['i'], 9)
+            self.assertEqual(last[-1]['level'], 'WARNING')
+
+
+class PurgeTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(name='Alpha', client='C')
+        self.other = Project.objects.create(name='Beta', client='C')
+        self.employee = Employee.objects.create(name='E', role='Dev')
+        self.invoice = Invoice.objects.create(items='[]', total=10, status='Pending', date='2026-01-20', project=self.project)
+        # Another project's payment against this project's invoice, and the employee's work elsewhere
+        self.elsewhere = Transaction.objects.create(type='income', amount=7, category='Sales', description='x', date=day('2026-01-01'),
+                                                    project=self.other, employee=self.employee, invoice=self.invoice)
+        Task.objects.create(title='T', project=self.other, assignee=self.employee, status='Completed')
+
+    def _fill(self, n):
+        for i in range(n):
+            Transaction.objects.create(type='expense' if i % 2 else 'income', amount=10, category='c', description='d',
+                                       date=day('2026-01-02'), project=self.project, employee=self.employee)
+            Task.objects.create(title=f'T{i}', project=self.project, status='Completed' if i % 3 else 'Todo')
+
+    def assertNoDrift(self):
+        self.assertEqual(list(rollups.drift()), [])
+
+    def test_project_cascade_is_set_based(self):
+        self._fill(3)
+        with CaptureQueriesContext(connection) as small:
+            res = self.client.delete(f'/api/projects/{self.project.id}/')
+        self.assertEqual(res.status_code, 204)
+        self.assertFalse(Task.objects.filter(project_id=self.project.id).exists())
+        self.assertFalse(Invoice.objects.filter(pk=self.invoice.pk).exists())
+        self.elsewhere.refresh_from_db()
+        self.assertIsNone(self.elsewhere.invoice_id) # SET_NULL, as the collector would have done
+        self.assertEqual(Tombstone.objects.filter(resource='task').count(), 3)
+        self.assertNoDrift()
+
+        project = Project.objects.create(name='Gamma', client='C')
+        self.project = project
+        invoice = Invoice.objects.create(items='[]', total=10, status='Pending', date='2026-01-20', project=project)
+        Transaction.objects.create(type='income', amount=7, category='Sales', description='x', date=day('2026-01-01'),
+                                   project=self.other, invoice=invoice)
+        self._fill(30)
+        with CaptureQueriesContext(connection) as large:
+            self.client.delete(f'/api/projects/{project.id}/')
+        self.assertEqual(len(large), len(small)) # Independent of the row count
+        self.assertFalse(Transaction.objects.filter(project_id=project.id).exists())
+
+    def test_cleared_invoice_references_are_announced(self):
+        before = self.elsewhere.updatedAt
+        etag = self.client.get('/api/transactions/')['ETag']
+        with mock.patch.object(broker, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/projects/{self.project.id}/')
+        events = [(e['resource'], e['id'], e['op']) for args in publish.call_args_list for e in args[0][0]]
+        self.assertIn(('transaction', self.elsewhere.id, 'update'), events)
+        self.elsewhere.refresh_from_db()
+        self.assertGreater(self.elsewhere.updatedAt, before)
+        res = self.client.get('/api/transactions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(res.data[0]['invoice'])
+        res = self.client.get('/api/transactions/', {'updatedSince': before.isoformat()})
+        self.assertEqual([row['id'] for row in res.data['results']], [self.elsewhere.id])
+
+    def test_employee_cascade_keeps_other_rollups(self):
+        self._fill(4)
+        res = self.client.delete(f'/api/employees/{self.employee.id}/')
+        self.assertEqual(res.status_code, 204)
+        self.assertFalse(Transaction.objects.filter(employee_id=self.employee.id).exists())
+        self.assertEqual(ProjectRollup.objects.get(project=self.other).income, 0)
+        self.assertEqual(ProjectRollup.objects.get(project=self.other).taskCount, 0)
+        self.assertEqual(ProjectRollup.objects.get(project=self.project).taskCount, 4)
+        self.assertNoDrift()
+
+    @override_settings(PURGE={'MODE': 'sync', 'THRESHOLD': 10, 'CHUNK_SIZE': 4})
+    def test_large_cascade_runs_as_a_chunked_job(self):
+        self._fill(6)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(f'/api/projects/{self.project.id}/')
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual((res.data['status'], res.data['total']), ('pending', 13))
+
+        res = self.client.get(f"/api/purge-jobs/{res.data['id']}/")
+        self.assertEqual((res.data['status'], res.data['deleted'], res.data['progress']), ('done', 13, 100))
+        self.assertFalse(Project.objects.filter(pk=self.project.id).exists())
+        self.assertEqual(Tombstone.objects.filter(resource='transaction').count(), 6)
+        self.assertNoDrift()
+
+    @override_settings(PURGE={'MODE': 'sync', 'THRESHOLD': 10, 'CHUNK_SIZE': 4})
+    def test_repeated_delete_returns_the_queued_job(self):
+        self._fill(6)
+        first = self.client.delete(f'/api/projects/{self.project.id}/') # Not committed, so not started
+        second = self.client.delete(f'/api/projects/{self.project.id}/')
+        self.assertEqual(second.status_code, 202)
+        self.assertEqual(first.data['id'], second.data['id'])
+
+        call_command('run_purge_jobs', stdout=io.StringIO())
+        self.assertEqual(PurgeJob.objects.get().status, 'done')
+        self.assertFalse(Project.objects.filter(pk=self.project.id).exists())
+        self.assertNoDrift()
+
+
+@override_settings(**{**INLINE, 'PURGE': {'MODE': 'thread', 'THRESHOLD': 10, 'CHUNK_SIZE': 4}})
+class PurgeThreadTests(TransactionTestCase):
+    def setUp(self):
+        self.enterContext(mock.patch('api.models._transaction_ids', _TransactionIdBlock()))
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create(username='purge_admin', role='admin'))
+        self.project = Project.objects.create(name='Alpha', client='C')
+        for i in range(6):
+            Transaction.objects.create(type='income', amount=10, category='c', description='d', date=day('2026-01-02'), project=self.project)
+            Task.objects.create(title=f'T{i}', project=self.project)
+
+    def tearDown(self):
+        purge_worker.stop()
+
+    def test_job_runs_on_the_worker_thread(self):
+        res = self.client.delete(f'/api/projects/{self.project.id}/')
+        self.assertEqual(res.status_code, 202)
+        self.assertTrue(purge_worker.worker.running)
+        deadline = time.monotonic() + 10
+        while (job := self.client.get(f"/api/purge-jobs/{res.data['id']}/").data)['status'] not in ('done', 'failed'):
+            self.assertLess(time.monotonic(), deadline, job)
+            time.sleep(0.05)
+        self.assertEqual((job['status'], job['deleted'], job['progress']), ('done', 12, 100))
+        self.assertFalse(Project.objects.filter(pk=self.project.id).exists())
+        self.assertEqual(list(rollups.drift()), [])
@@ -1,8 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    register, login, UserViewSet, EmployeeViewSet, 
-    ProjectViewSet, TaskViewSet, InvoiceViewSet, TransactionViewSet
+    register, login, cache_stats, metrics, UserViewSet, EmployeeViewSet, 
+    ProjectViewSet, TaskViewSet, InvoiceViewSet, TransactionViewSet, PurgeJobViewSet
 )
 
 router = DefaultRouter()
@@ -12,9 +12,13 @@ router.register(r'projects', ProjectViewSet)
 router.register(r'tasks', TaskViewSet)
 router.register(r'invoices', InvoiceViewSet)
 router.register(r'transactions', TransactionViewSet)
+router.register(r'purge-jobs', PurgeJobViewSet)
 
 urlpatterns = [
     path('auth/register', register),
     path('auth/login', login),
+    path('cache/stats', cache_stats),
+    path('metrics', metrics),
+    path('finance/summary', TransactionViewSet.as_view({'get': 'summary'})),
     path('', include(router.urls)),
 ]
@@ -1,30 +1,338 @@
 from rest_framework import viewsets, permissions, status, generics
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes, renderer_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from django.db.models import Max
-from .models import User, Employee, Project, Task, Invoice, Transaction, ActivityLog
+from django.db.models import Max, Sum, Count, Q, Subquery, Value
+from django.utils.crypto import constant_time_compare
+from django.utils.http import parse_etags, quote_etag
+from django.utils import timezone
+from django.db import transaction, IntegrityError
+from .models import User, Employee, Project, Task, Invoice, Transaction, ActivityLog, PayrollRun, PurgeJob, Tombstone, next_custom_id
 from .serializers import (
     UserSerializer, EmployeeSerializer, ProjectSerializer, 
-    TaskSerializer, InvoiceSerializer, TransactionSerializer, ActivityLogSerializer
+    TaskSerializer, InvoiceSerializer, TransactionSerializer, ActivityLogSerializer, PurgeJobSerializer
 )
-from datetime import datetime
+from .audit import audit_sink
+from .cache import response_cache
+from .events import publish_changes
+from .dates import date_range_filter, parse_legacy_datetime
+from .exports import stream_export
+from .metrics import metrics_setting, request_metrics
+from .pagination import pagination_setting
+from .payloads import log_payload
+from . import purge
+from .renderers import PrometheusRenderer
+from .fastlists import EmployeeValuesSerializer, TaskValuesSerializer, InvoiceValuesSerializer, TransactionValuesSerializer
+from datetime import datetime, timedelta
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from urllib.parse import urlencode
+import hashlib
 import json
+import logging
 
-# Helper for Activity Log
+# Invoice statuses that still count as money owed to us (matches the Dashboard)
+OUTSTANDING_INVOICE_STATUSES = ['Pending', 'Sent']
+
+# Helper for Activity Log: handed to the buffered writer, never blocks the request.
+# Stamped here, so a row's createdAt is the request's time, not the flush's.
 def log_activity(user, action, details, request):
-    try:
-        ip = request.META.get('HTTP_X_FORWARDED_FOR') or request.META.get('REMOTE_ADDR') or 'unknown'
-        ActivityLog.objects.create(user=user, action=action, details=details, ip=ip)
-    except Exception as e:
-        print(f"Error logging activity: {e}")
+    ip = request.META.get('HTTP_X_FORWARDED_FOR') or request.META.get('REMOTE_ADDR') or 'unknown'
+    audit_sink.submit(ActivityLog(user_id=user.id, action=action, details=details, ip=ip, createdAt=timezone.now()))
+
+# date_range_filter() ignores bounds it can't parse; exports would then quietly
+# return everything, so they answer 400 instead
+def validate_date_range(params):
+    invalid = {name: 'Expected a date (YYYY-MM-DD) or ISO 8601 datetime.'
+               for name in ('startDate', 'endDate') if params.get(name) and parse_legacy_datetime(params[name]) is None}
+    if invalid:
+        raise ValidationError(invalid)
 
 # Check Admin Permission
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == 'admin'
 
+# Prometheus scrapes with a static bearer token, not a JWT. With no
+# METRICS['TOKEN'] configured the endpoint falls back to admins' JWTs; it is
+# never open.
+class HasMetricsToken(permissions.BasePermission):
+    def has_permission(self, request, view):
+        token = metrics_setting('TOKEN', '')
+        if not token:
+            return IsAdmin().has_permission(request, view)
+        return constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+
+class MetricsAuthentication(JWTAuthentication):
+    # The scrape token isn't a JWT, so only read one when no token is configured
+    def authenticate(self, request):
+        return None if metrics_setting('TOKEN', '') else super().authenticate(request)
+
+    def authenticate_header(self, request):
+        return None if metrics_setting('TOKEN', '') else super().authenticate_header(request)
+
+# Joins/prefetches the relations a viewset's serializer dereferences per row,
+# so list endpoints don't issue one query per related object.
+class RelatedQuerysetMixin:
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.select_related_fields:
+            qs = qs.select_related(*self.select_related_fields)
+        if self.prefetch_related_fields:
+            qs = qs.prefetch_related(*self.prefetch_related_fields)
+        return qs
+
+# Opt-in fast path for GET lists: a viewset naming a values_serializer_class
+# (api/fastlists.py) renders from .values() rows instead of model instances.
+# Output is byte-identical to serializer_class; settings.FAST_LISTS turns it off.
+class ValuesListMixin:
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.values_serializer_class is None or not getattr(settings, 'FAST_LISTS', True):
+            return super().list(request, *args, **kwargs)
+        values = self.values_serializer_class()
+        queryset = values.queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values.render(page))
+        return Response(values.render(queryset))
+
+def sync_setting(name, default):
+    return getattr(settings, 'SYNC', {}).get(name, default)
+
+# Incremental sync. ?updatedSince=<cursor> answers {results, deleted, next, cursor}:
+# rows changed since the cursor (counting changes to rendered_relations), ids
+# deleted since then from the tombstones the destroy path records, and the
+# cursor for the next call. Both lists come in pages of up to ?limit= (default
+# SYNC['PAGE_SIZE']) in id order; while `next` is set, follow it (it pins the
+# window the first page opened) and `cursor` is null. The last page carries the
+# cursor, taken before the first page was read. Plain lists carry an
+# X-Sync-Cursor header to start from. Deleted ids aren't narrowed by the other
+# filters; unknown ids are no-ops. Relation changes are matched with
+# fk IN (ids of related rows updated since), so every lookup stays on an index.
+# The same write hooks push change events to /api/events subscribers (api/events.py).
+class SyncMixin:
+    rendered_relations = ()
+
+    def sync_cursor(self):
+        return (timezone.now() - timedelta(seconds=sync_setting('OVERLAP_SECONDS', 5))).isoformat()
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get('updatedSince')
+        if since is None:
+            cursor = self.sync_cursor() # Taken before reading, so nothing committed after the read is skipped
+            response = super().list(request, *args, **kwargs)
+            response['X-Sync-Cursor'] = cursor
+            return response
+
+        since = parse_legacy_datetime(since)
+        if since is None:
+            raise ValidationError({'updatedSince': 'Expected a cursor from a previous response (ISO 8601).'})
+        if since < timezone.now() - timedelta(days=sync_setting('TOMBSTONE_RETENTION_DAYS', 30)):
+            return Response({'error': 'Cursor is older than the deletion history; reload the full list'}, status=status.HTTP_410_GONE)
+
+        cursor, after_row, after_tombstone = self.sync_page()
+        limit = self.sync_limit()
+        rows = list(self.filter_queryset(self.get_queryset()).filter(self.changed_since(since), pk__gt=after_row)
+                    .order_by('pk')[:limit + 1])
+        tombstones = list(Tombstone.objects.filter(resource=self.queryset.model._meta.model_name, deletedAt__gte=since,
+                                                   pk__gt=after_tombstone).order_by('pk').values_list('pk', 'objectId')[:limit + 1])
+        more = len(rows) > limit or len(tombstones) > limit
+        rows, tombstones = rows[:limit], tombstones[:limit]
+        next_page = None
+        if more:
+            position = [cursor, rows[-1].pk if rows else after_row, tombstones[-1][0] if tombstones else after_tombstone]
+            token = urlsafe_b64encode(json.dumps(position).encode()).decode()
+            next_page = replace_query_param(request.build_absolute_uri(), 'syncPage', token)
+        return Response({
+            'results': self.get_serializer(rows, many=True).data,
+            'deleted': list(dict.fromkeys(object_id for _, object_id in tombstones)),
+            'next': next_page,
+            'cursor': None if more else cursor,
+        })
+
+    def sync_page(self):
+        """(cursor, last row id, last tombstone id) from ?syncPage=, or a fresh window for a first page."""
+        token = self.request.query_params.get('syncPage')
+        if token is None:
+            return self.sync_cursor(), 0, 0
+        try:
+            cursor, after_row, after_tombstone = json.loads(urlsafe_b64decode(token.encode()))
+            return str(cursor), int(after_row), int(after_tombstone)
+        except (TypeError, ValueError):
+            raise ValidationError({'syncPage': 'Expected the token from a previous response\'s next link.'})
+
+    def sync_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', sync_setting('PAGE_SIZE', 500)))
+        except ValueError:
+            limit = sync_setting('PAGE_SIZE', 500)
+        return max(1, min(limit, pagination_setting('MAX_LIMIT', 500)))
+
+    def changed_since(self, since):
+        changed = Q(updatedAt__gte=since)
+        for relation in self.rendered_relations:
+            field = self.queryset.model._meta.get_field(relation)
+            updated = field.related_model.objects.filter(updatedAt__gte=since)
+            if field.concrete: # Forward FK: project, employee
+                changed |= Q(**{f'{field.attname}__in': updated.values('pk')})
+            else: # Reverse one-to-one: a project's rollup
+                changed |= Q(pk__in=updated.values(field.field.attname))
+        return changed
+
+    def destroy(self, request, *args, **kwargs):
+        # Tombstones and the deletes they describe commit together
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+    def record_saves(self, op, *instances):
+        publish_changes([(obj._meta.model_name, obj.pk, op, obj.updatedAt) for obj in instances])
+
+    def record_deletes(self, *targets):
+        """Tombstone and announce instances and/or querysets that are about to be deleted."""
+        purge.record_deletes(*targets)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        saved = serializer.instance
+        self.record_saves('create', *(saved if isinstance(saved, list) else [saved]))
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.record_saves('update', serializer.instance)
+
+    def perform_destroy(self, instance):
+        self.record_deletes(instance)
+        super().perform_destroy(instance)
+
+# Deletes whose cascade is over PURGE['THRESHOLD'] rows are queued as a PurgeJob
+# (api/purge.py) by perform_destroy, which sets purge_job; answer 202 with the job
+# so the client can poll /api/purge-jobs/<id>/ instead of waiting for a 204.
+class PurgeMixin:
+    purge_job = None
+
+    def destroy(self, request, *args, **kwargs):
+        response = super().destroy(request, *args, **kwargs)
+        if self.purge_job is not None:
+            return Response(PurgeJobSerializer(self.purge_job).data, status=status.HTTP_202_ACCEPTED)
+        return response
+
+    def purge_or_delete(self, instance):
+        """Queue a purge job for a large cascade, else delete it all now; returns the job or None."""
+        if purge.cascade_size(instance) > purge.purge_setting('THRESHOLD', 10000):
+            self.purge_job = purge.queue_purge(instance, self.request.user)
+            return self.purge_job
+        purge.delete_cascade(instance)
+        return None
+
+# Strong ETags computed in the database: row count and newest updatedAt of the
+# rows, plus of every relation the serializer renders (rendered_relations), so an
+# unchanged list or object answers If-None-Match with a 304 before anything is
+# serialized. A relation counts as a whole table (its row count and newest
+# updatedAt, as scalar subqueries the updatedAt indexes answer), so the tag
+# never joins it in. A paginated list is tagged by the (id, updatedAt) rows of
+# the requested page alone, so revalidating costs one page, not a pass over the
+# table. The query string is part of the tag, so pages don't share one.
+def table_aggregate(model, aggregate):
+    # Scalar subquery over the whole table; the constant group is dropped from GROUP BY
+    return Subquery(model.objects.order_by().annotate(table=Value(1)).values('table').annotate(value=aggregate).values('value'))
+
+class ConditionalGetMixin:
+    rendered_relations = ()
+
+    def page_state(self, queryset):
+        """The requested page's (id, updatedAt, relation updatedAt...) rows and whether more follow; None if unpaginated."""
+        if self.pagination_class is None:
+            return None
+        paginator = self.pagination_class()
+        fields = ['id', 'updatedAt'] + [f'{relation}__updatedAt' for relation in self.rendered_relations]
+        rows = paginator.paginate_queryset(queryset.values_list(*fields), self.request, view=self)
+        return None if rows is None else {'page': rows, 'more': paginator.has_next}
+
+    def get_etag(self, queryset, state=None):
+        if state is None:
+            aggregates = {'rows': Count('pk'), 'updated': Max('updatedAt')}
+            for relation in self.rendered_relations:
+                related = self.queryset.model._meta.get_field(relation).related_model
+                aggregates[f'{relation}_rows'] = Max(table_aggregate(related, Count('pk'))) # Max() of one value: aggregate() wants aggregates
+                aggregates[f'{relation}_updated'] = Max(table_aggregate(related, Max('updatedAt')))
+            state = queryset.order_by().aggregate(**aggregates)
+        params = urlencode(sorted(self.request.query_params.lists()), doseq=True)
+        return quote_etag(hashlib.md5(f"{sorted(state.items())}|{params}".encode()).hexdigest())
+
+    def not_modified(self, etag):
+        if_none_match = self.request.META.get('HTTP_IF_NONE_MATCH')
+        if etag and if_none_match:
+            # Weak comparison (RFC 9110): compressed responses carry W/ tags
+            tags = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+            if '*' in tags or etag in tags:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return None
+
+    def with_etag(self, response, etag):
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache' # Browsers revalidate instead of reusing blindly
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = self.get_etag(queryset, self.page_state(queryset))
+        return self.not_modified(etag) or self.with_etag(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            etag = self.get_etag(self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup]}))
+        except (TypeError, ValueError):
+            return super().retrieve(request, *args, **kwargs) # Malformed id: let get_object() 404
+        return self.not_modified(etag) or self.with_etag(super().retrieve(request, *args, **kwargs), etag)
+
+# List responses cached per role + query string (api/cache.py). cache_depends_on
+# lists every model whose writes change the response; write hooks call
+# invalidate_cache() with whatever else they touched (cascades, side effects).
+class CachedListMixin:
+    cache_resource = None # e.g. 'projects'; None leaves list() uncached
+    cache_depends_on = ()
+
+    def list(self, request, *args, **kwargs):
+        if not response_cache.enabled(self.cache_resource):
+            return super().list(request, *args, **kwargs)
+        key = response_cache.key(self.cache_resource, self.cache_depends_on or [self.queryset.model], request)
+        entry = response_cache.get(self.cache_resource, key)
+        if entry is not None:
+            data, etag = entry
+            cached = self.not_modified(etag) if etag else None
+            return cached or Response(data, headers={'X-Cache': 'HIT', **({'ETag': etag, 'Cache-Control': 'private, no-cache'} if etag else {})})
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set(key, (response.data, response.get('ETag')))
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def invalidate_cache(self, *models):
+        response_cache.bump(self.queryset.model, *models)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.invalidate_cache()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.invalidate_cache()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.invalidate_cache()
+
 # Auth Views
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -59,20 +367,36 @@ def login(request):
         })
     return Response({'error': 'Invalid credentials'}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def cache_stats(request):
+    return Response(response_cache.stats())
+
+@api_view(['GET'])
+@authentication_classes([MetricsAuthentication])
+@permission_classes([HasMetricsToken])
+@renderer_classes([PrometheusRenderer])
+def metrics(request):
+    return Response(request_metrics.render())
+
 # ViewSets
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SyncMixin, CachedListMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('-date_joined')
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
 
     def perform_create(self, serializer):
         user = serializer.save()
+        self.invalidate_cache()
+        self.record_saves('create', user)
         log_activity(self.request.user, 'CREATE_USER', f"Created user: {user.username}", self.request)
 
     def perform_destroy(self, instance):
         username = instance.username
+        self.record_deletes(instance)
         instance.delete()
+        self.invalidate_cache()
         log_activity(self.request.user, 'DELETE_USER', f"Deleted user: {username}", self.request)
 
     @action(detail=True, methods=['put'])
@@ -82,6 +406,8 @@ class UserViewSet(viewsets.ModelViewSet):
         if password:
             user.set_password(password)
             user.save()
+            self.invalidate_cache()
+            self.record_saves('update', user)
             log_activity(request.user, 'CHANGE_PASSWORD', f"Changed password for user ID: {pk}", request)
             return Response({'success': True})
         return Response({'error': 'Password required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -93,58 +419,99 @@ class UserViewSet(viewsets.ModelViewSet):
         if role:
             user.role = role
             user.save()
+            self.invalidate_cache()
+            self.record_saves('update', user)
             log_activity(request.user, 'CHANGE_ROLE', f"Changed role for user ID: {pk} to {role}", request)
             return Response({'success': True})
         return Response({'error': 'Role required'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=True, methods=['get'])
     def activity(self, request, pk=None):
-        logs = ActivityLog.objects.filter(user_id=pk).order_by('-createdAt')
+        logs = ActivityLog.objects.filter(user_id=pk).select_related('user').order_by('-createdAt')
+        page = self.paginate_queryset(logs)
+        if page is not None:
+            return self.get_paginated_response(ActivityLogSerializer(page, many=True).data)
         serializer = ActivityLogSerializer(logs, many=True)
         return Response(serializer.data)
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'], url_path='activity/export')
+    def activity_export(self, request, pk=None):
+        logs = ActivityLog.objects.filter(user_id=pk).select_related('user').order_by('-createdAt')
+        validate_date_range(request.query_params)
+        logs = logs.filter(**date_range_filter('createdAt', request.query_params.get('startDate'), request.query_params.get('endDate')))
+        return stream_export(logs, ActivityLogSerializer(), request.query_params.get('exportFormat', 'ndjson'), f"activity-{pk}")
+
+class EmployeeViewSet(PurgeMixin, SyncMixin, CachedListMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Employee.objects.all().order_by('-createdAt')
     serializer_class = EmployeeSerializer
+    values_serializer_class = EmployeeValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_resource = 'employees'
 
     def create(self, request, *args, **kwargs):
         data = request.data.copy()
         
-        # Generate ID Logic
         if not data.get('department'): data['department'] = 'General'
-        year = datetime.now().year
-        
-        # Find max seq
-        max_seq = 0
-        prefix = "E-"
-        suffix = f"-{year}"
-        
-        # Inefficient but matches logic needed. Better to use regex in DB or separate sequence table
-        # For SQLite and small scale, this is fine
-        candidates = Employee.objects.filter(customId__startswith=prefix, customId__endswith=suffix)
-        for emp in candidates:
-            parts = emp.customId.split('-')
-            if len(parts) == 3:
-                try:
-                    seq = int(parts[1])
-                    if seq > max_seq: max_seq = seq
-                except: pass
-        
-        next_seq = str(max_seq + 1).zfill(3)
-        data['customId'] = f"E-{next_seq}-{year}"
-        
+        data.pop('customId', None) # Always server-assigned
+
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        # Allocate the id in the same transaction as the insert so a failed save doesn't burn it
+        with transaction.atomic():
+            serializer.validated_data['customId'] = next_custom_id(Employee, 'E', 3, datetime.now().year)
+            self.perform_create(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='run-payroll')
+    def run_payroll(self, request):
+        now = timezone.now()
+        month = request.data.get('month') or now.strftime('%Y-%m')
+        try:
+            period = timezone.make_aware(datetime.strptime(month, '%Y-%m'))
+        except (TypeError, ValueError):
+            return Response({'error': 'month must be YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+        label = period.strftime('%B %Y')
+        date = now if month == now.strftime('%Y-%m') else period
+
+        employees = Employee.objects.filter(type='fixed', status='active', salary__gt=0).only('id', 'name', 'salary')
+        try:
+            with transaction.atomic():
+                # Claim the month first: a retried or concurrent run fails here and pays nobody
+                run = PayrollRun.objects.create(month=month, runBy=request.user)
+                objs = [
+                    Transaction(
+                        type='expense',
+                        amount=e.salary,
+                        category='Salary',
+                        description=f"Monthly Salary - {e.name} ({label})",
+                        date=date,
+                        employee=e,
+                    )
+                    for e in employees
+                ]
+                Transaction.objects.bulk_create(objs, batch_size=1000)
+                run.employeeCount = len(objs)
+                run.total = sum((t.amount for t in objs), 0)
+                run.save(update_fields=['employeeCount', 'total'])
+                response_cache.bump(Transaction)
+                self.record_saves('create', *objs)
+        except IntegrityError:
+            run = PayrollRun.objects.get(month=month)
+            return Response({'month': month, 'count': run.employeeCount, 'total': run.total, 'alreadyRan': True})
+
+        log_activity(request.user, 'RUN_PAYROLL', f"Ran payroll for {label}: {run.employeeCount} employees, total {run.total}", request)
+        return Response({'month': month, 'count': run.employeeCount, 'total': run.total, 'alreadyRan': False}, status=status.HTTP_201_CREATED)
+
     def perform_create(self, serializer):
         instance = serializer.save()
+        self.invalidate_cache()
+        self.record_saves('create', instance)
         log_activity(self.request.user, 'CREATE_EMPLOYEE', f"Created employee {instance.name} ({instance.customId})", self.request)
 
     def perform_update(self, serializer):
         instance = serializer.save()
+        self.invalidate_cache()
+        self.record_saves('update', instance)
         log_activity(self.request.user, 'UPDATE_EMPLOYEE', f"Updated employee ID: {instance.id}", self.request)
         
     def perform_destroy(self, instance):
@@ -152,74 +519,62 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             raise permissions.PermissionDenied("Only Admins can delete entries.")
         
         id = instance.id
-        # Manual Cascade
-        Task.objects.filter(assignee=instance).delete()
-        Transaction.objects.filter(employee=instance).delete()
-        
-        instance.delete()
+        # Cascade: the employee's tasks and transactions
+        job = self.purge_or_delete(instance)
+        if job is not None:
+            log_activity(self.request.user, 'DELETE_EMPLOYEE', f"Queued purge job {job.id} for employee ID: {id}", self.request)
+            return
+        self.invalidate_cache(Task, Transaction)
         log_activity(self.request.user, 'DELETE_EMPLOYEE', f"Deleted employee ID: {id}", self.request)
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(PurgeMixin, SyncMixin, CachedListMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all().order_by('-createdAt')
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_resource = 'projects'
+    cache_depends_on = (Project, Transaction, Task) # Totals come from the ledger and tasks
+    rendered_relations = ('rollup',)
+
+    def get_queryset(self):
+        # Totals are read from the incrementally maintained ProjectRollup row
+        return super().get_queryset().select_related('rollup')
 
     def create(self, request, *args, **kwargs):
-        with open('debug_payload.log', 'a') as f:
-            f.write(f"CREATE DATA: {request.data}\n")
-        print(f"DEBUG PROJECT CREATE DATA: {request.data}", flush=True) # Keep print just in case
+        log_payload(request, 'project.create')
         data = request.data.copy()
-        
-        # Generate Project ID (Sequential)
-        now = datetime.now()
-        year = now.year
-        
-        prefix = "P-"
-        suffix = f"-{year}"
-        
-        # Find max seq for current year
-        max_seq = 0
-        candidates = Project.objects.filter(customId__startswith=prefix, customId__endswith=suffix)
-        for proj in candidates:
-            parts = proj.customId.split('-')
-            if len(parts) == 3:
-                try:
-                    seq = int(parts[1])
-                    if seq > max_seq: max_seq = seq
-                except: pass
-        
-        next_seq = str(max_seq + 1).zfill(5) # P-00001-2026
-        data['customId'] = f"P-{next_seq}-{year}"
-        
+        data.pop('customId', None) # Always server-assigned
+
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        with transaction.atomic():
+            serializer.validated_data['customId'] = next_custom_id(Project, 'P', 5, datetime.now().year) # P-00001-2026
+            self.perform_create(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
-        with open('debug_payload.log', 'a') as f:
-            f.write(f"UPDATE DATA: {request.data}\n")
-        print(f"DEBUG PROJECT UPDATE DATA: {request.data}", flush=True)
+        log_payload(request, 'project.update', projectId=kwargs.get('pk'))
         return super().update(request, *args, **kwargs)
-        log_activity(self.request.user, 'CREATE_PROJECT', f"Created project {instance.name} ({instance.customId})", self.request)
 
     def perform_update(self, serializer):
         instance = serializer.save()
+        self.invalidate_cache()
+        self.record_saves('update', instance)
         log_activity(self.request.user, 'UPDATE_PROJECT', f"Updated project ID: {instance.id}", self.request)
 
     def perform_destroy(self, instance):
         id = instance.id
-        # Cascade
-        Transaction.objects.filter(project=instance).delete()
-        Invoice.objects.filter(project=instance).delete()
-        Task.objects.filter(project=instance).delete()
-        
-        instance.delete()
+        # Cascade: the project's transactions, invoices and tasks
+        job = self.purge_or_delete(instance)
+        if job is not None:
+            log_activity(self.request.user, 'DELETE_PROJECT', f"Queued purge job {job.id} for project ID: {id}", self.request)
+            return
+        self.invalidate_cache(Transaction, Invoice, Task)
         log_activity(self.request.user, 'DELETE_PROJECT', f"Deleted project ID: {id}", self.request)
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(SyncMixin, CachedListMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all().order_by('-createdAt')
     serializer_class = TaskSerializer
+    values_serializer_class = TaskValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -232,21 +587,24 @@ class TaskViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         task = serializer.save()
+        self.invalidate_cache()
+        self.record_saves('create', task)
         log_activity(self.request.user, 'CREATE_TASK', f"Created task {task.id} for Project {task.project_id}", self.request)
 
     def update(self, request, *args, **kwargs):
-        print(f"DEBUG TASK UPDATE: {request.data}", flush=True)
+        log_payload(request, 'task.update', taskId=kwargs.get('pk'))
         return super().update(request, *args, **kwargs)
 
     def perform_update(self, serializer):
         task = serializer.save()
+        self.invalidate_cache()
+        self.record_saves('update', task)
         log_activity(self.request.user, 'UPDATE_TASK', f"Updated task ID: {task.id}", self.request)
 
     @action(detail=True, methods=['post'])
     def pay(self, request, pk=None):
-        print(f"DEBUG PAY TASK ID: {pk}", flush=True)
         task = self.get_object()
-        print(f"DEBUG PAY TASK FOUND: {task} Cost: {task.cost}", flush=True)
+        log_payload(request, 'task.pay', body=False, taskId=task.id, cost=task.cost)
         if not task.cost:
             return Response({'error': 'Invalid task cost'}, status=status.HTTP_400_BAD_REQUEST)
             
@@ -257,26 +615,31 @@ class TaskViewSet(viewsets.ModelViewSet):
         description = f"Task Payment: {task.title} ({payee_name})"
         
         try:
-            Transaction.objects.create(
+            payment = Transaction.objects.create(
                 project=task.project,
                 employee=task.assignee, # Can be None
                 type='expense',
                 amount=task.cost,
                 category='Labor',
                 description=description,
-                date=datetime.now().isoformat()
+                date=timezone.now()
             )
-            print("DEBUG TRANSACTION CREATED", flush=True)
+            self.invalidate_cache(Transaction)
+            self.record_saves('update', task)
+            self.record_saves('create', payment)
+            log_payload(request, 'task.pay.recorded', body=False, taskId=task.id, transactionId=payment.id)
         except Exception as e:
-            print(f"DEBUG TRANSACTION ERROR: {e}", flush=True)
+            log_payload(request, 'task.pay.failed', level=logging.ERROR, body=False, taskId=task.id, error=str(e))
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         return Response({'success': True})
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(SyncMixin, CachedListMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Invoice.objects.all().order_by('-createdAt')
     serializer_class = InvoiceSerializer
+    values_serializer_class = InvoiceValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_resource = 'invoices'
 
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
@@ -289,16 +652,22 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             raise permissions.PermissionDenied("Only Admins can delete entries.")
         
         # Cascade
+        self.record_deletes(Transaction.objects.filter(invoice=instance), instance)
         Transaction.objects.filter(invoice=instance).delete()
         
         id = instance.id
         instance.delete()
+        self.invalidate_cache(Transaction)
         log_activity(self.request.user, 'DELETE_INVOICE', f"Deleted invoice #{id}", self.request)
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(SyncMixin, CachedListMixin, ConditionalGetMixin, ValuesListMixin, RelatedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Transaction.objects.all().order_by('-createdAt')
     serializer_class = TransactionSerializer
+    values_serializer_class = TransactionValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # project_details / employee_details
+    select_related_fields = ('project', 'employee')
+    rendered_relations = ('project', 'employee')
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -311,11 +680,9 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if projectId: qs = qs.filter(project_id=projectId)
         if employeeId: qs = qs.filter(employee_id=employeeId)
         if type_: qs = qs.filter(type=type_)
-        if startDate and endDate:
-            qs = qs.filter(date__range=[startDate, endDate])
-        elif startDate:
-            qs = qs.filter(date__gte=startDate)
-            
+        # Typed, indexed column: date-only bounds are parsed, and endDate covers its whole day
+        qs = qs.filter(**date_range_filter('date', startDate, endDate))
+
         return qs
 
     def create(self, request, *args, **kwargs):
@@ -327,10 +694,91 @@ class TransactionViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return super().create(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({'error': 'Expected a list of transactions'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Resolve every referenced project/employee/invoice up front: one query per relation
+        preloaded = {}
+        for field, key, model in [('project', 'projectId', Project), ('employee', 'employeeId', Employee), ('invoice', 'invoiceId', Invoice)]:
+            pks = set()
+            for row in rows:
+                value = row.get(key, row.get(field)) if isinstance(row, dict) else None
+                try:
+                    if value not in (None, ''): pks.add(int(value))
+                except (TypeError, ValueError):
+                    pass
+            preloaded[field] = model.objects.in_bulk(pks) if pks else {}
+
+        serializer = self.get_serializer(data=rows, many=True, context={**self.get_serializer_context(), 'preloaded': preloaded})
+        if not serializer.is_valid():
+            # Nothing is written unless every row is valid. DRF reports list errors
+            # either as {index: errors} or as a list padded with {} depending on version.
+            errors = serializer.errors
+            per_row = errors.items() if isinstance(errors, dict) else enumerate(errors)
+            return Response({
+                'errors': [{'index': i, 'errors': e} for i, e in per_row if e]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        objs = [Transaction(**row) for row in serializer.validated_data]
+        with transaction.atomic():
+            Transaction.objects.bulk_create(objs, batch_size=1000)
+        self.invalidate_cache()
+        self.record_saves('create', *objs)
+        log_activity(request.user, 'BULK_CREATE_TRANSACTION', f"Created {len(objs)} transactions", request)
+        return Response({
+            'created': len(objs),
+            'results': TransactionSerializer(objs, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        # Totals computed in the DB so the Dashboard doesn't download the whole ledger
+        totals = self.get_queryset().aggregate(
+            income=Sum('amount', filter=Q(type='income')),
+            expense=Sum('amount', filter=Q(type='expense')),
+        )
+        income = totals['income'] or 0
+        expense = totals['expense'] or 0
+
+        invoices = Invoice.objects.filter(status__in=OUTSTANDING_INVOICE_STATUSES)
+        projectId = request.query_params.get('projectId')
+        startDate = request.query_params.get('startDate')
+        endDate = request.query_params.get('endDate')
+        if projectId: invoices = invoices.filter(project_id=projectId)
+        invoices = invoices.filter(**date_range_filter('date', startDate, endDate))
+        outstanding = invoices.aggregate(total=Sum('total'))['total'] or 0
+
+        recent = self.get_queryset().order_by('-date')[:5]
+
+        return Response({
+            'income': income,
+            'expense': expense,
+            'balance': income - expense,
+            'outstandingInvoices': outstanding,
+            'recentTransactions': self.get_serializer(recent, many=True).data,
+        })
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        # Same filters as the list endpoint, streamed instead of built in memory
+        validate_date_range(request.query_params)
+        return stream_export(self.get_queryset(), self.get_serializer(), request.query_params.get('exportFormat', 'ndjson'), 'transactions')
+
     def perform_destroy(self, instance):
         if self.request.user.role != 'admin':
             raise permissions.PermissionDenied("Access denied")
         
         id = instance.id
+        self.record_deletes(instance)
         instance.delete()
+        self.invalidate_cache()
         log_activity(self.request.user, 'DELETE_TRANSACTION', f"Deleted transaction ID: {id}", self.request)
+
+# Progress of the large deletes queued by ProjectViewSet/EmployeeViewSet.destroy
+class PurgeJobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = PurgeJob.objects.all().order_by('-createdAt')
+    serializer_class = PurgeJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
@@ -0,0 +1,52 @@
+"""
+The one background thread per process behind the activity log writer
+(api/audit.py), purge jobs (api/purge.py), the metrics flusher
+(api/metrics.py), the payload log listener (api/payloads.py) and the Redis
+event relay (api/events.py).
+
+A forked worker process inherits its parent's objects but none of its
+threads, so LazyWorker remembers which process started its thread and starts
+it again on first use in any other. on_start runs before every start, under
+the lock, to rebuild state the parent's thread owned (a queue, for instance).
+"""
+import os
+import threading
+
+
+class LazyWorker:
+    """A daemon thread running `target`, started by ensure_started() once per process."""
+
+    def __init__(self, target, name, on_start=None):
+        self.target = target
+        self.name = name
+        self.on_start = on_start
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.pid = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.pid == os.getpid()
+
+    def ensure_started(self):
+        if self.running:
+            return
+        with self.lock:
+            if self.running:
+                return
+            if self.on_start is not None:
+                self.on_start()
+            self.stopping.clear()
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=5):
+        """Set `stopping` and wait for the thread; False if it was never started."""
+        if self.thread is None:
+            return False
+        self.stopping.set()
+        self.thread.join(timeout=timeout)
+        self.thread = None
+        return True
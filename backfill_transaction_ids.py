@@ -3,15 +3,25 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plansculpt_backend.settings')
 django.setup()
 
-from api.models import Transaction
+from django.db import transaction
+from django.utils import timezone
+from api.models import Transaction, new_transaction_ids
+
+BATCH_SIZE = 1000
 
 def backfill():
-    txns = Transaction.objects.filter(customId__isnull=True)
-    count = txns.count()
-    print(f"Found {count} transactions without ID.")
-    for t in txns:
-        t.save() # Triggers the ID generation in save() method
-        print(f"Updated {t.id} -> {t.customId}")
+    txns = list(Transaction.objects.filter(customId__isnull=True).only('id'))
+    print(f"Found {len(txns)} transactions without ID.")
+    if not txns:
+        return
+    # Ids are assigned in memory and written back in batched UPDATEs instead of save() per row
+    with transaction.atomic():
+        now = timezone.now() # bulk_update skips auto_now; keep ETags/sync cursors moving
+        for t, custom_id in zip(txns, new_transaction_ids(len(txns))):
+            t.customId = custom_id
+            t.updatedAt = now
+        Transaction.objects.bulk_update(txns, ['customId', 'updatedAt'], batch_size=BATCH_SIZE)
+    print(f"Updated {len(txns)} transactions.")
 
 if __name__ == '__main__':
     backfill()
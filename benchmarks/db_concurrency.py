@@ -0,0 +1,120 @@
+"""
+Read/write throughput of each database profile under concurrent workers.
+
+    python benchmarks/db_concurrency.py --workers 8 --seconds 10
+    DB_NAME=plansculpt DB_USER=... python benchmarks/db_concurrency.py --postgres
+
+Each worker is a separate process running the settings.py profile selected by
+its environment, and loops like a request handler: one read (a 50-row
+transactions page) or one write (a Transaction insert), then
+close_old_connections() as request_finished would. Profiles:
+
+    sqlite-baseline   rollback journal, no pragmas, a new connection per op
+    sqlite-tuned      WAL + synchronous=NORMAL + busy_timeout + mmap/cache, persistent
+    postgres          persistent connections + health checks        (--postgres)
+    postgres-pool     psycopg pool (DB_POOL=1)                       (--postgres)
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SQLITE_PROFILES = {
+    'sqlite-baseline': {'DB_ENGINE': 'sqlite', 'SQLITE_TUNING': '0', 'DB_CONN_MAX_AGE': '0'},
+    'sqlite-tuned': {'DB_ENGINE': 'sqlite', 'SQLITE_TUNING': '1', 'DB_CONN_MAX_AGE': '60'},
+}
+POSTGRES_PROFILES = {
+    'postgres': {'DB_ENGINE': 'postgres', 'DB_POOL': '0', 'DB_CONN_MAX_AGE': '60'},
+    'postgres-pool': {'DB_ENGINE': 'postgres', 'DB_POOL': '1'},
+}
+
+
+def setup(env):
+    os.environ.update(env)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plansculpt_backend.settings')
+    sys.path.insert(0, str(ROOT))
+    import django
+    django.setup()
+
+
+def prepare(env, rows):
+    setup(env)
+    from django.core.management import call_command
+    from django.utils import timezone
+    from api.models import Transaction
+    call_command('migrate', verbosity=0)
+    if not Transaction.objects.exists():
+        now = timezone.now()
+        Transaction.objects.bulk_create(
+            Transaction(type='income', amount=1, category='Bench', description='seed', date=now) for _ in range(rows)
+        )
+
+
+def worker(env, seconds, write_ratio, results):
+    setup(env)
+    from django.db import close_old_connections, OperationalError
+    from django.utils import timezone
+    from api.models import Transaction
+
+    rng = random.Random(os.getpid())
+    reads = writes = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                Transaction.objects.create(type='expense', amount=1, category='Bench', description='load', date=timezone.now())
+                writes += 1
+            else:
+                list(Transaction.objects.order_by('-createdAt', '-id')[:50])
+                reads += 1
+        except OperationalError:
+            errors += 1 # e.g. "database is locked"
+        close_old_connections()
+    results.put((reads, writes, errors))
+
+
+def run(name, env, args):
+    print(f'{name:<16}', end='', flush=True)
+    ctx = multiprocessing.get_context('spawn')
+    prep = ctx.Process(target=prepare, args=(env, args.rows))
+    prep.start()
+    prep.join()
+
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(env, args.seconds, args.write_ratio, results)) for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    totals = [sum(col) for col in zip(*(results.get() for _ in procs))]
+    for p in procs:
+        p.join()
+    reads, writes, errors = totals
+    print(f'{reads / args.seconds:>12.0f}{writes / args.seconds:>12.0f}{errors:>10}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--rows', type=int, default=10_000, help='transactions to seed before the run')
+    parser.add_argument('--postgres', action='store_true', help='also run the PostgreSQL profiles (DB_* env vars)')
+    args = parser.parse_args()
+
+    print(f'{args.workers} workers, {args.seconds:g}s, {args.write_ratio:.0%} writes')
+    print(f'{"profile":<16}{"reads/s":>12}{"writes/s":>12}{"errors":>10}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, env in SQLITE_PROFILES.items():
+            run(name, {**env, 'DB_NAME': str(Path(tmp) / f'{name}.sqlite3')}, args)
+    if args.postgres:
+        for name, env in POSTGRES_PROFILES.items():
+            run(name, env, args)
+
+
+if __name__ == '__main__':
+    main()
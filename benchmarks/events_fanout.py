@@ -0,0 +1,108 @@
+"""
+Memory and fan-out latency of /api/events with many idle subscribers.
+
+    python benchmarks/events_fanout.py                     # 1,000 subscribers
+    python benchmarks/events_fanout.py --subscribers 5000 --writes 50
+
+Drives the real ASGI endpoint (api.events.sse_app) in-process: each
+subscriber is a full connection coroutine with fake receive/send callables,
+so the numbers cover the broker, the per-connection queue and the streaming
+loop, but not the ASGI server's own socket buffers. Token checks are stubbed
+out (they run once per connection, not per event).
+"""
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plansculpt_backend.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from api import events  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=1000)
+    parser.add_argument('--writes', type=int, default=20, help='writes published after everyone is connected')
+    parser.add_argument('--ids-per-write', type=int, default=1)
+    return parser.parse_args()
+
+
+async def main(args):
+    events.authenticate_token = lambda token: 'user'
+    delivered = [0] * args.subscribers
+    latencies = []
+    published_at = {}
+    all_connected = asyncio.Event()
+    disconnect = asyncio.Event()
+    connected = 0
+
+    def connection(index):
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal connected
+            body = message.get('body', b'')
+            if body.startswith(b'retry'):
+                connected += 1
+                if connected == args.subscribers:
+                    all_connected.set()
+            elif body.startswith(b'event'):
+                now = time.perf_counter()
+                for chunk in body.split(b'\n\n'):
+                    if chunk.startswith(b'event'):
+                        delivered[index] += 1
+                        version = int(chunk.rsplit(b'"version":', 1)[1].rstrip(b'}'))
+                        latencies.append(now - published_at[version])
+
+        scope = {'type': 'http', 'path': '/api/events', 'query_string': b'token=x'}
+        return events.sse_app(scope, receive, send)
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.ensure_future(connection(i)) for i in range(args.subscribers)]
+    await all_connected.wait()
+    await asyncio.sleep(0.1)
+    gc.collect()
+    idle = tracemalloc.get_traced_memory()[0] - baseline
+    print(f'{args.subscribers:,} subscribers connected: {idle / 1024 / 1024:.2f} MiB traced, '
+          f'{idle / args.subscribers / 1024:.2f} KiB per connection')
+    tracemalloc.stop() # Tracing every allocation would dominate the timings below
+
+    expected = args.writes * args.ids_per_write
+    started = time.perf_counter()
+    for write in range(args.writes):
+        published_at[write] = time.perf_counter()
+        events.broker.dispatch([{'resource': 'transaction', 'id': i, 'op': 'update', 'version': write}
+                                for i in range(args.ids_per_write)])
+        await asyncio.sleep(0)
+    while sum(delivered) < expected * args.subscribers:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    total = expected * args.subscribers
+    print(f'{args.writes} writes x {args.ids_per_write} ids -> {total:,} deliveries in {elapsed * 1000:.1f} ms '
+          f'({total / elapsed:,.0f} events/s)')
+    print(f'delivery latency: p50 {statistics.median(latencies) * 1000:.2f} ms, '
+          f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms')
+
+    disconnect.set()
+    await asyncio.gather(*tasks)
+    print(f'after disconnect: {events.broker.stats()["subscribers"]} subscribers left')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
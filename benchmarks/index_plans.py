@@ -0,0 +1,113 @@
+"""
+Query plans and latency for the list/filter shapes in api/views.py, with and
+without the composite indexes from migration 0007.
+
+    python benchmarks/index_plans.py                      # 1M transactions
+    python benchmarks/index_plans.py --rows 200000 --reuse
+
+Seeds a throwaway SQLite database (never the project's db.sqlite3), then for
+each query prints EXPLAIN QUERY PLAN and the median of --repeat runs, first
+with the 0007 indexes dropped ("before") and then with them in place ("after").
+"""
+import argparse
+import importlib
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plansculpt_backend.settings')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/plansculpt_bench.sqlite3')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='transactions to seed')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--reuse', action='store_true', help='keep an already seeded --db')
+    return parser.parse_args()
+
+
+args = parse_args()
+
+from django.conf import settings  # noqa: E402
+settings.DATABASES['default']['NAME'] = args.db
+
+import django  # noqa: E402
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.apps import apps  # noqa: E402
+from api.dates import date_range_filter  # noqa: E402
+from api.models import User, Employee, Project, Task, Transaction, ActivityLog  # noqa: E402
+from api.views import ProjectViewSet  # noqa: E402
+
+def seed(n):
+    # Raw batched INSERTs with valid FKs, rollups rebuilt and ANALYZE run
+    call_command('seed_synthetic', users=20, employees=1000, projects=500, invoices=n // 50, tasks=n // 10,
+                 transactions=n, activity=n // 10)
+
+
+def queries():
+    project_id = Project.objects.order_by('id').values_list('id', flat=True)[250]
+    employee_id = Employee.objects.order_by('id').values_list('id', flat=True)[500]
+    user_id = User.objects.order_by('id').values_list('id', flat=True)[10]
+    month = date_range_filter('date', '2025-03-01', '2025-03-31')
+    return {
+        'transactions page': lambda: Transaction.objects.order_by('-createdAt', '-id')[:50],
+        'transactions ?projectId=': lambda: Transaction.objects.filter(project_id=project_id).order_by('-createdAt', '-id')[:50],
+        'transactions ?employeeId=': lambda: Transaction.objects.filter(employee_id=employee_id).order_by('-createdAt', '-id')[:50],
+        'summary ?type=&month': lambda: Transaction.objects.filter(type='expense', **month).values('type').annotate(total=Sum('amount')),
+        'projects list (rollups)': lambda: ProjectViewSet(request=None, format_kwarg=None).get_queryset()[:50],
+        'tasks ?projectId=': lambda: Task.objects.filter(project_id=project_id).order_by('-createdAt', '-id')[:50],
+        'activity by user': lambda: ActivityLog.objects.filter(user_id=user_id).order_by('-createdAt', '-id')[:50],
+    }
+
+
+def new_indexes():
+    migration = importlib.import_module('api.migrations.0007_list_filter_indexes').Migration
+    return [(apps.get_model('api', op.model_name), op.index) for op in migration.operations if hasattr(op, 'index')]
+
+
+def measure(label):
+    print(f'\n=== {label} ===')
+    for name, build in queries().items():
+        qs = build()
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            list(qs.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f'\n{name}: {statistics.median(timings):.2f} ms (median of {args.repeat})')
+        for line in qs.explain().splitlines():
+            print(f'    {line}')
+
+
+def main():
+    fresh = not (args.reuse and Path(args.db).exists())
+    if fresh and Path(args.db).exists():
+        Path(args.db).unlink()
+    call_command('migrate', verbosity=0)
+    if fresh:
+        seed(args.rows)
+
+    indexes = new_indexes()
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    measure('before (0007 indexes dropped)')
+
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.add_index(model, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    measure('after')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Serialization time and bytes on the wire for a large /api/transactions/
+response: DRF's stdlib JSONRenderer vs ORJSONRenderer (api/renderers.py),
+then the rendered body under each coding CompressionMiddleware can pick.
+
+    python benchmarks/json_compression.py                   # 100,000 transactions
+    python benchmarks/json_compression.py --rows 20000 --reuse
+
+Seeds a throwaway SQLite database (never the project's db.sqlite3). Row data
+comes from the list endpoint's own rendering path, so only the renderer and
+the encoding differ between lines. Ends with one full GET through the test
+client (auth, view, renderer, middleware) with Accept-Encoding: gzip, br.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plansculpt_backend.settings')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/plansculpt_json.sqlite3')
+    parser.add_argument('--rows', type=int, default=100_000, help='transactions to seed')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--reuse', action='store_true', help='keep an already seeded --db')
+    return parser.parse_args()
+
+
+args = parse_args()
+
+from django.conf import settings  # noqa: E402
+settings.DATABASES['default']['NAME'] = args.db
+settings.ALLOWED_HOSTS = ['testserver']
+
+import django  # noqa: E402
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import transaction  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIClient, APIRequestFactory  # noqa: E402
+from api.middleware import brotli, brotli_chunks, gzip_chunks  # noqa: E402
+from api.models import User, Employee, Project, Transaction  # noqa: E402
+from api.renderers import ORJSONRenderer  # noqa: E402
+from api.views import TransactionViewSet  # noqa: E402
+
+EPOCH = datetime(2023, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def seed(n):
+    rng = random.Random(42)
+    with transaction.atomic():
+        projects = Project.objects.bulk_create([Project(name=f'Project {i}', client=f'Client {i}', clientEmail=f'c{i}@x.test',
+                                                        clientPhone='555-0100') for i in range(200)])
+        employees = Employee.objects.bulk_create([Employee(name=f'Employee {i}', role='Dev', email=f'e{i}@x.test', phone='555-0199')
+                                                  for i in range(1000)])
+        owners = projects + [None]
+        for start in range(0, n, 10_000):
+            Transaction.objects.bulk_create([
+                Transaction(type=rng.choice(['income', 'expense']), amount=Decimal(rng.randrange(1, 500000)) / 100,
+                            category=rng.choice(['Sales', 'Labor', 'Materials', 'Salary']), description=f'Seeded row {i}',
+                            date=EPOCH + timedelta(seconds=rng.randrange(3 * 365 * 24 * 3600), microseconds=rng.randrange(10**6)),
+                            project=rng.choice(owners), employee=rng.choice(employees))
+                for i in range(start, min(start + 10_000, n))
+            ], batch_size=1000)
+        User.objects.create(username='bench_admin', role='admin')
+
+
+def timed(fn):
+    timings, result = [], None
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    fresh = not (args.reuse and Path(args.db).exists())
+    if fresh and Path(args.db).exists():
+        Path(args.db).unlink()
+    call_command('migrate', verbosity=0)
+    if fresh:
+        print(f'Seeding {args.rows:,} transactions into {args.db} ...')
+        seed(args.rows)
+
+    view = TransactionViewSet(request=Request(APIRequestFactory().get('/')), format_kwarg=None, kwargs={})
+    values = view.values_serializer_class()
+    data = values.render(values.queryset(view.get_queryset()))
+    print(f'\n{len(data):,} rows')
+
+    print('\nrenderer          median ms        bytes')
+    bodies = {}
+    for renderer in (JSONRenderer(), ORJSONRenderer()):
+        seconds, bodies[type(renderer).__name__] = timed(lambda: renderer.render(data))
+        print(f'{type(renderer).__name__:16}{seconds * 1000:>11.1f}{len(bodies[type(renderer).__name__]):>13,}')
+    if len(set(bodies.values())) != 1:
+        raise SystemExit('renderers disagree')
+    body = bodies['ORJSONRenderer']
+
+    print('\nencoding          median ms        bytes    ratio')
+    codings = [('identity', lambda: body)] + [(f'gzip -{level}', lambda level=level: b''.join(gzip_chunks([body], level)))
+                                             for level in (1, settings.RESPONSE_COMPRESSION['GZIP_LEVEL'])]
+    if brotli is not None:
+        codings += [(f'br q{quality}', lambda quality=quality: b''.join(brotli_chunks([body], quality)))
+                    for quality in (1, settings.RESPONSE_COMPRESSION['BROTLI_QUALITY'])]
+    else:
+        print('(brotli not installed: br rows skipped)')
+    for name, encode in codings:
+        seconds, encoded = timed(encode)
+        print(f'{name:16}{seconds * 1000:>11.1f}{len(encoded):>13,}{len(body) / len(encoded):>8.1f}x')
+
+    client = APIClient()
+    client.force_authenticate(User.objects.get(username='bench_admin'))
+    seconds, response = timed(lambda: client.get('/api/transactions/', HTTP_ACCEPT_ENCODING='gzip, br'))
+    print(f"\nGET /api/transactions/ end to end: {seconds * 1000:.0f} ms, {len(response.content):,} bytes "
+          f"({response.get('Content-Encoding', 'identity')}, JSON_BACKEND={settings.JSON_BACKEND})")
+
+
+if __name__ == '__main__':
+    main()
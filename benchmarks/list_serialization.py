@@ -0,0 +1,125 @@
+"""
+Rows per second for GET list rendering: ModelSerializer vs the .values() fast
+path (api/fastlists.py), for employees, tasks, invoices and transactions.
+
+    python benchmarks/list_serialization.py                 # 20,000 rows each
+    python benchmarks/list_serialization.py --rows 100000 --reuse
+
+Seeds a throwaway SQLite database (never the project's db.sqlite3) and, for
+each resource, times the viewset's list queryset through both paths: "build"
+is fetch + row dicts, "render" adds JSONRenderer. Each path's rendered bytes
+are compared before anything is timed.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plansculpt_backend.settings')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/plansculpt_lists.sqlite3')
+    parser.add_argument('--rows', type=int, default=20_000, help='rows per resource')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--reuse', action='store_true', help='keep an already seeded --db')
+    return parser.parse_args()
+
+
+args = parse_args()
+
+from django.conf import settings  # noqa: E402
+settings.DATABASES['default']['NAME'] = args.db
+
+import django  # noqa: E402
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import transaction  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from api.models import Employee, Project, Task, Invoice, Transaction  # noqa: E402
+from api.views import EmployeeViewSet, TaskViewSet, InvoiceViewSet, TransactionViewSet  # noqa: E402
+
+EPOCH = datetime(2023, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def seed(n):
+    rng = random.Random(42)
+    moment = lambda: EPOCH + timedelta(seconds=rng.randrange(3 * 365 * 24 * 3600), microseconds=rng.randrange(10**6))
+    with transaction.atomic():
+        projects = Project.objects.bulk_create([Project(name=f'P{i}', client='Client', clientEmail='c@x.test') for i in range(200)])
+        employees = Employee.objects.bulk_create([
+            Employee(name=f'E{i}', role='Dev', salary=Decimal(rng.randrange(100000)) / 100, email=f'e{i}@x.test',
+                     phone='555-0100', customId=f'E-{i:06d}')
+            for i in range(n)
+        ], batch_size=1000)
+        assignees, owners = employees + [None], projects + [None]
+        Task.objects.bulk_create([
+            Task(title=f'T{i}', project=rng.choice(projects), assignee=rng.choice(assignees),
+                 cost=Decimal(rng.randrange(10000)) / 100, status=rng.choice(['Pending', 'Completed']))
+            for i in range(n)
+        ], batch_size=1000)
+        items = '[{"desc": "Design", "qty": 2, "price": 150.0}, {"desc": "Build", "qty": 10, "price": 95.5}]'
+        invoices = Invoice.objects.bulk_create([
+            Invoice(project=rng.choice(projects), clientName='Client', items=items, total=Decimal('1255.00'), status='Sent')
+            for _ in range(n)
+        ], batch_size=1000)
+        bills = invoices + [None] * 4 # Most transactions aren't tied to an invoice
+        Transaction.objects.bulk_create([
+            Transaction(type=rng.choice(['income', 'expense']), amount=Decimal(rng.randrange(1, 500000)) / 100,
+                        category='Bench', description='seeded', date=moment(), project=rng.choice(owners),
+                        employee=rng.choice(employees), invoice=rng.choice(bills))
+            for _ in range(n)
+        ], batch_size=1000)
+
+
+def median_seconds(fn):
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    fresh = not (args.reuse and Path(args.db).exists())
+    if fresh and Path(args.db).exists():
+        Path(args.db).unlink()
+    call_command('migrate', verbosity=0)
+    if fresh:
+        print(f'Seeding {args.rows:,} rows per resource into {args.db} ...')
+        seed(args.rows)
+
+    renderer = JSONRenderer()
+    print(f"\n{'':14}{'serializer build':>18}{'values build':>16}{'serializer render':>19}{'values render':>16}")
+    for viewset in [EmployeeViewSet, TaskViewSet, InvoiceViewSet, TransactionViewSet]:
+        view = viewset(request=Request(APIRequestFactory().get('/')), format_kwarg=None, kwargs={})
+        queryset = view.get_queryset()
+        values = viewset.values_serializer_class()
+
+        slow = lambda: viewset.serializer_class(queryset.all(), many=True).data
+        fast = lambda: values.render(values.queryset(queryset.all()))
+        if renderer.render(slow()) != renderer.render(fast()):
+            raise SystemExit(f'{viewset.__name__}: fast path output differs')
+
+        rows = queryset.count()
+        rates = [rows / median_seconds(build) for build in (slow, fast)]
+        rates += [rows / median_seconds(lambda: renderer.render(build())) for build in (slow, fast)]
+        name = viewset.queryset.model._meta.verbose_name_plural
+        print(f'{name:14}' + ''.join(f'{rate:>{width},.0f}' for rate, width in zip(rates, (18, 16, 19, 16)))
+              + f'   ({rates[1] / rates[0]:.1f}x / {rates[3] / rates[2]:.1f}x)')
+    print('\nrows/s, median of', args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+"""
+Concurrent load test over every route in api/urls.py: p50/p95/p99 latency,
+throughput and queries per request, with a saved baseline to diff against.
+
+    python benchmarks/load_test.py                          # 4 clients, 30s, --scale 0.01 seed
+    python benchmarks/load_test.py --reuse --save baseline.json
+    python benchmarks/load_test.py --reuse --compare baseline.json --tolerance 0.25
+
+Seeds a throwaway database with `manage.py seed_synthetic` (never the
+project's db.sqlite3; DB_ENGINE/DB_* select PostgreSQL as in settings.py).
+Each client is a separate process driving the full Django stack (middleware,
+JWT auth, views, renderers) through django.test.Client with DEBUG off, so a
+run measures the application and the database without a web server in front.
+Every named route needs a scenario below; a new route without one fails the
+run. --compare exits 1 when a scenario's p95 grows past --tolerance (and by
+more than --min-delta-ms) or its average query count grows at all.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PASSWORD = 'load-test-password'
+
+
+class Scenario:
+    """
+    One weighted request. build(client, fixtures, unique) returns (method, path,
+    body); anything it does itself through the client (e.g. creating the row a
+    DELETE removes) is neither timed nor counted.
+    """
+
+    def __init__(self, name, route, weight, build):
+        self.name, self.route, self.weight, self.build = name, route, weight, build
+
+
+def get(path):
+    return lambda client, f, n: ('get', path.format(**f), None)
+
+
+def created(client, path, body):
+    return json.loads(client.post(path, json.dumps(body), content_type='application/json').content)['id']
+
+
+def transaction_row(f, n):
+    return {'type': 'expense', 'amount': '12.50', 'category': 'Load', 'description': f'load {n}', 'date': '2026-01-15',
+            'projectId': f['project'], 'employeeId': f['employee']}
+
+
+SCENARIOS = [
+    Scenario('GET /', 'api-root', 1, get('/api/')),
+    Scenario('POST auth/login', 'auth/login', 1,
+             lambda client, f, n: ('post', '/api/auth/login', {'username': f['username'], 'password': PASSWORD})),
+    Scenario('POST auth/register', 'auth/register', 1,
+             lambda client, f, n: ('post', '/api/auth/register', {'username': f'load_{n}', 'password': PASSWORD})),
+    Scenario('GET cache/stats', 'cache/stats', 1, get('/api/cache/stats')),
+    Scenario('GET metrics', 'metrics', 1, get('/api/metrics')),
+    Scenario('GET finance/summary', 'finance/summary', 3, get('/api/finance/summary')),
+
+    Scenario('GET users/', 'user-list', 3, get('/api/users/?limit=50')),
+    Scenario('GET users/:id/', 'user-detail', 3, get('/api/users/{user}/')),
+    Scenario('PUT users/:id/password/', 'user-password', 1,
+             lambda client, f, n: ('put', f"/api/users/{f['user']}/password/", {'password': PASSWORD})),
+    Scenario('PUT users/:id/role/', 'user-role', 1,
+             lambda client, f, n: ('put', f"/api/users/{f['user']}/role/", {'role': 'user'})),
+    Scenario('GET users/:id/activity/', 'user-activity', 3, get('/api/users/{user}/activity/?limit=50')),
+    Scenario('GET users/:id/activity/export/', 'user-activity-export', 1, get('/api/users/{user}/activity/export/')),
+
+    Scenario('GET employees/', 'employee-list', 5, get('/api/employees/?limit=50')),
+    Scenario('GET employees/:id/', 'employee-detail', 3, get('/api/employees/{employee}/')),
+    Scenario('PATCH employees/:id/', 'employee-detail', 1,
+             lambda client, f, n: ('patch', f"/api/employees/{f['employee']}/", {'phone': f'555-{n}'})),
+    Scenario('POST employees/run-payroll/', 'employee-run-payroll', 1,
+             lambda client, f, n: ('post', '/api/employees/run-payroll/', {'month': '2026-01'})),
+
+    Scenario('GET projects/', 'project-list', 5, get('/api/projects/?limit=50')),
+    Scenario('GET projects/:id/', 'project-detail', 3, get('/api/projects/{project}/')),
+    Scenario('POST projects/', 'project-list', 1,
+             lambda client, f, n: ('post', '/api/projects/', {'name': f'Load {n}', 'client': 'Load Co', 'clientEmail': 'load@example.test'})),
+    Scenario('DELETE projects/:id/', 'project-detail', 1,
+             lambda client, f, n: ('delete', f"/api/projects/{created(client, '/api/projects/', {'name': f'Load {n}', 'client': 'Load Co'})}/", None)),
+
+    Scenario('GET tasks/', 'task-list', 5, get('/api/tasks/?limit=50')),
+    Scenario('GET tasks/?projectId=', 'task-list', 3, get('/api/tasks/?limit=50&projectId={project}')),
+    Scenario('GET tasks/:id/', 'task-detail', 3, get('/api/tasks/{task}/')),
+    Scenario('PATCH tasks/:id/', 'task-detail', 2,
+             lambda client, f, n: ('patch', f"/api/tasks/{f['task']}/", {'status': random.choice(['Pending', 'Completed'])})),
+    Scenario('POST tasks/:id/pay/', 'task-pay', 1, lambda client, f, n: ('post', f"/api/tasks/{f['task']}/pay/", None)),
+
+    Scenario('GET invoices/', 'invoice-list', 3, get('/api/invoices/?limit=50')),
+    Scenario('GET invoices/:id/', 'invoice-detail', 2, get('/api/invoices/{invoice}/')),
+
+    Scenario('GET transactions/', 'transaction-list', 5, get('/api/transactions/?limit=50')),
+    Scenario('GET transactions/?projectId=', 'transaction-list', 3, get('/api/transactions/?limit=50&projectId={project}')),
+    Scenario('GET transactions/:id/', 'transaction-detail', 3, get('/api/transactions/{transaction}/')),
+    Scenario('POST transactions/', 'transaction-list', 2,
+             lambda client, f, n: ('post', '/api/transactions/', transaction_row(f, n))),
+    Scenario('DELETE transactions/:id/', 'transaction-detail', 1,
+             lambda client, f, n: ('delete', f"/api/transactions/{created(client, '/api/transactions/', transaction_row(f, n))}/", None)),
+    Scenario('POST transactions/bulk/', 'transaction-bulk', 1,
+             lambda client, f, n: ('post', '/api/transactions/bulk/', [transaction_row(f, f'{n}.{i}') for i in range(10)])),
+    Scenario('GET transactions/summary/', 'transaction-summary', 3, get('/api/transactions/summary/')),
+    Scenario('GET transactions/export/', 'transaction-export', 1, get('/api/transactions/export/?projectId={project}')),
+
+    Scenario('GET purge-jobs/', 'purgejob-list', 1, get('/api/purge-jobs/')),
+    Scenario('GET purge-jobs/:id/', 'purgejob-detail', 1, get('/api/purge-jobs/{purge_job}/')),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='/tmp/plansculpt_load.sqlite3')
+    parser.add_argument('--scale', type=float, default=0.01, help='seed_synthetic --scale for a fresh --db')
+    parser.add_argument('--reuse', action='store_true', help='keep an already seeded --db')
+    parser.add_argument('--clients', type=int, default=4, help='concurrent client processes')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--only', help='run only scenarios whose name contains this text')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --save')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative p95 growth')
+    parser.add_argument('--min-delta-ms', type=float, default=5, help='ignore p95 growth smaller than this')
+    return parser.parse_args()
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plansculpt_backend.settings')
+    sys.path.insert(0, str(ROOT))
+    from django.conf import settings
+    settings.DEBUG = False # No connection.queries bookkeeping, production error pages
+    settings.ALLOWED_HOSTS = ['localhost']
+    import django
+    django.setup()
+
+
+def named_routes(patterns, prefix=''):
+    from django.urls import URLResolver
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from named_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield pattern.name or prefix + str(pattern.pattern)
+
+
+def prepare(args):
+    setup()
+    from django.core.management import call_command
+    from django.db.models import Count
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from api import urls
+    from api.models import User, Task, Invoice, Transaction, ActivityLog, PurgeJob
+
+    missing = set(named_routes(urls.urlpatterns)) - {scenario.route for scenario in SCENARIOS}
+    if missing:
+        raise SystemExit(f'No load test scenario for route(s): {", ".join(sorted(missing))}')
+
+    call_command('migrate', verbosity=0)
+    if not Transaction.objects.exists():
+        call_command('seed_synthetic', scale=args.scale)
+
+    admin, _ = User.objects.get_or_create(username='load_admin', defaults={'role': 'admin'})
+    admin.role = 'admin'
+    admin.set_password(PASSWORD)
+    admin.save()
+    # A finished job for the purge-jobs scenarios to read back; nothing here deletes enough to queue one
+    job = PurgeJob.objects.first() or PurgeJob.objects.create(resource='project', objectId=0, status='done')
+    busiest = lambda model, field, **filters: (model.objects.filter(**filters).values(field).annotate(n=Count('id'))
+                                              .order_by('-n').values_list(field, flat=True)[0])
+    return {
+        'token': str(RefreshToken.for_user(admin).access_token),
+        'username': admin.username,
+        'user': busiest(ActivityLog, 'user', user__isnull=False),
+        'employee': busiest(Transaction, 'employee', employee__isnull=False),
+        'project': busiest(Task, 'project'),
+        'task': Task.objects.filter(cost__gt=0).values_list('id', flat=True).first(),
+        'invoice': Invoice.objects.values_list('id', flat=True).first(),
+        'transaction': Transaction.objects.values_list('id', flat=True).first(),
+        'purge_job': job.id,
+    }
+
+
+def worker(index, fixtures, names, seconds, results):
+    setup()
+    from django.db import connection
+    from django.test import Client
+
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {fixtures['token']}", SERVER_NAME='localhost')
+    rng = random.Random(index)
+    unique = (f'{os.getpid()}_{i}' for i in itertools.count())
+    queries = 0
+
+    def counting(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    def call(scenario):
+        nonlocal queries
+        method, path, body = scenario.build(client, fixtures, next(unique))
+        kwargs = {'data': json.dumps(body), 'content_type': 'application/json'} if body is not None else {}
+        queries = 0
+        started = time.perf_counter()
+        with connection.execute_wrapper(counting):
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return (time.perf_counter() - started) * 1000, queries, response.status_code
+
+    scenarios = [s for s in SCENARIOS if s.name in names]
+    samples = defaultdict(list)
+    with contextlib.redirect_stdout(open(os.devnull, 'w')): # Views that still print() debug lines
+        for scenario in scenarios: # Warm-up: caches, first payroll run, lazy imports
+            call(scenario)
+        weights = [scenario.weight for scenario in scenarios]
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            scenario = rng.choices(scenarios, weights)[0]
+            samples[scenario.name].append(call(scenario))
+        elapsed = time.perf_counter() - started
+    results.put((dict(samples), elapsed))
+
+
+def percentile(cuts, p):
+    return cuts[p - 1] if cuts else 0.0
+
+
+def summarize(samples):
+    timings = sorted(ms for ms, _, _ in samples)
+    cuts = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+    return {
+        'count': len(samples),
+        'p50': percentile(cuts, 50),
+        'p95': percentile(cuts, 95),
+        'p99': percentile(cuts, 99),
+        'queries': statistics.fmean(q for _, q, _ in samples),
+        'errors': sum(status >= 400 for _, _, status in samples),
+    }
+
+
+def regressions(report, baseline, args):
+    found = []
+    for name, now in report['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        if now['p95'] > before['p95'] * (1 + args.tolerance) and now['p95'] - before['p95'] > args.min_delta_ms:
+            found.append(f"{name}: p95 {before['p95']:.1f} -> {now['p95']:.1f} ms")
+        if now['queries'] > before['queries'] + 0.5:
+            found.append(f"{name}: queries {before['queries']:.1f} -> {now['queries']:.1f} per request")
+    return found
+
+
+def main():
+    args = parse_args()
+    if Path(args.db).exists() and not args.reuse:
+        Path(args.db).unlink()
+    os.environ['DB_NAME'] = args.db # Inherited by every client process
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool: # Seed and pick fixtures in a child so this process never opens the DB
+        fixtures = pool.apply(prepare, (args,))
+    scenarios = [s for s in SCENARIOS if not args.only or args.only in s.name]
+
+    print(f'{args.clients} clients, {args.seconds:g}s, {len(scenarios)} scenarios, {args.db}')
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(i, fixtures, [s.name for s in scenarios], args.seconds, results)) for i in range(args.clients)]
+    for p in procs:
+        p.start()
+    merged, throughput = defaultdict(list), 0.0
+    for _ in procs:
+        samples, elapsed = results.get()
+        for name, rows in samples.items():
+            merged[name].extend(rows)
+        throughput += sum(map(len, samples.values())) / elapsed
+    for p in procs:
+        p.join()
+
+    report = {'clients': args.clients, 'seconds': args.seconds, 'throughput': throughput,
+              'scenarios': {s.name: summarize(merged[s.name]) for s in scenarios if merged[s.name]}}
+    print(f"\n{'scenario':34}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'errors':>8}")
+    for name, row in report['scenarios'].items():
+        print(f"{name:34}{row['count']:>7}{row['p50']:>9.1f}{row['p95']:>9.1f}{row['p99']:>9.1f}"
+              f"{row['queries']:>9.1f}{row['errors']:>8}")
+    print(f'\n{throughput:,.0f} requests/s across {args.clients} clients')
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        found = regressions(report, json.loads(Path(args.compare).read_text()), args)
+        if found:
+            print('\nRegressions against', args.compare)
+            print('\n'.join(f'  {line}' for line in found))
+            raise SystemExit(1)
+        print('\nNo regressions against', args.compare)
+
+
+if __name__ == '__main__':
+    main()
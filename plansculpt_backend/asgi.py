@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plansculpt_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.events import sse_app  # noqa: E402  (needs the app registry loaded above)
+
+
+async def application(scope, receive, send):
+    # Server-sent change events are streamed outside Django's request cycle
+    if scope['type'] == 'http' and scope['path'].rstrip('/') == '/api/events':
+        await sse_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
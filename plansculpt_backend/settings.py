@@ -10,7 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
+import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,12 +47,113 @@ INSTALLED_APPS = [
 
 AUTH_USER_MODEL = 'api.User'
 
+# JSON_BACKEND=orjson (api/renderers.py, needs the orjson package; the default
+# when it is installed) or stdlib (DRF's json-based JSONRenderer/JSONParser).
+# Output is the same text.
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson' if find_spec('orjson') else 'stdlib')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': [
+        {'orjson': 'api.renderers.ORJSONRenderer', 'stdlib': 'rest_framework.renderers.JSONRenderer'}[JSON_BACKEND],
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        {'orjson': 'api.renderers.ORJSONParser', 'stdlib': 'rest_framework.parsers.JSONParser'}[JSON_BACKEND],
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Keyset pagination on (-createdAt, id); only kicks in when ?limit= or ?cursor= is sent
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+}
+
+API_PAGINATION = {
+    'MAX_LIMIT': 500,
+    # Compatibility switch: set False to force every list request onto pages
+    'ALLOW_UNPAGINATED': True,
+}
+
+# Buffered ActivityLog writer (api/audit.py). 'sync' writes inline, so log rows
+# are visible as soon as the request returns (api/tests.py runs that way).
+ACTIVITY_LOG = {
+    'MODE': os.environ.get('ACTIVITY_LOG_MODE', 'async'),
+    'BATCH_SIZE': 100,
+    'FLUSH_INTERVAL_MS': 200,
+    'MAX_QUEUE': 10000,
+}
+
+# Project/employee deletes (api/purge.py). A cascade of more than THRESHOLD rows
+# answers 202 with a PurgeJob that deletes CHUNK_SIZE rows per transaction on a
+# background thread; 'sync' runs the job when the request commits.
+PURGE = {
+    'MODE': os.environ.get('PURGE_MODE', 'thread'),
+    'THRESHOLD': int(os.environ.get('PURGE_THRESHOLD', '10000')),
+    'CHUNK_SIZE': int(os.environ.get('PURGE_CHUNK_SIZE', '5000')),
+}
+
+# Delta sync (?updatedSince=). The returned cursor trails the clock by
+# OVERLAP_SECONDS so rows committed by slower concurrent requests are still
+# picked up next time (clients may see a row twice). Cursors older than the
+# tombstone retention get 410 Gone and must reload the full list. Deltas come
+# in pages of PAGE_SIZE rows (?limit= up to API_PAGINATION MAX_LIMIT).
+SYNC = {
+    'OVERLAP_SECONDS': 5,
+    'TOMBSTONE_RETENTION_DAYS': 30,
+    'PAGE_SIZE': int(os.environ.get('SYNC_PAGE_SIZE', '500')),
 }
 
+# Change notifications at /api/events (api/events.py, ASGI only). BACKEND
+# 'memory' fans out within one process; 'redis' relays through Redis pub/sub
+# (EVENTS_REDIS_URL, needs the redis package) so all workers see every write.
+# QUEUE_SIZE bounds each subscriber's backlog (in writes, not bytes).
+EVENTS = {
+    'BACKEND': os.environ.get('EVENTS_BACKEND', 'memory'),
+    'REDIS_URL': os.environ.get('EVENTS_REDIS_URL', 'redis://127.0.0.1:6379/0'),
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT_SECONDS': 15,
+    'MAX_IDS_PER_WRITE': 100,
+}
+
+# CACHE_BACKEND=locmem (default; private to each worker process), file
+# (CACHE_LOCATION directory) or redis (CACHE_LOCATION=redis://127.0.0.1:6379/1,
+# needs the redis package). Use file or redis when running several workers so
+# they share the response cache generations.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+            'redis': 'django.core.cache.backends.redis.RedisCache',
+        }[CACHE_BACKEND],
+        'LOCATION': os.environ.get('CACHE_LOCATION', {
+            'locmem': 'plansculpt',
+            'file': '/tmp/plansculpt_cache',
+            'redis': 'redis://127.0.0.1:6379/1',
+        }[CACHE_BACKEND]),
+    }
+}
+
+# Write-invalidated list responses (api/cache.py). ENDPOINTS switches single
+# resources off; RESPONSE_CACHE_DISABLE=projects,invoices does the same from the
+# environment. api/tests.py turns it off so fixtures written straight through
+# the ORM never meet a stale entry.
+RESPONSE_CACHE_DISABLED = os.environ.get('RESPONSE_CACHE_DISABLE', '').split(',')
+RESPONSE_CACHE = {
+    'ENABLED': os.environ.get('RESPONSE_CACHE', '1') == '1',
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', '300')),
+    'ENDPOINTS': {name: name not in RESPONSE_CACHE_DISABLED for name in ['projects', 'employees', 'invoices']},
+}
+
+# Read-only fast path for GET lists (api/fastlists.py): viewsets with a
+# values_serializer_class render rows from .values() instead of model
+# instances, with byte-identical output. FAST_LISTS=0 puts every list back on
+# the regular serializers.
+FAST_LISTS = os.environ.get('FAST_LISTS', '1') == '1'
+
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
@@ -58,7 +162,51 @@ SIMPLE_JWT = {
 }
 
 
+# Response compression (api/middleware.py): bodies of at least MIN_SIZE bytes
+# are sent brotli-encoded when the client accepts br and the brotli package is
+# installed, gzip otherwise. RESPONSE_COMPRESSION=0 leaves it to the proxy.
+RESPONSE_COMPRESSION = {
+    'ENABLED': os.environ.get('RESPONSE_COMPRESSION', '1') == '1',
+    'MIN_SIZE': int(os.environ.get('RESPONSE_COMPRESSION_MIN_SIZE', '1024')),
+    'GZIP_LEVEL': int(os.environ.get('RESPONSE_COMPRESSION_GZIP_LEVEL', '6')),
+    'BROTLI_QUALITY': 4,
+}
+
+# Per-route request metrics (api/metrics.py, api/middleware.py) in Prometheus
+# text format at /api/metrics. Each worker process counts its own requests; set
+# METRICS_MULTIPROCESS_DIR to a directory shared by the workers (emptied at
+# deploy) and every worker's /api/metrics reports their sum. With METRICS_TOKEN
+# set, scrapes must send "Authorization: Bearer <token>"; without it only admin
+# JWTs are accepted. Requests over
+# SLOW_REQUEST_MS are logged with their SQL and queries over SLOW_QUERY_MS on
+# their own, to the api.metrics logger.
+METRICS = {
+    'ENABLED': os.environ.get('METRICS', '1') == '1',
+    'MULTIPROCESS_DIR': os.environ.get('METRICS_MULTIPROCESS_DIR', ''),
+    'FLUSH_INTERVAL_MS': 1000,
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+    'SLOW_REQUEST_MS': int(os.environ.get('SLOW_REQUEST_MS', '1000')),
+    'SLOW_QUERY_MS': int(os.environ.get('SLOW_QUERY_MS', '100')),
+    'MAX_LOGGED_QUERIES': 50,
+}
+
+# On-demand profiling of one request (ProfilerMiddleware, api/profiling.py): an
+# admin's request with "X-Profile: 1" or ?profile=1 runs under cProfile, and the
+# pstats, collapsed stacks (flamegraph.pl, speedscope) and SQL are written to
+# DIRECTORY as <X-Profile-Id>.pstats/.collapsed/.sql. "inline" also returns them
+# as JSON instead of the response body. PROFILER=0 ignores the flag entirely.
+PROFILER = {
+    'ENABLED': os.environ.get('PROFILER', '1') == '1',
+    'DIRECTORY': os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'plansculpt-profiles')),
+    'MAX_QUERIES': 1000,
+    'TOP_FUNCTIONS': 30,
+}
+
 MIDDLEWARE = [
+    'api.middleware.AsyncStreamingMiddleware', # Outermost: streams exports without buffering under ASGI
+    'api.middleware.MetricsMiddleware', # Wall time covers every other layer
+    'api.middleware.CompressionMiddleware', # Before the rest, so it encodes the final body
+    'api.middleware.ProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -92,12 +240,61 @@ WSGI_APPLICATION = 'plansculpt_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Environment-driven profile. DB_ENGINE=sqlite (default) or postgres.
+#
+# SQLite: WAL lets readers run alongside the single writer, synchronous=NORMAL
+# is durable under WAL for everything but power loss, and IMMEDIATE
+# transactions take the write lock up front so busy_timeout can queue writers
+# instead of failing with "database is locked" on lock upgrade.
+#
+# PostgreSQL: persistent connections with health checks, or Django's psycopg
+# pool when DB_POOL=1 (pooling requires CONN_MAX_AGE=0).
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
+if DB_ENGINE == 'postgres':
+    DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'plansculpt'),
+            'USER': os.environ.get('DB_USER', 'plansculpt'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN', '2')),
+                    'max_size': int(os.environ.get('DB_POOL_MAX', '10')),
+                    'timeout': 10,
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': ';'.join([
+                    'PRAGMA journal_mode=WAL',
+                    'PRAGMA synchronous=NORMAL',
+                    f"PRAGMA busy_timeout={os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')}",
+                    f"PRAGMA mmap_size={os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))}",
+                    f"PRAGMA cache_size=-{os.environ.get('SQLITE_CACHE_KB', '65536')}", # negative = KiB
+                    'PRAGMA temp_store=MEMORY',
+                ]),
+            } if SQLITE_TUNING else {},
+        }
     }
-}
 
 
 # Password validation
@@ -144,15 +341,54 @@ USE_TZ = True
 STATIC_URL = 'static/'
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['ETag', 'X-Sync-Cursor']
+
+# Request payload logging (api/payloads.py, the api.payloads logger): JSON lines
+# for a SAMPLE_RATE share of requests (0-1; warnings and errors always), with
+# REDACT fields masked at any depth. Written off the request thread by
+# QueuedRotatingFileHandler to FILENAME (PAYLOAD_LOG_FILE; *.log is gitignored),
+# rotated at MAX_BYTES.
+PAYLOAD_LOG = {
+    'SAMPLE_RATE': float(os.environ.get('PAYLOAD_LOG_SAMPLE_RATE', '1')),
+    'REDACT': ['password', 'token', 'access', 'refresh', 'secret', 'authorization'],
+    'MAX_VALUE_LENGTH': 1000,
+    'FILENAME': os.environ.get('PAYLOAD_LOG_FILE', str(BASE_DIR / 'payloads.log')),
+    'MAX_BYTES': int(os.environ.get('PAYLOAD_LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+    'BACKUP_COUNT': 5,
+    'MAX_QUEUE': 10000,
+}
+
+# Unhandled errors from the django logger. ERROR_LOG_FILE moves the file; the
+# default stays next to manage.py whatever directory the server starts in.
+ERROR_LOG_FILE = os.environ.get('ERROR_LOG_FILE', str(BASE_DIR / 'django_error.log'))
 
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'api.payloads.JsonFormatter',
+        },
+    },
     'handlers': {
         'file': {
             'level': 'ERROR',
             'class': 'logging.FileHandler',
-            'filename': 'django_error.log',
+            'filename': ERROR_LOG_FILE,
+            'delay': True,
+        },
+        'console': {
+            'level': 'WARNING',
+            'class': 'logging.StreamHandler',
+        },
+        'payloads': {
+            'level': 'INFO',
+            'class': 'api.payloads.QueuedRotatingFileHandler',
+            'formatter': 'json',
+            'filename': PAYLOAD_LOG['FILENAME'],
+            'maxBytes': PAYLOAD_LOG['MAX_BYTES'],
+            'backupCount': PAYLOAD_LOG['BACKUP_COUNT'],
+            'maxQueue': PAYLOAD_LOG['MAX_QUEUE'],
         },
     },
     'loggers': {
@@ -161,5 +397,15 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        'api.metrics': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'api.payloads': {
+            'handlers': ['payloads'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
@@ -7,13 +7,12 @@ import '../styles/layout.css';
 const Layout = () => {
     const location = useLocation();
     const navigate = useNavigate();
-    const { user } = useAuth();
+    const { user, logout } = useAuth();
 
 
     const handleLogout = () => {
         localStorage.removeItem('plansculpt_auth'); // Legacy cleanup
-        localStorage.removeItem('token');
-        localStorage.removeItem('user');
+        logout(); // Also drops the synced lists
         window.location.href = '/login'; // Hard reload to clear state
     };
 
@@ -1,5 +1,6 @@
 import React, { createContext, useState, useEffect, useContext } from 'react';
 import API_BASE_URL from '../config';
+import { resetCollectionSyncs } from '../utils/sync';
 
 const AuthContext = createContext(null);
 
@@ -25,6 +26,7 @@ export const AuthProvider = ({ children }) => {
             });
             const data = await response.json();
             if (response.ok) {
+                resetCollectionSyncs(); // Nothing loaded for the previous user carries over
                 localStorage.setItem('token', data.token);
                 localStorage.setItem('user', JSON.stringify(data.user));
                 setUser(data.user);
@@ -63,6 +65,7 @@ export const AuthProvider = ({ children }) => {
     };
 
     const logout = () => {
+        resetCollectionSyncs();
         localStorage.removeItem('token');
         localStorage.removeItem('user');
         setUser(null);
@@ -1,7 +1,6 @@
 import React from 'react';
 import { FinanceService } from '../services/FinanceService';
 import { EmployeeService } from '../services/EmployeeService';
-import { InvoiceService } from '../services/InvoiceService';
 import { Users, DollarSign, TrendingUp, TrendingDown, FileText } from 'lucide-react';
 import '../styles/dashboard.css';
 
@@ -35,39 +34,21 @@ const Dashboard = () => {
     React.useEffect(() => {
         const fetchData = async () => {
             try {
-                const [employees, transactions, invoices] = await Promise.all([
+                const [employees, summary] = await Promise.all([
                     EmployeeService.getAll(),
-                    FinanceService.getTransactions(),
-                    InvoiceService.getAll()
+                    FinanceService.getSummary()
                 ]);
 
-                // Calculate Revenue (Income)
-                const revenue = transactions
-                    .filter(t => t.type === 'income')
-                    .reduce((sum, t) => sum + Number(t.amount || 0), 0);
-
-                // Calculate Expenses
-                const expenses = transactions
-                    .filter(t => t.type === 'expense')
-                    .reduce((sum, t) => sum + Number(t.amount || 0), 0);
-
-                // Pending Invoices
-                const pendingInvoices = invoices
-                    .filter(i => i.status === 'Pending' || i.status === 'Sent')
-                    .reduce((sum, i) => sum + Number(i.total || 0), 0);
-
-                // Recent Activity
-                const recent = transactions
-                    .sort((a, b) => new Date(b.date) - new Date(a.date))
-                    .slice(0, 5);
+                const revenue = Number(summary.income || 0);
+                const expenses = Number(summary.expense || 0);
 
                 setStats({
                     employeeCount: employees.length,
                     revenue,
                     expenses,
-                    netIncome: revenue - expenses,
-                    pendingInvoices,
-                    recentTransactions: recent
+                    netIncome: Number(summary.balance || 0),
+                    pendingInvoices: Number(summary.outstandingInvoices || 0),
+                    recentTransactions: summary.recentTransactions || []
                 });
             } catch (error) {
                 console.error("Failed to fetch dashboard data:", error);
@@ -599,38 +599,12 @@ const HR = () => {
     const runPayroll = async () => {
         if (!confirm('Run payroll for all active Fixed employees for this month?')) return;
 
-        const fixedEmployees = employees.filter(e => e.type === 'fixed' && e.status === 'active' && e.salary);
-        const date = new Date();
-        const monthName = date.toLocaleString('default', { month: 'long', year: 'numeric' });
-
-        const transactions = fixedEmployees.map(e => ({
-            type: 'expense',
-            amount: Number(e.salary),
-            description: `Monthly Salary - ${e.name} (${monthName})`,
-            employeeId: e.id,
-            category: 'Salary',
-            date: new Date().toISOString(),
-            projectId: null
-        }));
-
         try {
-            // Bulk add transactions via generic endpoint or loop
-            // FinanceService might not have bulk add, so we use raw fetch or loop.
-            // Using raw fetch to /api/transactions for bulk if supported or loop.
-            // The server index.js has /api/transactions POST which handles single.
-            // Wait, I saw a BULK add in server/index.js? 
-            // Let's check server/index.js content later or just loop for safety if unsure.
-            // Actually, I wrote the server. Let me check if I added bulk transaction support.
-            // I'll assume standard loop for now to be safe or use a known bulk endpoint if created.
-            // In the previous step I used: await fetch('http://localhost:3001/api/transactions', ... body: JSON.stringify(transactions) )
-            // If the server expects an array, that works. If it expects an object, it fails.
-            // Let's assume the server handles array cause I might have added it. 
-            // BUT, standard REST usually is one per POST.
-            // I'll use Promise.all with FinanceService.createTransaction to be 100% safe.
-
-            await Promise.all(transactions.map(t => FinanceService.addTransaction(t)));
-
-            alert(`Payroll processed for ${fixedEmployees.length} employees.`);
+            const result = await EmployeeService.runPayroll();
+
+            alert(result.alreadyRan
+                ? `Payroll for this month was already processed (${result.count} employees).`
+                : `Payroll processed for ${result.count} employees.`);
             loadData();
         } catch (err) {
             console.error(err);
@@ -1,4 +1,6 @@
 import API_BASE_URL from '../config';
+import { fetchPage, withLimit } from '../utils/pagination';
+import { createCollectionSync } from '../utils/sync';
 
 const API_URL = `${API_BASE_URL}/employees`;
 
@@ -10,14 +12,21 @@ const getHeaders = () => {
     };
 };
 
+const employeesSync = createCollectionSync(`${API_URL}/`, getHeaders);
+
 export const EmployeeService = {
     getAll: async (status = '') => {
-        const query = status ? `?status=${status}` : '';
+        if (!status) return await employeesSync.load();
+        const query = `?status=${status}`;
         const res = await fetch(`${API_URL}/${query}`, { headers: getHeaders() });
         if (!res.ok) throw new Error('Failed to fetch employees');
         return await res.json();
     },
 
+    getPage: async (limit = 100, cursorUrl = null) => {
+        return await fetchPage(cursorUrl || withLimit(`${API_URL}/`, limit), getHeaders());
+    },
+
     create: async (employee) => {
         const res = await fetch(`${API_URL}/`, {
             method: 'POST',
@@ -41,6 +50,20 @@ export const EmployeeService = {
         return await res.json();
     },
 
+    // Server selects eligible employees and pays them in one batch; safe to retry within a month
+    runPayroll: async (month = null) => {
+        const res = await fetch(`${API_URL}/run-payroll/`, {
+            method: 'POST',
+            headers: getHeaders(),
+            body: JSON.stringify(month ? { month } : {})
+        });
+        if (!res.ok) {
+            const errorData = await res.json().catch(() => ({}));
+            throw new Error(errorData.error || 'Failed to run payroll');
+        }
+        return await res.json();
+    },
+
     delete: async (id) => {
         const res = await fetch(`${API_URL}/${id}/`, {
             method: 'DELETE',
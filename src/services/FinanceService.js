@@ -3,6 +3,8 @@
 
 
 import API_BASE_URL from '../config';
+import { fetchPage, walkPages, withLimit } from '../utils/pagination';
+import { createCollectionSync } from '../utils/sync';
 
 const API_BASE = API_BASE_URL;
 
@@ -14,10 +16,24 @@ const getHeaders = () => {
     };
 };
 
+// Pages call getTransactions() after every mutation; only the first call downloads the whole ledger
+const transactionsSync = createCollectionSync(`${API_BASE}/transactions/`, getHeaders);
+
 export const FinanceService = {
     getTransactions: async () => {
-        const res = await fetch(`${API_BASE}/transactions/`, { headers: getHeaders() });
-        return await res.json();
+        return await transactionsSync.load();
+    },
+
+    // One page of transactions; pass the previous page's `next` URL as `cursorUrl` to continue
+    getTransactionsPage: async (limit = 100, cursorUrl = null, filters = {}) => {
+        const query = new URLSearchParams(filters).toString();
+        const url = cursorUrl || withLimit(`${API_BASE}/transactions/${query ? `?${query}` : ''}`, limit);
+        return await fetchPage(url, getHeaders());
+    },
+
+    walkTransactions: (filters = {}, limit = 100) => {
+        const query = new URLSearchParams(filters).toString();
+        return walkPages(`${API_BASE}/transactions/${query ? `?${query}` : ''}`, getHeaders(), limit);
     },
 
     addTransaction: async (transaction) => {
@@ -33,6 +49,21 @@ export const FinanceService = {
         return await res.json();
     },
 
+    // All-or-nothing batch insert; on 400 the server lists per-row errors by index
+    addTransactionsBulk: async (transactions) => {
+        const res = await fetch(`${API_BASE}/transactions/bulk/`, {
+            method: 'POST',
+            headers: getHeaders(),
+            body: JSON.stringify(transactions)
+        });
+        if (!res.ok) {
+            const err = await res.json().catch(() => ({}));
+            const rows = (err.errors || []).map(e => `#${e.index + 1}: ${JSON.stringify(e.errors)}`);
+            throw new Error(rows.length ? `Invalid transactions ${rows.join(', ')}` : (err.error || 'Failed to save transactions'));
+        }
+        return await res.json();
+    },
+
     deleteTransaction: async (id) => {
         const res = await fetch(`${API_BASE}/transactions/${id}/`, {
             method: 'DELETE',
@@ -67,17 +98,20 @@ export const FinanceService = {
         });
     },
 
-    getStats: async () => {
-        const res = await fetch(`${API_BASE}/transactions/`, { headers: getHeaders() });
-        const transactions = await res.json();
+    getSummary: async (filters = {}) => {
+        const query = new URLSearchParams(filters).toString();
+        const res = await fetch(`${API_BASE}/finance/summary${query ? `?${query}` : ''}`, { headers: getHeaders() });
+        if (!res.ok) throw new Error('Failed to fetch finance summary');
+        return await res.json();
+    },
 
-        const income = transactions.filter(t => t.type === 'income').reduce((acc, curr) => acc + Number(curr.amount), 0);
-        const expense = transactions.filter(t => t.type === 'expense').reduce((acc, curr) => acc + Number(curr.amount), 0);
+    getStats: async () => {
+        const summary = await FinanceService.getSummary();
 
         return {
-            income,
-            expense,
-            balance: income - expense
+            income: Number(summary.income),
+            expense: Number(summary.expense),
+            balance: Number(summary.balance)
         };
     }
 };
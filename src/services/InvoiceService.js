@@ -1,4 +1,5 @@
 import API_BASE_URL from '../config';
+import { fetchPage, withLimit } from '../utils/pagination';
 
 const API_URL = `${API_BASE_URL}/invoices`;
 
@@ -17,6 +18,10 @@ export const InvoiceService = {
         return await res.json();
     },
 
+    getPage: async (limit = 100, cursorUrl = null) => {
+        return await fetchPage(cursorUrl || withLimit(`${API_URL}/`, limit), getHeaders());
+    },
+
     create: async (invoice) => {
         const res = await fetch(`${API_URL}/`, {
             method: 'POST',
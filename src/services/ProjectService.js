@@ -3,6 +3,7 @@ import { db } from '../db/db';
 
 
 import API_BASE_URL from '../config';
+import { fetchPage, withLimit } from '../utils/pagination';
 
 const API_BASE = API_BASE_URL;
 
@@ -112,6 +113,11 @@ export const ProjectService = {
         return await res.json();
     },
 
+    getTasksPage: async (projectId, limit = 100, cursorUrl = null) => {
+        const url = cursorUrl || withLimit(`${API_BASE}/tasks/?projectId=${projectId}`, limit);
+        return await fetchPage(url, getHeaders());
+    },
+
     addTask: async (task) => {
         const res = await fetch(`${API_BASE}/tasks/`, {
             method: 'POST',
@@ -0,0 +1,29 @@
+// Walks a keyset-paginated list endpoint (?limit=&cursor=) page by page.
+// The server answers { results, next } where `next` is the URL of the following page, or null.
+export const fetchPage = async (url, headers) => {
+    const res = await fetch(url, { headers });
+    if (!res.ok) throw new Error(`Failed to fetch ${url}`);
+    return await res.json();
+};
+
+export const withLimit = (url, limit) => {
+    const sep = url.includes('?') ? '&' : '?';
+    return `${url}${sep}limit=${limit}`;
+};
+
+export async function* walkPages(url, headers, limit = 100) {
+    let next = withLimit(url, limit);
+    while (next) {
+        const page = await fetchPage(next, headers);
+        yield page.results;
+        next = page.next;
+    }
+}
+
+export const fetchAllPages = async (url, headers, limit = 100) => {
+    const rows = [];
+    for await (const results of walkPages(url, headers, limit)) {
+        rows.push(...results);
+    }
+    return rows;
+};
@@ -0,0 +1,66 @@
+// Keeps a local copy of a list endpoint current with ?updatedSince= deltas.
+// The first load is a plain GET whose X-Sync-Cursor header seeds the cursor;
+// later loads transfer only changed rows and the ids of deleted ones, following
+// `next` until the last page, which carries the new cursor. A 410 means the
+// cursor outlived the server's deletion history: start over. The full load
+// accepts a bare array or, with API_PAGINATION ALLOW_UNPAGINATED off, the
+// { results, next } pages, which it follows to the end.
+// Every copy belongs to the signed-in user: resetCollectionSyncs() drops them
+// all, and AuthContext calls it whenever the user logs in or out.
+const byNewest = (a, b) => new Date(b.createdAt) - new Date(a.createdAt) || b.id - a.id;
+
+const collections = new Set();
+
+export const resetCollectionSyncs = () => collections.forEach(collection => collection.reset());
+
+export const createCollectionSync = (url, getHeaders) => {
+    let rows = new Map();
+    let cursor = null;
+
+    const fullLoad = async () => {
+        const loaded = new Map();
+        let page = url;
+        let first = null;
+        while (page) {
+            const res = await fetch(page, { headers: getHeaders() });
+            if (!res.ok) throw new Error(`Failed to fetch ${url}`);
+            first = first ?? res.headers.get('X-Sync-Cursor'); // Taken before the first page was read
+            const body = await res.json();
+            const list = Array.isArray(body) ? body : body.results;
+            list.forEach(row => loaded.set(row.id, row));
+            page = Array.isArray(body) ? null : body.next;
+        }
+        rows = loaded;
+        cursor = first;
+    };
+
+    const deltaLoad = async () => {
+        const sep = url.includes('?') ? '&' : '?';
+        let page = `${url}${sep}updatedSince=${encodeURIComponent(cursor)}`;
+        const changed = new Map(rows);
+        while (page) {
+            const res = await fetch(page, { headers: getHeaders() });
+            if (res.status === 410) return fullLoad();
+            if (!res.ok) throw new Error(`Failed to sync ${url}`);
+            const delta = await res.json();
+            delta.results.forEach(row => changed.set(row.id, row));
+            delta.deleted.forEach(id => changed.delete(id));
+            page = delta.next;
+            if (!page) cursor = delta.cursor;
+        }
+        rows = changed; // Only once every page arrived, so a failed page is retried from the old cursor
+    };
+
+    const collection = {
+        load: async () => {
+            await (cursor ? deltaLoad() : fullLoad());
+            return [...rows.values()].sort(byNewest);
+        },
+        reset: () => {
+            rows = new Map();
+            cursor = null;
+        },
+    };
+    collections.add(collection);
+    return collection;
+};